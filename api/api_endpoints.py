@@ -1,26 +1,134 @@
-from fastapi import FastAPI, Depends, responses
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, Depends, Query, Request, responses
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from typing import Annotated
-from datetime import timedelta
+from typing import Annotated, Optional
+from contextlib import asynccontextmanager
+from starlette_prometheus import PrometheusMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+import asyncio
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
 from models.api_models import (
     URLRequest,
+    BatchURLRequest,
     CreateUserRequest,
     Token,
     UpdateUrlLimitRequest,
+    UpdateUserStatusRequest,
+    ExportFormat,
+    StatsGranularity,
 )
 from models.db_models import User, UserInDB
 from service.auth_service import (
-    authenticate_user,
+    authenticate_user_async,
     create_access_token,
+    is_admin_token,
+    token_cache,
+    token_claims,
     get_current_user,
     get_current_active_user,
 )
-from service.api_service import create_custom_short_url, create_generated_short_url
+from service import (
+    async_db_service,
+    click_service,
+    metrics_service,
+    profiling_service,
+    storage,
+)
+from service.export_service import stream_export
+from service.change_feed_service import change_feed
+from service.prefilter_service import redirect_prefilter
+from service.snapshot_service import redirect_snapshot
+from service.password_service import password_hasher
 from service.db_service import *
 from utils.constants import *
+from utils.logger_config import logger, log_sampled
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if CREATE_TABLES_ON_STARTUP:
+        try:
+            await run_in_threadpool(storage.backend.create_tables)
+        except Exception as e:
+            logger.exception(DYNAMODB_TABLE_CREATION_ERROR_LOG.format(error=e))
+    if DYNAMODB_WARMUP:
+        # Runs before the worker starts accepting requests
+        try:
+            await run_in_threadpool(storage.backend.warm_up)
+        except Exception as e:
+            logger.warning(DYNAMODB_WARMUP_ERROR.format(error=e))
+    if redirect_snapshot:
+        # Fails startup if there is no readable snapshot to serve yet
+        redirect_snapshot.reload()
+    if change_feed:
+        change_feed.start(apply_change, reset_caches)
+    # Waits for the change feed subscription before building
+    if redirect_prefilter:
+        redirect_prefilter.start()
+    if click_service.click_aggregator:
+        click_service.click_aggregator.start()
+    if METRICS_ENABLED:
+        lag_monitor = asyncio.create_task(
+            metrics_service.monitor_event_loop_lag(EVENT_LOOP_LAG_INTERVAL_SECONDS)
+        )
+    if metrics_service.cache_stats_publisher:
+        cache_metrics = asyncio.create_task(
+            metrics_service.publish_cache_metrics(CACHE_METRICS_PUBLISH_SECONDS)
+        )
+    yield
+    if METRICS_ENABLED:
+        lag_monitor.cancel()
+    if metrics_service.cache_stats_publisher:
+        cache_metrics.cancel()
+    if redirect_prefilter:
+        redirect_prefilter.stop()
+    if change_feed:
+        change_feed.stop()
+    if click_service.click_aggregator:
+        click_service.click_aggregator.stop()
+    password_hasher.shutdown()
+    # Drain queued log messages before the worker exits
+    await logger.complete()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def metrics(request: Request) -> responses.Response:
+    # Replaces starlette_prometheus' view, which only recognizes the deprecated
+    # lowercase prometheus_multiproc_dir
+    return responses.Response(
+        generate_latest(metrics_service.metrics_registry()),
+        headers={"Content-Type": CONTENT_TYPE_LATEST},
+    )
+
+
+if METRICS_ENABLED:
+    # Requests are labelled by route template; unrouted paths are ignored so
+    # probes for random URLs can't create new time series
+    app.add_middleware(PrometheusMiddleware, filter_unhandled_paths=True)
+    app.add_route("/metrics", metrics, include_in_schema=False)
+    metrics_service.register_cache_metrics(
+        {
+            "redirect": lambda: redirect_cache,
+            "user": lambda: user_cache,
+            "token": lambda: token_cache,
+        }
+    )
+
+if PROFILING_ENABLED:
+    # Not registered at all unless enabled, so normal deployments pay nothing
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        mode = request.headers.get(PROFILE_HEADER)
+        if mode not in (PROFILE_MODE_TIMING, PROFILE_MODE_CPROFILE):
+            return await call_next(request)
+        authorization = request.headers.get("Authorization")
+        if not await run_in_threadpool(is_admin_token, authorization):
+            return await call_next(request)
+        return await profiling_service.profile_request(request, call_next, mode)
 
-app = FastAPI()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -41,7 +149,7 @@ async def read_users_me(
 @app.post("/token", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     logger.info(LOGIN_ATTEMPT_LOG.format(username=form_data.username))
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user_async(form_data.username, form_data.password)
     if not user:
         logger.warning(INVALID_CREDENTIALS_ERROR.format(username=form_data.username))
         raise HTTPException(
@@ -50,7 +158,8 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
     access_token_expires = timedelta(minutes=JWT_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.user_id}, expires_delta=access_token_expires
+        data={"sub": user.user_id, **token_claims(user)},
+        expires_delta=access_token_expires,
     )
     logger.info(CREATE_ACCESS_TOKEN_LOG.format(username=form_data.username))
     return {"access_token": access_token, "token_type": ACCESS_TOKEN_TYPE}
@@ -58,7 +167,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 @app.post("/create_user", status_code=status.HTTP_201_CREATED)
 async def create_user_endpoint(user_data: CreateUserRequest):
-    create_user(user_data.username, user_data.password, user_data.admin)
+    await async_db_service.create_user(
+        user_data.username, user_data.password, user_data.admin
+    )
     logger.info(USER_CREATED_LOG.format(username=user_data.username))
     return {
         "message": USER_CREATION_SUCCESS_MESSAGE.format(username=user_data.username)
@@ -72,14 +183,16 @@ async def change_password(
     current_user: UserInDB = Depends(get_current_user),
 ):
     logger.info(PASSWORD_CHANGE_REQUEST_LOG.format(user_id=current_user.username))
-    user = get_user_by_id(current_user.user_id)
-    if not user or not verify_password(old_password, user.hashed_password):
+    user = await async_db_service.get_user_by_id(current_user.user_id)
+    if not user or not await async_db_service.verify_password(
+        old_password, user.hashed_password
+    ):
         logger.warning(ACCESS_DENIED)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=ACCESS_DENIED
         )
 
-    update_user_password(current_user.user_id, new_password)
+    await async_db_service.update_user_password(current_user.user_id, new_password)
     logger.info(PASSWORD_CHANGE_SUCCESS_LOG.format(user_id=current_user.username))
     return {"message": PASSWORD_CHANGE_SUCCESS_LOG.format(user_id=current_user.user_id)}
 
@@ -89,7 +202,14 @@ async def shorten_url(
     request: URLRequest, current_user: UserInDB = Depends(get_current_user)
 ):
     try:
-        if url_limit_check(current_user.user_id):
+        # Repeat shortens return the existing short URL, even at the URL limit
+        if DEDUP_ENABLED and not request.short_url:
+            existing_short_url = await async_db_service.get_dedup_short_url(
+                str(request.url), current_user.user_id
+            )
+            if existing_short_url:
+                return {"short_url": existing_short_url}
+        if await async_db_service.url_limit_check(current_user.user_id):
             logger.warning(URL_LIMIT_REACHED_LOG.format(username=current_user.user_id))
             # Url limit reached
             raise HTTPException(
@@ -98,13 +218,15 @@ async def shorten_url(
             )
         # If short_url is given use it, otherwise generate a unique url and save it
         elif request.short_url:
-            result = create_custom_short_url(
+            result = await async_db_service.create_custom_short_url(
                 request.url, request.short_url, current_user.user_id
             )
             logger.info(CREATED_CUSTOM_URL_LOG.format(short_url=result["short_url"]))
             return result
         else:
-            result = create_generated_short_url(request.url, current_user.user_id)
+            result = await async_db_service.create_generated_short_url(
+                request.url, current_user.user_id
+            )
             logger.info(GENERATED_SHORT_URL_LOG.format(short_url=result["short_url"]))
             return result
     except HTTPException:
@@ -118,14 +240,37 @@ async def shorten_url(
         )
 
 
+@app.post("/shorten_urls")
+async def shorten_urls(
+    request: BatchURLRequest, current_user: UserInDB = Depends(get_current_user)
+):
+    # Each item is reported as created, conflict or rejected
+    return await async_db_service.create_short_urls_batch(
+        request.urls, current_user.user_id
+    )
+
+
 @app.get("/list_urls")
-async def list_urls(current_user: User = Depends(get_current_user)):
-    if not is_user_admin(current_user.user_id):
+async def list_urls(
+    limit: Optional[int] = Query(None, ge=1, le=LIST_URLS_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    current_user: User = Depends(get_current_user),
+):
+    if not await async_db_service.is_user_admin(current_user.user_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=ACCESS_DENIED)
 
     logger.debug(RECEIVED_REQUEST_LIST_URLS_LOG)
+    # Stream NDJSON or return a single page when requested, so the whole table
+    # never has to be held in memory
+    if stream:
+        return StreamingResponse(stream_urls(), media_type=NDJSON_MEDIA_TYPE)
+    if limit or cursor:
+        return await async_db_service.get_urls_page(
+            limit or LIST_URLS_DEFAULT_LIMIT, cursor
+        )
     try:
-        urls = get_all_urls()
+        urls = await async_db_service.get_all_urls()
         logger.debug(RETRIEVED_URLS_LOG.format(count=len(urls)))
         return urls
     except Exception as e:
@@ -134,11 +279,61 @@ async def list_urls(current_user: User = Depends(get_current_user)):
 
 
 @app.get("/list_my_urls")
-async def list_my_urls(current_user: User = Depends(get_current_active_user)):
-    user_urls = get_urls_for_user(current_user.user_id)
+async def list_my_urls(
+    limit: Optional[int] = Query(None, ge=1, le=LIST_URLS_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    current_user: User = Depends(get_current_active_user),
+):
+    if stream:
+        return StreamingResponse(
+            stream_urls(current_user.user_id), media_type=NDJSON_MEDIA_TYPE
+        )
+    if limit or cursor:
+        return await async_db_service.get_urls_page(
+            limit or LIST_URLS_DEFAULT_LIMIT, cursor, current_user.user_id
+        )
+    user_urls = await async_db_service.get_urls_for_user(current_user.user_id)
     return user_urls
 
 
+@app.get("/export_urls")
+async def export_urls(
+    export_format: ExportFormat = Query(ExportFormat.jsonl, alias="format"),
+    segments: int = Query(EXPORT_DEFAULT_SEGMENTS, ge=1, le=EXPORT_MAX_SEGMENTS),
+    current_user: User = Depends(get_current_user),
+):
+    if not await async_db_service.is_user_admin(current_user.user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=ACCESS_DENIED)
+
+    # Segments are scanned in parallel and streamed as they arrive
+    return StreamingResponse(
+        stream_export(export_format.value, segments),
+        media_type=EXPORT_MEDIA_TYPES[export_format.value],
+    )
+
+
+@app.get("/runtime_stats")
+async def runtime_stats(current_user: User = Depends(get_current_user)):
+    if not await async_db_service.is_user_admin(current_user.user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=ACCESS_DENIED)
+
+    return {
+        "redirect_cache": redirect_cache.stats(),
+        "redirect_prefilter": (
+            redirect_prefilter.stats() if redirect_prefilter else None
+        ),
+        "change_feed": change_feed.stats() if change_feed else None,
+        "redirect_snapshot": (redirect_snapshot.stats() if redirect_snapshot else None),
+        "password_hasher": password_hasher.stats(),
+        "click_aggregator": (
+            click_service.click_aggregator.stats()
+            if click_service.click_aggregator
+            else None
+        ),
+    }
+
+
 @app.post("/update_url_limit")
 async def update_url_limit(
     request: UpdateUrlLimitRequest, current_user: UserInDB = Depends(get_current_user)
@@ -148,7 +343,7 @@ async def update_url_limit(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=ACCESS_DENIED)
 
     # Fetch the user to update
-    user_to_update = get_user_by_id(request.user_id)
+    user_to_update = await async_db_service.get_user_by_id(request.user_id)
     if user_to_update is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -156,7 +351,7 @@ async def update_url_limit(
         )
 
     # Get user's url info: limit and current count
-    user_url_info = get_user_url_info(current_user.user_id)
+    user_url_info = await async_db_service.get_user_url_info(request.user_id)
 
     # Make sure new limit is greater than current url count
     if request.new_limit < user_url_info[URL_COUNT_KEY]:
@@ -165,26 +360,96 @@ async def update_url_limit(
         )
 
     # Update the user's URL limit
-    user_to_update.url_limit = request.new_limit
-    user_to_update.save()
+    await async_db_service.update_url_limit(request.user_id, request.new_limit)
 
     return {"message": UPDATE_URL_LIMIT_SUCCESS.format(user_id=user_to_update.user_id)}
 
 
+@app.post("/update_user_status")
+async def update_user_status(
+    request: UpdateUserStatusRequest,
+    current_user: UserInDB = Depends(get_current_user),
+):
+    # Ensure the current user is an admin
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=ACCESS_DENIED)
+
+    await async_db_service.set_user_disabled(request.user_id, request.disabled)
+
+    return {"message": UPDATE_USER_STATUS_SUCCESS.format(user_id=request.user_id)}
+
+
 @app.get("/redirect/{short_url}")
-async def redirect(short_url: str):
-    original_url = get_original_url(short_url)
+async def redirect(short_url: str, request: Request):
+    if redirect_snapshot:
+        # Read-only mode: a mapped file lookup, cheap enough for the event loop
+        original_url = redirect_snapshot.get(short_url)
+    else:
+        original_url = await async_db_service.get_original_url(short_url)
     if original_url is None:
         # Log as info, because this is an expected situation that doesn't require intervention
-        logger.info(REDIRECT_NOT_FOUND.format(short_url=short_url))
+        if log_sampled(LOG_EVENT_REDIRECT):
+            logger.info(REDIRECT_NOT_FOUND, short_url=short_url)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=REDIRECT_NOT_FOUND.format(short_url=short_url),
         )
     # Log the redirect success as info
-    logger.info(
-        REDIRECT_SUCCESS_LOG.format(short_url=short_url, original_url=original_url)
-    )
+    if log_sampled(LOG_EVENT_REDIRECT):
+        logger.info(
+            REDIRECT_SUCCESS_LOG, short_url=short_url, original_url=original_url
+        )
+    if click_service.click_aggregator:
+        # Only sketched into the unique visitor estimate, never stored as is
+        client_host = request.client.host if request.client else ""
+        visitor = f"{client_host}|{request.headers.get('user-agent', '')}"
+        click_service.click_aggregator.record(short_url, visitor)
     response = RedirectResponse(url=original_url)
     response.headers["X-Original-URL"] = original_url
     return response
+
+
+async def check_stats_access(short_url: str, current_user: UserInDB):
+    # Stats of a short URL are visible to its owner and to admins
+    owner = await async_db_service.get_url_owner(short_url)
+    if owner is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=REDIRECT_NOT_FOUND.format(short_url=short_url),
+        )
+    if owner != current_user.user_id and not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=ACCESS_DENIED)
+
+
+@app.get("/stats/{short_url}")
+async def url_stats(
+    short_url: str, current_user: UserInDB = Depends(get_current_active_user)
+):
+    await check_stats_access(short_url, current_user)
+
+    clicks = await async_db_service.get_click_count(short_url)
+    # Clicks still buffered in this worker haven't reached the stats table yet
+    pending = (
+        click_service.click_aggregator.pending(short_url)
+        if click_service.click_aggregator
+        else 0
+    )
+    return {"short_url": short_url, "clicks": clicks + pending}
+
+
+@app.get("/stats/{short_url}/histogram")
+async def url_stats_histogram(
+    short_url: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: StatsGranularity = StatsGranularity.hour,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    await check_stats_access(short_url, current_user)
+
+    # Defaults to the last day, in UTC like the stored buckets
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=CLICK_HISTOGRAM_DEFAULT_HOURS)
+    return await async_db_service.get_click_histogram(
+        short_url, start, end, granularity.value
+    )
@@ -0,0 +1,87 @@
+import random
+import statistics
+import string
+import time
+import zlib
+from typing import Callable, List
+from utils.url_compression import WINDOW_BITS, compress_url, decompress_url
+
+HOSTS = [
+    "https://www.example.com",
+    "https://shop.example.co.uk",
+    "https://www.amazon.com",
+    "https://www.youtube.com",
+    "https://news.example.org",
+    "https://blog.example.io",
+]
+PATH_WORDS = ["products", "item", "article", "2024", "spring-sale", "blog", "dp"]
+TRACKING_KEYS = [
+    "utm_source",
+    "utm_medium",
+    "utm_campaign",
+    "utm_content",
+    "utm_term",
+    "fbclid",
+    "gclid",
+    "mc_cid",
+    "ref",
+    "session_id",
+]
+
+
+def _token(rng: random.Random, length: int) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=length))
+
+
+def sample_urls(count: int, seed: int) -> List[str]:
+    # Destination URLs shaped like campaign links: a path and tracking params
+    # with random IDs, which are what keeps them from compressing further
+    rng = random.Random(seed)
+    urls = []
+    for _ in range(count):
+        path = "/".join(rng.choices(PATH_WORDS, k=rng.randint(1, 4)))
+        params = "&".join(
+            f"{key}={_token(rng, rng.randint(6, 40))}"
+            for key in rng.sample(TRACKING_KEYS, rng.randint(0, len(TRACKING_KEYS)))
+        )
+        url = f"{rng.choice(HOSTS)}/{path}/{_token(rng, 10)}"
+        urls.append(f"{url}?{params}" if params else url)
+    return urls
+
+
+def _plain_deflate(url: str) -> bytes:
+    # The same codec without the dictionary, for comparison
+    compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION, zlib.DEFLATED, WINDOW_BITS)
+    return compressor.compress(url.encode()) + compressor.flush()
+
+
+def _microseconds_per_call(function: Callable, values: list, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for value in values:
+            function(value)
+        timings.append((time.perf_counter() - started) / len(values))
+    return round(min(timings) * 1e6, 2)
+
+
+def measure(urls: List[str], min_length: int, repeat: int = 3) -> dict:
+    # Sizes are averaged over URLs of at least min_length, the ones that would
+    # be stored compressed
+    urls = [url for url in urls if len(url) >= min_length]
+    if not urls:
+        return {"urls": 0}
+    compressed = [compress_url(url) for url in urls]
+    raw_bytes = statistics.mean(len(url.encode()) for url in urls)
+    compressed_bytes = statistics.mean(len(data) for data in compressed)
+    return {
+        "urls": len(urls),
+        "raw_bytes": round(raw_bytes, 1),
+        "compressed_bytes": round(compressed_bytes, 1),
+        "without_dictionary_bytes": round(
+            statistics.mean(len(_plain_deflate(url)) for url in urls), 1
+        ),
+        "ratio": round(compressed_bytes / raw_bytes, 3),
+        "compress_us": _microseconds_per_call(compress_url, urls, repeat),
+        "decompress_us": _microseconds_per_call(decompress_url, compressed, repeat),
+    }
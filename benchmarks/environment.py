@@ -0,0 +1,126 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import httpx
+
+BENCHMARK_HOST = "127.0.0.1"
+BENCHMARK_REGION = "us-east-1"
+# High enough that shorten requests never hit the per-user limit mid-run
+BENCHMARK_URL_LIMIT = 1_000_000
+STARTUP_TIMEOUT_SECONDS = 30
+SEED_USERNAME = "bench-user-{index}"
+SEED_SHORT_URL = "bench{index}"
+SEED_URL = "https://example.com/bench/{index}"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((BENCHMARK_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_dynamodb(port: int):
+    # moto's server is a benchmark-only dependency, see benchmarks/requirements.txt
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address=BENCHMARK_HOST, port=port)
+    server.start()
+    return server
+
+
+def benchmark_env(dynamodb_port: int) -> dict:
+    # Points the app at the local stand-in. Logging defaults to warnings only,
+    # so the numbers measure request handling rather than log I/O.
+    env = dict(os.environ)
+    env.update(
+        {
+            "DYNAMODB_HOST": f"http://{BENCHMARK_HOST}:{dynamodb_port}",
+            "AWS_ACCESS_KEY_ID": "benchmark",
+            "AWS_SECRET_ACCESS_KEY": "benchmark",
+            "AWS_REGION": BENCHMARK_REGION,
+            "JWT_SECRET_KEY": env.get("JWT_SECRET_KEY", "benchmark"),
+            "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+            "LOG_FILE": env.get("LOG_FILE", ""),
+        }
+    )
+    return env
+
+
+def seed(num_users: int, num_links: int, password: str) -> dict:
+    # Imported here because the models read their connection settings from
+    # the environment on import, which benchmark_env has to set up first
+    from models.db_models import URLModel, UserModel, create_tables
+    from service.password_service import hash_password
+
+    create_tables()
+    hashed_password = hash_password(password)
+    users = [
+        UserModel(
+            username=SEED_USERNAME.format(index=index),
+            hashed_password=hashed_password,
+            url_limit=BENCHMARK_URL_LIMIT,
+            url_count=0,
+        )
+        for index in range(num_users)
+    ]
+    short_urls = []
+    with URLModel.batch_write() as batch:
+        for index in range(num_links):
+            owner = users[index % num_users]
+            short_url = SEED_SHORT_URL.format(index=index)
+            batch.save(
+                URLModel(
+                    short_url=short_url,
+                    url=SEED_URL.format(index=index),
+                    user_id=owner.user_id,
+                )
+            )
+            owner.url_count += 1
+            short_urls.append(short_url)
+    with UserModel.batch_write() as batch:
+        for user in users:
+            batch.save(user)
+    return {
+        "usernames": [user.username for user in users],
+        "short_urls": short_urls,
+    }
+
+
+def start_app(env: dict, port: int, workers: int) -> subprocess.Popen:
+    # The app runs in its own processes so the load generator doesn't compete
+    # with it for the GIL
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "api.api_endpoints:app",
+            "--host",
+            BENCHMARK_HOST,
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=env,
+    )
+    base_url = f"http://{BENCHMARK_HOST}:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"App exited during startup with code {process.returncode}"
+            )
+        try:
+            if httpx.get(f"{base_url}/docs").status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"App didn't start within {STARTUP_TIMEOUT_SECONDS}s")
@@ -0,0 +1,164 @@
+import asyncio
+import math
+import random
+import time
+from typing import Dict, List
+import httpx
+
+OPERATIONS = ("redirect", "shorten", "token", "list_my_urls")
+DEFAULT_MIX = "redirect=80,shorten=10,token=5,list_my_urls=5"
+LIST_PAGE_SIZE = 50
+REQUEST_TIMEOUT_SECONDS = 30
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    # "redirect=80,shorten=20" -> relative weight per operation
+    weights = {}
+    for pair in filter(None, mix.split(",")):
+        operation, weight = pair.split("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{operation}', use {OPERATIONS}")
+        if float(weight) < 0:
+            raise ValueError(f"Weight of '{operation}' must not be negative")
+        weights[operation] = float(weight)
+    if not any(weights.values()):
+        raise ValueError("The mix needs at least one operation with a weight")
+    return weights
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile, so the result is always an observed latency
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: List[float], errors: int, seconds: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+class LoadGenerator:
+    """
+    Runs a fixed number of concurrent workers for a fixed duration, each
+    picking its next operation at random by weight. Every worker has its own
+    seeded RNG, so the same seed replays the same request sequence.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        mix: Dict[str, float],
+        usernames: List[str],
+        short_urls: List[str],
+        password: str,
+        seed: int,
+    ):
+        self.base_url = base_url
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.usernames = usernames
+        self.short_urls = short_urls
+        self.password = password
+        self.seed = seed
+        self.tokens = []
+        self.latencies = {operation: [] for operation in self.operations}
+        self.errors = {operation: 0 for operation in self.operations}
+
+    async def _login(self, client: httpx.AsyncClient, username: str):
+        return await client.post(
+            "/token", data={"username": username, "password": self.password}
+        )
+
+    async def _redirect(self, client, rng):
+        response = await client.get(f"/redirect/{rng.choice(self.short_urls)}")
+        return response.status_code == 307
+
+    async def _shorten(self, client, rng):
+        response = await client.post(
+            "/shorten_url",
+            json={"url": f"https://example.com/load/{rng.getrandbits(64)}"},
+            headers={"Authorization": f"Bearer {rng.choice(self.tokens)}"},
+        )
+        return response.status_code == 200
+
+    async def _token(self, client, rng):
+        response = await self._login(client, rng.choice(self.usernames))
+        return response.status_code == 200
+
+    async def _list_my_urls(self, client, rng):
+        response = await client.get(
+            "/list_my_urls",
+            params={"limit": LIST_PAGE_SIZE},
+            headers={"Authorization": f"Bearer {rng.choice(self.tokens)}"},
+        )
+        return response.status_code == 200
+
+    async def _worker(self, client: httpx.AsyncClient, worker_id: int, deadline: float):
+        rng = random.Random(self.seed + worker_id)
+        handlers = {
+            operation: getattr(self, f"_{operation}") for operation in OPERATIONS
+        }
+        while time.monotonic() < deadline:
+            operation = rng.choices(self.operations, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                succeeded = await handlers[operation](client, rng)
+            except httpx.HTTPError:
+                succeeded = False
+            self.latencies[operation].append(time.perf_counter() - started)
+            if not succeeded:
+                self.errors[operation] += 1
+
+    async def run(self, duration: float, concurrency: int, logins: int) -> dict:
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(
+            base_url=self.base_url, limits=limits, timeout=REQUEST_TIMEOUT_SECONDS
+        ) as client:
+            # Tokens for authenticated operations are fetched before timing starts
+            responses = await asyncio.gather(
+                *(self._login(client, username) for username in self.usernames[:logins])
+            )
+            self.tokens = [
+                response.json()["access_token"]
+                for response in responses
+                if response.status_code == 200
+            ]
+            if not self.tokens:
+                raise RuntimeError("Could not log in any seeded user")
+            started = time.monotonic()
+            deadline = started + duration
+            await asyncio.gather(
+                *(
+                    self._worker(client, worker_id, deadline)
+                    for worker_id in range(concurrency)
+                )
+            )
+            elapsed = time.monotonic() - started
+        return self.summarize(elapsed)
+
+    def summarize(self, seconds: float) -> dict:
+        all_latencies = [
+            latency for latencies in self.latencies.values() for latency in latencies
+        ]
+        return {
+            "seconds": round(seconds, 3),
+            "operations": {
+                operation: summarize_latencies(
+                    self.latencies[operation], self.errors[operation], seconds
+                )
+                for operation in self.operations
+            },
+            "total": summarize_latencies(
+                all_latencies, sum(self.errors.values()), seconds
+            ),
+        }
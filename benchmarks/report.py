@@ -0,0 +1,83 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+# Metric -> whether a higher value is better
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_report(results: dict, params: dict) -> dict:
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "results": results,
+    }
+
+
+def write_report(report: dict, path: str):
+    with open(path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+        report_file.write("\n")
+
+
+def read_report(path: str) -> dict:
+    with open(path) as report_file:
+        return json.load(report_file)
+
+
+def compare(
+    current: dict, baseline: dict, max_regression_pct: float
+) -> Tuple[List[str], bool]:
+    # Returns one line per compared metric and whether any metric regressed by
+    # more than max_regression_pct percent
+    lines = []
+    regressed = False
+    current_results = {
+        **current["results"]["operations"],
+        "total": current["results"]["total"],
+    }
+    baseline_results = {
+        **baseline["results"]["operations"],
+        "total": baseline["results"]["total"],
+    }
+    for operation, metrics in current_results.items():
+        if operation not in baseline_results:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = baseline_results[operation][metric], metrics[metric]
+            if not old:
+                continue
+            change_pct = (new - old) / old * 100
+            worse_pct = -change_pct if higher_is_better else change_pct
+            flag = ""
+            if worse_pct > max_regression_pct:
+                regressed = True
+                flag = "  REGRESSION"
+            lines.append(
+                f"{operation:>14} {metric:>15}: {old:>10} -> {new:>10} ({change_pct:+.1f}%){flag}"
+            )
+    return lines, regressed
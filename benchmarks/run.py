@@ -0,0 +1,121 @@
+import asyncio
+import os
+import typer
+from benchmarks import compression, environment
+from benchmarks.load import DEFAULT_MIX, LoadGenerator, parse_mix
+from benchmarks.report import build_report, compare, read_report, write_report
+
+app = typer.Typer()
+
+SEED_PASSWORD = "benchmark-password"
+
+
+@app.command()
+def run(
+    users: int = typer.Option(100, help="Users to seed"),
+    links: int = typer.Option(10000, help="Short URLs to seed"),
+    duration: float = typer.Option(30, help="Seconds of measured load"),
+    concurrency: int = typer.Option(50, help="Concurrent simulated clients"),
+    mix: str = typer.Option(DEFAULT_MIX, help="Relative weight per operation"),
+    workers: int = typer.Option(1, help="uvicorn worker processes"),
+    seed: int = typer.Option(42, help="Random seed for the request sequence"),
+    output: str = typer.Option("benchmark.json", help="Where to write the results"),
+    baseline: str = typer.Option(None, help="Results to compare against"),
+    max_regression: float = typer.Option(10, help="Allowed regression in percent"),
+):
+    weights = parse_mix(mix)
+    dynamodb_port = environment.free_port()
+    dynamodb = environment.start_dynamodb(dynamodb_port)
+    app_process = None
+    try:
+        env = environment.benchmark_env(dynamodb_port)
+        # The seeding below runs in this process and reads the same settings
+        os.environ.update(env)
+        typer.echo(f"Seeding {users} users and {links} short URLs...")
+        seeded = environment.seed(users, links, SEED_PASSWORD)
+        port = environment.free_port()
+        app_process = environment.start_app(env, port, workers)
+        typer.echo(f"Running {mix} for {duration}s with {concurrency} clients...")
+        generator = LoadGenerator(
+            f"http://{environment.BENCHMARK_HOST}:{port}",
+            weights,
+            seeded["usernames"],
+            seeded["short_urls"],
+            SEED_PASSWORD,
+            seed,
+        )
+        results = asyncio.run(
+            generator.run(duration, concurrency, logins=min(users, concurrency))
+        )
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait()
+        dynamodb.stop()
+
+    params = {
+        "users": users,
+        "links": links,
+        "duration": duration,
+        "concurrency": concurrency,
+        "mix": weights,
+        "workers": workers,
+        "seed": seed,
+    }
+    report = build_report(results, params)
+    write_report(report, output)
+    for operation, summary in {
+        **results["operations"],
+        "total": results["total"],
+    }.items():
+        typer.echo(
+            f"{operation:>14}: {summary['throughput_rps']:>9} req/s  "
+            f"p50 {summary['p50_ms']}ms  p95 {summary['p95_ms']}ms  "
+            f"p99 {summary['p99_ms']}ms  errors {summary['errors']}"
+        )
+    typer.echo(f"Results written to {output}")
+    if baseline:
+        _compare_reports(report, read_report(baseline), max_regression)
+
+
+@app.command("compare")
+def compare_command(
+    current: str = typer.Argument(..., help="Results of the new run"),
+    baseline: str = typer.Argument(..., help="Results to compare against"),
+    max_regression: float = typer.Option(10, help="Allowed regression in percent"),
+):
+    _compare_reports(read_report(current), read_report(baseline), max_regression)
+
+
+@app.command("compression")
+def compression_command(
+    urls: int = typer.Option(10000, help="Sample URLs to generate"),
+    min_length: int = typer.Option(128, help="Shortest URL that gets compressed"),
+    seed: int = typer.Option(42, help="Random seed for the sample URLs"),
+    output: str = typer.Option(None, help="Where to write the results"),
+):
+    # Size and CPU cost of URL compression, without DynamoDB or the app
+    results = compression.measure(compression.sample_urls(urls, seed), min_length)
+    for name, value in results.items():
+        typer.echo(f"{name:>24}: {value}")
+    if output:
+        params = {"urls": urls, "min_length": min_length, "seed": seed}
+        write_report(build_report(results, params), output)
+        typer.echo(f"Results written to {output}")
+
+
+def _compare_reports(current: dict, baseline: dict, max_regression: float):
+    if current["meta"]["params"] != baseline["meta"]["params"]:
+        typer.echo("Warning: the runs used different parameters", err=True)
+    lines, regressed = compare(current, baseline, max_regression)
+    typer.echo(
+        f"Comparing {current['meta']['commit']} against {baseline['meta']['commit']}:"
+    )
+    for line in lines:
+        typer.echo(line)
+    if regressed:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, HttpUrl, constr, field_validator, Field
+from pydantic import BaseModel, HttpUrl, conlist, constr, field_validator, Field
 from typing import Optional
+from enum import Enum
+from utils.constants import BATCH_SHORTEN_MAX_ITEMS
 
 
 # Define a pydantic model for request and response
@@ -16,6 +18,10 @@ class URLRequest(BaseModel):
         return value
 
 
+class BatchURLRequest(BaseModel):
+    urls: conlist(URLRequest, min_length=1, max_length=BATCH_SHORTEN_MAX_ITEMS)
+
+
 class CreateUserRequest(BaseModel):
     username: str
     password: str
@@ -30,3 +36,18 @@ class Token(BaseModel):
 class UpdateUrlLimitRequest(BaseModel):
     user_id: str
     new_limit: int
+
+
+class ExportFormat(str, Enum):
+    jsonl = "jsonl"
+    csv = "csv"
+
+
+class StatsGranularity(str, Enum):
+    hour = "hour"
+    day = "day"
+
+
+class UpdateUserStatusRequest(BaseModel):
+    user_id: str
+    disabled: bool
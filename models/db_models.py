@@ -1,14 +1,32 @@
 from pydantic import BaseModel, Field
 from decouple import config
 from pynamodb.models import Model
-from pynamodb.attributes import UnicodeAttribute, BooleanAttribute, NumberAttribute
+from pynamodb.attributes import (
+    UnicodeAttribute,
+    BooleanAttribute,
+    NumberAttribute,
+    BinaryAttribute,
+    VersionAttribute,
+)
 from pynamodb.connection.base import Connection
+from concurrent.futures import ThreadPoolExecutor
+import time
 from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
 import uuid
 from utils.logger_config import logger
 from utils.constants import (
     DYNAMODB_TABLE_CREATION_SUCCESS_LOG,
-    DYNAMODB_TABLE_CREATION_ERROR_LOG,
+    DYNAMODB_HOST,
+    DYNAMODB_MAX_POOL_CONNECTIONS,
+    DYNAMODB_CONNECT_TIMEOUT_SECONDS,
+    DYNAMODB_READ_TIMEOUT_SECONDS,
+    DYNAMODB_MAX_RETRY_ATTEMPTS,
+    DYNAMODB_BASE_BACKOFF_MS,
+    DYNAMODB_WARMUP_CONNECTIONS,
+    DYNAMODB_WARMUP_LOG,
+    DEDUP_ENABLED,
+    CLICK_TRACKING_ENABLED,
+    CLICK_HISTOGRAMS_ENABLED,
 )
 
 
@@ -44,17 +62,37 @@ Connection.AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY")
 Connection.AWS_REGION = config("AWS_REGION")
 
 
+class ConnectionMeta:
+    """
+    Connection settings shared by every table's Meta. Each model class keeps
+    its own connection pool, so the pool size applies per table and process.
+    """
+
+    region = config("AWS_REGION")
+    host = DYNAMODB_HOST or None
+    aws_access_key_id = config("AWS_ACCESS_KEY_ID")
+    aws_secret_access_key = config("AWS_SECRET_ACCESS_KEY")
+    max_pool_connections = DYNAMODB_MAX_POOL_CONNECTIONS
+    connect_timeout_seconds = DYNAMODB_CONNECT_TIMEOUT_SECONDS
+    read_timeout_seconds = DYNAMODB_READ_TIMEOUT_SECONDS
+    max_retry_attempts = DYNAMODB_MAX_RETRY_ATTEMPTS
+    base_backoff_ms = DYNAMODB_BASE_BACKOFF_MS
+
+
 class URLModel(Model):
     """
     A DynamoDB URL table
     """
 
-    class Meta:
+    class Meta(ConnectionMeta):
         table_name = "URLs"
 
     # Primary Key (Hash Key)
     short_url = UnicodeAttribute(hash_key=True)
-    url = UnicodeAttribute()
+    # Each item holds either url or url_compressed, see utils.url_compression.
+    # The storage backend decodes url_compressed into url on every read.
+    url = UnicodeAttribute(null=True)
+    url_compressed = BinaryAttribute(null=True)
     user_id = UnicodeAttribute()
 
     # GSI for querying by user_id
@@ -75,15 +113,20 @@ class UserModel(Model):
     A DynamoDB User table
     """
 
-    class Meta:
+    class Meta(ConnectionMeta):
         table_name = "Users"
 
     user_id = UnicodeAttribute(hash_key=True, default_for_new=generate_uuid, null=False)
     username = UnicodeAttribute()
     url_limit = NumberAttribute(default=3)
+    # Number of URLs owned by the user, maintained atomically with each URL insert.
+    # Null for users created before the counter existed until they are backfilled.
+    url_count = NumberAttribute(null=True, default_for_new=0)
     hashed_password = UnicodeAttribute()
     is_admin = BooleanAttribute(default=False)
     disabled = BooleanAttribute(default=False)
+    # Bumped whenever a change must revoke tokens carrying the user's old claims
+    token_version = NumberAttribute(default=0)
 
     # GSI for querying by username
     class UsernameIndex(GlobalSecondaryIndex):
@@ -100,21 +143,111 @@ class UserModel(Model):
     username_index = UsernameIndex()
 
 
-# Table creation
-try:
-    if not URLModel.exists():
-        URLModel.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+class CounterModel(Model):
+    """
+    A DynamoDB table of named atomic counters
+    """
+
+    class Meta(ConnectionMeta):
+        table_name = "Counters"
+
+    name = UnicodeAttribute(hash_key=True)
+    value = NumberAttribute(default=0)
+
+
+class ClickStatsModel(Model):
+    """
+    A DynamoDB table of click totals per short URL
+    """
+
+    class Meta(ConnectionMeta):
+        table_name = "ClickStats"
+
+    short_url = UnicodeAttribute(hash_key=True)
+    clicks = NumberAttribute(default=0)
+
+
+class ClickBucketModel(Model):
+    """
+    A DynamoDB table of hourly click counts and unique visitor sketches per short URL
+    """
+
+    class Meta(ConnectionMeta):
+        table_name = "ClickBuckets"
+
+    short_url = UnicodeAttribute(hash_key=True)
+    # UTC hour as YYYYMMDDHH, so buckets sort chronologically
+    bucket = UnicodeAttribute(range_key=True)
+    clicks = NumberAttribute(default=0)
+    # Serialized HyperLogLog of hashed visitor IPs and user agents
+    visitors = BinaryAttribute(null=True)
+    # Sketches are merged read-modify-write, guarded by optimistic locking
+    version = VersionAttribute()
+
+
+class URLDedupModel(Model):
+    """
+    A DynamoDB table of each user's shortened URLs, keyed by a hash of the user
+    ID and the normalized URL
+    """
+
+    class Meta(ConnectionMeta):
+        table_name = "URLDedup"
+
+    dedup_key = UnicodeAttribute(hash_key=True)
+    short_url = UnicodeAttribute()
+
+
+# Connection for transactions spanning the URL and User tables
+transaction_connection = Connection(
+    region=ConnectionMeta.region,
+    host=ConnectionMeta.host,
+    read_timeout_seconds=ConnectionMeta.read_timeout_seconds,
+    connect_timeout_seconds=ConnectionMeta.connect_timeout_seconds,
+    max_retry_attempts=ConnectionMeta.max_retry_attempts,
+    base_backoff_ms=ConnectionMeta.base_backoff_ms,
+    max_pool_connections=ConnectionMeta.max_pool_connections,
+    aws_access_key_id=ConnectionMeta.aws_access_key_id,
+    aws_secret_access_key=ConnectionMeta.aws_secret_access_key,
+)
+
+
+# Every table the app uses, in creation order
+TABLE_MODELS = [URLModel, UserModel, CounterModel]
+# Only provisioned when the features using them are enabled
+if CLICK_TRACKING_ENABLED:
+    TABLE_MODELS.append(ClickStatsModel)
+    if CLICK_HISTOGRAMS_ENABLED:
+        TABLE_MODELS.append(ClickBucketModel)
+if DEDUP_ENABLED:
+    TABLE_MODELS.append(URLDedupModel)
+
+
+def create_tables(wait: bool = True) -> list:
+    # Creates the tables that don't exist yet and returns their names. Called
+    # explicitly rather than on import, so importing the models never touches
+    # DynamoDB.
+    created = []
+    for model in TABLE_MODELS:
+        if model.exists():
+            continue
+        model.create_table(read_capacity_units=1, write_capacity_units=1, wait=wait)
         logger.info(
-            DYNAMODB_TABLE_CREATION_SUCCESS_LOG.format(
-                table_name=URLModel.Meta.table_name
-            )
+            DYNAMODB_TABLE_CREATION_SUCCESS_LOG.format(table_name=model.Meta.table_name)
         )
-    if not UserModel.exists():
-        UserModel.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
-        logger.info(
-            DYNAMODB_TABLE_CREATION_SUCCESS_LOG.format(
-                table_name=UserModel.Meta.table_name
-            )
+        created.append(model.Meta.table_name)
+    return created
+
+
+def warm_up_connections(connections_per_table: int = DYNAMODB_WARMUP_CONNECTIONS):
+    # Concurrent DescribeTable calls make each table's pool open that many
+    # connections, so the first requests don't pay for TLS handshakes
+    started = time.monotonic()
+    calls = [model for model in TABLE_MODELS for _ in range(connections_per_table)]
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        list(executor.map(lambda model: model.describe_table(), calls))
+    logger.info(
+        DYNAMODB_WARMUP_LOG.format(
+            connections=len(calls), seconds=round(time.monotonic() - started, 3)
         )
-except Exception as e:
-    logger.exception(DYNAMODB_TABLE_CREATION_ERROR_LOG.format(error=e))
+    )
@@ -1,13 +1,15 @@
-import uuid
+from typing import List
 from fastapi import HTTPException, status
-from .db_service import save_url
+from models.api_models import URLRequest
+from .db_service import save_url, save_urls_batch
+from . import id_service
 from utils.logger_config import logger
 from utils.constants import *
 
 
 def generate_short_url_id() -> str:
-    # Generate a UUID and remove hyphens, take first 10 characters and combine with Base Url
-    return str(uuid.uuid4()).replace("-", "")[:10]
+    # Delegates to the configured generator (random UUID or leased base62 IDs)
+    return id_service.id_generator.next_id()
 
 
 def create_custom_short_url(url: str, custom_short_url: str, user_id: str) -> dict:
@@ -23,8 +25,9 @@ def create_generated_short_url(url: str, user_id: str) -> dict:
     max_retries = 5
     for _ in range(max_retries):
         try:
-            short_url_id = generate_short_url_id()
-            save_url(url, short_url_id, user_id)
+            short_url_id = save_url(
+                url, generate_short_url_id(), user_id, dedup=DEDUP_ENABLED
+            )
             logger.info(GENERATED_SHORT_URL_LOG.format(short_url=short_url_id))
             return {"short_url": short_url_id}
         except HTTPException as http_exc:
@@ -36,3 +39,13 @@ def create_generated_short_url(url: str, user_id: str) -> dict:
     raise HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST, detail=ERROR_MAX_RETRIES
     )
+
+
+def create_short_urls_batch(url_requests: List[URLRequest], user_id: str) -> dict:
+    # One limit check for the whole batch, generated short URLs for items without one
+    results = save_urls_batch(
+        [(request.url, request.short_url) for request in url_requests],
+        user_id,
+        generate_short_url_id,
+    )
+    return {"results": results}
@@ -0,0 +1,115 @@
+from functools import partial
+from starlette.concurrency import run_in_threadpool
+from service import db_service, api_service
+from service.password_service import password_hasher
+from service.profiling_service import timed_phase
+from utils.constants import TIMING_PHASE_BCRYPT
+
+
+# Awaitable wrappers around the synchronous PynamoDB service functions.
+# Each call runs on the worker thread pool so DynamoDB round trips don't block
+# the event loop. The sync API in db_service is kept for the CLI and tests.
+async def run_sync(func, *args, **kwargs):
+    return await run_in_threadpool(partial(func, *args, **kwargs))
+
+
+async def save_url(url: str, short_url: str, user_id: str) -> bool:
+    return await run_sync(db_service.save_url, url, short_url, user_id)
+
+
+async def get_dedup_short_url(url: str, user_id: str):
+    return await run_sync(db_service.get_dedup_short_url, url, user_id)
+
+
+async def get_original_url(short_url: str):
+    # Cache hits are answered on the event loop, only misses need a thread
+    cached_url = db_service.get_cached_original_url(short_url)
+    if cached_url is not db_service.MISSING:
+        return cached_url
+    return await run_sync(db_service.lookup_original_url, short_url)
+
+
+async def get_all_urls():
+    return await run_sync(db_service.get_all_urls)
+
+
+async def get_urls_page(limit: int, cursor: str = None, user_id: str = None):
+    return await run_sync(db_service.get_urls_page, limit, cursor, user_id)
+
+
+async def create_user(username: str, password: str, admin: bool):
+    # bcrypt runs in the password process pool, only the save uses the thread pool
+    with timed_phase(TIMING_PHASE_BCRYPT):
+        hashed_password = await password_hasher.hash(password)
+    return await run_sync(db_service.save_new_user, username, hashed_password, admin)
+
+
+async def get_user_by_username(username: str):
+    return await run_sync(db_service.get_user_by_username, username)
+
+
+async def get_user_by_id(user_id: str):
+    return await run_sync(db_service.get_user_by_id, user_id)
+
+
+async def is_user_admin(user_id: str) -> bool:
+    return await run_sync(db_service.is_user_admin, user_id)
+
+
+async def update_user_password(user_id: str, new_password: str):
+    with timed_phase(TIMING_PHASE_BCRYPT):
+        hashed_password = await password_hasher.hash(new_password)
+    return await run_sync(db_service.update_password_hash, user_id, hashed_password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    with timed_phase(TIMING_PHASE_BCRYPT):
+        return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_urls_for_user(user_id: str):
+    return await run_sync(db_service.get_urls_for_user, user_id)
+
+
+async def get_user_url_info(user_id: str):
+    return await run_sync(db_service.get_user_url_info, user_id)
+
+
+async def url_limit_check(user_id: str) -> bool:
+    return await run_sync(db_service.url_limit_check, user_id)
+
+
+async def update_url_limit(user_id: str, new_limit: int):
+    return await run_sync(db_service.update_url_limit, user_id, new_limit)
+
+
+async def set_user_disabled(user_id: str, disabled: bool):
+    return await run_sync(db_service.set_user_disabled, user_id, disabled)
+
+
+async def get_click_count(short_url: str) -> int:
+    return await run_sync(db_service.get_click_count, short_url)
+
+
+async def get_click_histogram(short_url: str, start, end, granularity: str) -> dict:
+    return await run_sync(
+        db_service.get_click_histogram, short_url, start, end, granularity
+    )
+
+
+async def get_url_owner(short_url: str):
+    return await run_sync(db_service.get_url_owner, short_url)
+
+
+async def create_custom_short_url(url: str, custom_short_url: str, user_id: str):
+    return await run_sync(
+        api_service.create_custom_short_url, url, custom_short_url, user_id
+    )
+
+
+async def create_generated_short_url(url: str, user_id: str):
+    return await run_sync(api_service.create_generated_short_url, url, user_id)
+
+
+async def create_short_urls_batch(url_requests, user_id: str):
+    return await run_sync(api_service.create_short_urls_batch, url_requests, user_id)
@@ -2,17 +2,64 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from service.db_service import get_user_by_id, get_user_by_username, verify_password
+from starlette.concurrency import run_in_threadpool
+import time
+from typing import Optional
+from service.db_service import (
+    get_user_by_id,
+    get_user_by_username,
+    min_token_version,
+    remember_token_version,
+    update_password_hash,
+)
+from service.password_service import password_hasher, verify_and_update
+from service.profiling_service import timed_phase
 from models.db_models import UserInDB
-from utils.logger_config import logger
+from utils.cache import TTLCache, MISSING
+from utils.logger_config import logger, log_sampled
 from utils.constants import *
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Payloads of tokens whose signature was already verified, kept no longer than
+# the token itself is valid
+token_cache = TTLCache(TOKEN_CACHE_SIZE, JWT_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def token_claims(user) -> dict:
+    # The version is always embedded so later user changes can revoke the token.
+    # With JWT_EMBED_CLAIMS the authorization claims are embedded as well, so
+    # requests can be authorized without reading the user.
+    claims = {TOKEN_CLAIM_VERSION: user.token_version}
+    if JWT_EMBED_CLAIMS:
+        claims.update(
+            {
+                TOKEN_CLAIM_USERNAME: user.username,
+                TOKEN_CLAIM_ADMIN: user.is_admin,
+                TOKEN_CLAIM_URL_LIMIT: user.url_limit,
+                TOKEN_CLAIM_DISABLED: user.disabled,
+            }
+        )
+    return claims
+
+
+def _revoked_token_error(user_id: str) -> HTTPException:
+    logger.warning(TOKEN_REVOKED_LOG.format(user_id=user_id))
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=INVALID_CREDENTIALS_ERROR,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 
 def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
-    logger.info(GET_CURRENT_USER_INFO)
+    with timed_phase(TIMING_PHASE_AUTH):
+        return user_from_token(token)
+
+
+def user_from_token(token: str) -> UserInDB:
+    logger.debug(GET_CURRENT_USER_INFO)
     payload = decode_access_token(token)
     if not payload:
         logger.error(INVALID_CREDENTIALS_ERROR)
@@ -29,6 +76,29 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
             status_code=status.HTTP_401_UNAUTHORIZED, detail=INVALID_CREDENTIALS_ERROR
         )
 
+    token_version = payload.get(TOKEN_CLAIM_VERSION)
+    if token_version is None and JWT_REQUIRE_TOKEN_VERSION:
+        logger.warning(TOKEN_VERSION_MISSING_LOG.format(user_id=user_id))
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=INVALID_CREDENTIALS_ERROR,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    known_version = min_token_version(user_id)
+    if token_version is not None and known_version is not None:
+        if token_version < known_version:
+            raise _revoked_token_error(user_id)
+        if TOKEN_CLAIM_ADMIN in payload:
+            # Self-contained token, authorized from its claims alone
+            return UserInDB(
+                user_id=user_id,
+                username=payload[TOKEN_CLAIM_USERNAME],
+                url_limit=payload[TOKEN_CLAIM_URL_LIMIT],
+                is_admin=payload[TOKEN_CLAIM_ADMIN],
+                hashed_password="",
+                disabled=payload[TOKEN_CLAIM_DISABLED],
+            )
+
     user_in_db = get_user_by_id(user_id)
     if user_in_db is None:
         logger.warning(USER_NOT_FOUND_LOG.format(username=user_id))
@@ -36,6 +106,11 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=INACTIVE_OR_INVALID_USER_ERROR,
         )
+    if token_version is not None:
+        if TOKEN_CLAIM_ADMIN in payload:
+            remember_token_version(user_id, user_in_db.token_version)
+        if token_version < user_in_db.token_version:
+            raise _revoked_token_error(user_id)
     user_data = {
         "user_id": user_in_db.user_id,
         "username": user_in_db.username,
@@ -55,19 +130,65 @@ def get_current_active_user(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=INACTIVE_USER_ERROR
         )
-    logger.info(GET_ACTIVE_USER_LOG.format(username=current_user.username))
+    if log_sampled(LOG_EVENT_AUTH):
+        logger.info(GET_ACTIVE_USER_LOG, username=current_user.username)
     return current_user
 
 
 def authenticate_user(username: str, password: str):
     user = get_user_by_username(username)
-    if not user or not verify_password(password, user.hashed_password):
+    if not user:
+        logger.warning(INVALID_CREDENTIALS_ERROR.format(username=username))
+        return None
+    verified, new_hash = verify_and_update(password, user.hashed_password)
+    if not verified:
         logger.warning(INVALID_CREDENTIALS_ERROR.format(username=username))
         return None
+    if new_hash:
+        rehash_password(user, new_hash)
     logger.info(AUTHENTICATION_SUCCESS_LOG.format(username=username))
     return user
 
 
+async def authenticate_user_async(username: str, password: str):
+    # Same as authenticate_user, with bcrypt running in the password process pool
+    user = await run_in_threadpool(get_user_by_username, username)
+    if not user:
+        logger.warning(INVALID_CREDENTIALS_ERROR.format(username=username))
+        return None
+    with timed_phase(TIMING_PHASE_BCRYPT):
+        verified, new_hash = await password_hasher.verify_and_update(
+            password, user.hashed_password
+        )
+    if not verified:
+        logger.warning(INVALID_CREDENTIALS_ERROR.format(username=username))
+        return None
+    if new_hash:
+        await run_in_threadpool(rehash_password, user, new_hash)
+    logger.info(AUTHENTICATION_SUCCESS_LOG.format(username=username))
+    return user
+
+
+def rehash_password(user, new_hash: str):
+    # Transparently upgrade hashes made with an outdated bcrypt cost. The
+    # password itself is unchanged, so existing tokens stay valid.
+    update_password_hash(user.user_id, new_hash, revoke_existing_tokens=False)
+    logger.info(PASSWORD_REHASHED_LOG.format(username=user.username))
+
+
+def is_admin_token(authorization: Optional[str]) -> bool:
+    # Checks an Authorization header outside of route dependencies, for
+    # admin-only features such as request profiling
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user = user_from_token(token)
+    except HTTPException:
+        return False
+    return user.is_admin and not user.disabled
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -81,10 +202,17 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
 
 def decode_access_token(token: str):
+    payload = token_cache.get(token)
+    if payload is not MISSING:
+        return payload
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        logger.info(JWT_DECODE_SUCCESS_LOG)
-        return payload
+        logger.debug(JWT_DECODE_SUCCESS_LOG)
     except JWTError as e:
         logger.error(JWT_DECODE_ERROR_LOG.format(error=e))
         return None
+    # Expiry is enforced by letting the entry lapse when the token does
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        token_cache.set(token, payload, ttl=min(remaining, token_cache.ttl))
+    return payload
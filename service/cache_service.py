@@ -0,0 +1,156 @@
+import threading
+import time
+from typing import Optional
+from utils.logger_config import logger
+from utils.constants import *
+
+
+class InMemoryCacheBackend:
+    """
+    A process-local stand-in for the Redis backend, used by tests and local runs
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str, ttl: int = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SharedCacheBusyError(Exception):
+    """
+    Raised when every connection to the shared cache stayed in use for the
+    whole timeout. The cache itself is healthy, so this isn't a backend failure.
+    """
+
+
+class RedisCacheBackend:
+    """
+    A shared cache backend speaking the Redis protocol through a connection pool.
+    Calls wait up to the socket timeout for one of the pool's connections
+    instead of failing as soon as all of them are checked out.
+    """
+
+    def __init__(self, url: str, max_connections: int, socket_timeout: float):
+        # Imported lazily so redis is only needed when a shared cache is configured
+        import redis
+
+        self.max_connections = max_connections
+        self.wait_timeout = socket_timeout
+        # One slot per pooled connection, so the pool itself is never exhausted
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._pool = redis.ConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+            decode_responses=True,
+        )
+        self._client = redis.Redis(connection_pool=self._pool)
+
+    def _call(self, command, *args, **kwargs):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise SharedCacheBusyError(
+                SHARED_CACHE_BUSY_ERROR.format(max_connections=self.max_connections)
+            )
+        try:
+            return command(*args, **kwargs)
+        finally:
+            self._slots.release()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._call(self._client.get, key)
+
+    def set(self, key: str, value: str, ttl: int = None):
+        self._call(self._client.set, key, value, ex=ttl)
+
+    def delete(self, key: str):
+        self._call(self._client.delete, key)
+
+
+class SharedCache:
+    """
+    Cross-worker cache of short URL -> original URL mappings.
+    Backend failures are logged and treated as misses so callers fall back to
+    DynamoDB; after a failure the backend is skipped for a cool-down period.
+    A busy connection pool is only a miss, it doesn't start the cool-down.
+    """
+
+    def __init__(self, backend, ttl: int, retry_seconds: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.retry_seconds = retry_seconds
+        self._unavailable_until = 0.0
+
+    @staticmethod
+    def _url_key(short_url: str) -> str:
+        return SHARED_CACHE_URL_KEY.format(short_url=short_url)
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _mark_unavailable(self, error: Exception):
+        self._unavailable_until = time.monotonic() + self.retry_seconds
+        logger.warning(SHARED_CACHE_UNAVAILABLE_LOG.format(error=error))
+
+    def get_url(self, short_url: str) -> Optional[str]:
+        if not self._available():
+            return None
+        try:
+            return self.backend.get(self._url_key(short_url))
+        except SharedCacheBusyError:
+            return None
+        except Exception as e:
+            self._mark_unavailable(e)
+            return None
+
+    def set_url(self, short_url: str, url: str):
+        if not self._available():
+            return
+        try:
+            self.backend.set(self._url_key(short_url), url, ttl=self.ttl)
+        except SharedCacheBusyError:
+            return
+        except Exception as e:
+            self._mark_unavailable(e)
+
+
+def create_shared_cache() -> Optional[SharedCache]:
+    # The shared cache tier is optional and only enabled when a URL is configured
+    if not SHARED_CACHE_URL:
+        return None
+    if SHARED_CACHE_URL == SHARED_CACHE_IN_MEMORY_URL:
+        backend = InMemoryCacheBackend()
+    else:
+        backend = RedisCacheBackend(
+            SHARED_CACHE_URL,
+            max_connections=SHARED_CACHE_MAX_CONNECTIONS,
+            socket_timeout=SHARED_CACHE_TIMEOUT_SECONDS,
+        )
+    logger.info(SHARED_CACHE_ENABLED_LOG.format(backend=type(backend).__name__))
+    return SharedCache(
+        backend,
+        ttl=SHARED_CACHE_TTL_SECONDS,
+        retry_seconds=SHARED_CACHE_RETRY_SECONDS,
+    )
+
+
+shared_cache = create_shared_cache()
@@ -0,0 +1,204 @@
+import json
+import queue
+import threading
+import uuid
+from typing import Callable, Iterator, Optional
+from utils.logger_config import logger
+from utils.constants import *
+
+
+class InMemoryChangeFeedBackend:
+    """
+    A process-local stand-in for the Redis backend, used by tests and local runs
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def publish(self, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def listen(
+        self, stop: threading.Event, on_subscribed: Callable[[], None]
+    ) -> Iterator[str]:
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.append(subscriber)
+        on_subscribed()
+        try:
+            while not stop.is_set():
+                try:
+                    yield subscriber.get(timeout=CHANGE_FEED_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+        finally:
+            with self._lock:
+                self._subscribers.remove(subscriber)
+
+
+class RedisChangeFeedBackend:
+    """
+    Redis pub/sub channel every worker subscribes to. Delivery is at most once:
+    messages published while a worker is disconnected are lost to it.
+    """
+
+    def __init__(self, url: str, channel: str, socket_timeout: float):
+        # Imported lazily so redis is only needed when a change feed is configured
+        import redis
+
+        self.channel = channel
+        self._client = redis.Redis.from_url(
+            url,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+            decode_responses=True,
+        )
+
+    def publish(self, message: str):
+        self._client.publish(self.channel, message)
+
+    def listen(
+        self, stop: threading.Event, on_subscribed: Callable[[], None]
+    ) -> Iterator[str]:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        try:
+            # Reading the subscribe confirmation means the channel is live, and
+            # messages published from here on are buffered until they are read
+            message = pubsub.get_message(timeout=CHANGE_FEED_POLL_SECONDS)
+            on_subscribed()
+            while not stop.is_set():
+                if message:
+                    yield message["data"]
+                message = pubsub.get_message(timeout=CHANGE_FEED_POLL_SECONDS)
+        finally:
+            pubsub.close()
+
+
+class ChangeFeed:
+    """
+    Broadcasts URL and user changes to every worker so each can evict exactly
+    the affected entries from its in-process caches. Events a worker published
+    itself are skipped, its caches were already updated by the write.
+    Publishing is best effort: a failure is logged and the write still succeeds.
+    When the subscription fails, events may have been missed, so the caches are
+    reset wholesale before resubscribing. subscribed is set while every event
+    published by other workers is guaranteed to reach this one. A worker whose
+    publish failed keeps asking every other worker to reset the same way until
+    that request is published.
+    """
+
+    def __init__(self, backend, retry_seconds: float):
+        self.backend = backend
+        self.retry_seconds = retry_seconds
+        self.origin = uuid.uuid4().hex
+        self.published = 0
+        self.applied = 0
+        self.resets = 0
+        self.publish_errors = 0
+        self.subscribed = threading.Event()
+        self._resync_pending = threading.Event()
+        self._stop = threading.Event()
+
+    def publish(self, event_type: str, key: str, **fields) -> bool:
+        message = json.dumps(
+            {"type": event_type, "key": key, "origin": self.origin, **fields}
+        )
+        try:
+            self.backend.publish(message)
+            self.published += 1
+            return True
+        except Exception as e:
+            self.publish_errors += 1
+            logger.warning(CHANGE_FEED_PUBLISH_ERROR.format(error=e))
+            if event_type != CHANGE_EVENT_RESYNC:
+                # Other workers missed this change, they reset once told so
+                self._resync_pending.set()
+            return False
+
+    def _resync(self):
+        # Retried until it is published, a lost change must not stay unnoticed.
+        # Cleared before publishing so a failure in between isn't swallowed.
+        while True:
+            self._resync_pending.wait()
+            if self._stop.is_set():
+                return
+            self._resync_pending.clear()
+            if not self.publish(CHANGE_EVENT_RESYNC, ""):
+                self._resync_pending.set()
+                self._stop.wait(self.retry_seconds)
+
+    def _apply(
+        self,
+        message: str,
+        handler: Callable[[dict], None],
+        on_reset: Callable[[], None],
+    ):
+        try:
+            event = json.loads(message)
+            if event.get("origin") == self.origin:
+                return
+            if event["type"] == CHANGE_EVENT_RESYNC:
+                on_reset()
+                self.resets += 1
+            else:
+                handler(event)
+            self.applied += 1
+        except Exception as e:
+            logger.error(CHANGE_FEED_APPLY_ERROR.format(error=e))
+
+    def _run(self, handler: Callable[[dict], None], on_reset: Callable[[], None]):
+        while not self._stop.is_set():
+            try:
+                for message in self.backend.listen(self._stop, self.subscribed.set):
+                    self._apply(message, handler, on_reset)
+            except Exception as e:
+                self.subscribed.clear()
+                logger.error(CHANGE_FEED_SUBSCRIBE_ERROR.format(error=e))
+                on_reset()
+                self.resets += 1
+                self._stop.wait(self.retry_seconds)
+
+    def start(self, handler: Callable[[dict], None], on_reset: Callable[[], None]):
+        threading.Thread(
+            target=self._run, args=(handler, on_reset), name="change-feed", daemon=True
+        ).start()
+        threading.Thread(
+            target=self._resync, name="change-feed-resync", daemon=True
+        ).start()
+
+    def stop(self):
+        self._stop.set()
+        self._resync_pending.set()
+
+    def stats(self) -> dict:
+        return {
+            "subscribed": self.subscribed.is_set(),
+            "published": self.published,
+            "applied": self.applied,
+            "resets": self.resets,
+            "publish_errors": self.publish_errors,
+        }
+
+
+def create_change_feed() -> Optional[ChangeFeed]:
+    # The change feed is optional and only enabled when a URL is configured
+    if not CHANGE_FEED_URL:
+        return None
+    if CHANGE_FEED_URL == CHANGE_FEED_IN_MEMORY_URL:
+        backend = InMemoryChangeFeedBackend()
+    else:
+        backend = RedisChangeFeedBackend(
+            CHANGE_FEED_URL,
+            channel=CHANGE_FEED_CHANNEL,
+            socket_timeout=CHANGE_FEED_TIMEOUT_SECONDS,
+        )
+    logger.info(CHANGE_FEED_ENABLED_LOG.format(backend=type(backend).__name__))
+    return ChangeFeed(backend, retry_seconds=CHANGE_FEED_RETRY_SECONDS)
+
+
+change_feed = create_change_feed()
@@ -0,0 +1,251 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from service.db_service import add_clicks, merge_click_bucket
+from service.storage import StorageTableMissingError
+from utils.hyperloglog import HyperLogLog
+from utils.logger_config import logger
+from utils.constants import *
+
+
+class PendingBucket:
+    """
+    Clicks and unique visitor sketch of one short URL in one hour, not yet written
+    """
+
+    __slots__ = ("clicks", "visitors")
+
+    def __init__(self, precision: int):
+        self.clicks = 0
+        self.visitors = HyperLogLog(precision)
+
+
+class ClickAggregator:
+    """
+    Counts redirects in memory and periodically writes the totals to the stats
+    table, one atomic ADD per short URL, so a redirect never waits on a write.
+    The buffer holds at most max_keys short URLs; clicks that don't fit, or
+    that can't be written back after a failed flush, are dropped and counted.
+    With write_bucket set, clicks and visitors are also sketched per hour.
+    Writes of a flush run on flush_workers threads. When a table is missing,
+    what it records is disabled with one warning instead of failing every flush.
+    """
+
+    def __init__(
+        self,
+        write_clicks: Callable[[str, int], None],
+        max_keys: int,
+        flush_threshold: int,
+        flush_seconds: float,
+        write_bucket: Optional[Callable[[str, str, int, HyperLogLog], None]] = None,
+        hll_precision: int = HLL_PRECISION,
+        flush_workers: int = 1,
+    ):
+        self.write_clicks = write_clicks
+        self.flush_workers = flush_workers
+        self.disabled = False
+        self.write_bucket = write_bucket
+        self.hll_precision = hll_precision
+        self.max_keys = max_keys
+        self.flush_threshold = flush_threshold
+        self.flush_seconds = flush_seconds
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.dropped_bucket_clicks = 0
+        self.flush_errors = 0
+        self.last_flush_seconds = None
+        self._counts: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[str, str], PendingBucket] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, short_url: str, visitor: str = None):
+        with self._lock:
+            if self.disabled:
+                return
+            if short_url in self._counts:
+                self._counts[short_url] += 1
+            elif len(self._counts) < self.max_keys:
+                self._counts[short_url] = 1
+            else:
+                self.dropped += 1
+                return
+            if self.write_bucket is not None:
+                self._record_bucket(short_url, visitor)
+            self.recorded += 1
+            self._pending += 1
+            if self._pending >= self.flush_threshold:
+                self._wake.set()
+
+    def _record_bucket(self, short_url: str, visitor: Optional[str]):
+        key = (short_url, time.strftime(CLICK_BUCKET_FORMAT, time.gmtime()))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            # Keeps the bucket buffer within the same bound as the totals
+            if len(self._buckets) >= self.max_keys:
+                self.dropped_bucket_clicks += 1
+                return
+            bucket = self._buckets[key] = PendingBucket(self.hll_precision)
+        bucket.clicks += 1
+        if visitor:
+            bucket.visitors.add(visitor)
+
+    def pending(self, short_url: str) -> int:
+        with self._lock:
+            return self._counts.get(short_url, 0)
+
+    def _restore(self, short_url: str, clicks: int):
+        # Put back clicks from a failed write, unless the buffer filled up since
+        with self._lock:
+            if self.disabled:
+                return
+            if short_url in self._counts or len(self._counts) < self.max_keys:
+                self._counts[short_url] = self._counts.get(short_url, 0) + clicks
+                self._pending += clicks
+            else:
+                self.dropped += clicks
+                logger.warning(CLICKS_DROPPED_LOG.format(clicks=clicks))
+
+    def _restore_bucket(self, key: Tuple[str, str], bucket: PendingBucket):
+        with self._lock:
+            if self.write_bucket is None:
+                return
+            pending = self._buckets.get(key)
+            if pending is not None:
+                pending.clicks += bucket.clicks
+                pending.visitors.merge(bucket.visitors)
+            elif len(self._buckets) < self.max_keys:
+                self._buckets[key] = bucket
+            else:
+                self.dropped_bucket_clicks += bucket.clicks
+
+    def _disable(self, feature: str, error: Exception):
+        # Logged once, the writes of the rest of the flush fail the same way
+        with self._lock:
+            if feature == CLICK_FEATURE_HISTOGRAMS:
+                already_disabled = self.write_bucket is None
+                self.write_bucket = None
+                self._buckets = {}
+            else:
+                already_disabled = self.disabled
+                self.disabled = True
+                self._counts, self._buckets = {}, {}
+                self._pending = 0
+        if not already_disabled:
+            logger.warning(
+                CLICK_TABLE_MISSING_WARNING.format(feature=feature, error=error)
+            )
+
+    def _write_bucket(self, key: Tuple[str, str], bucket: PendingBucket):
+        short_url, hour = key
+        write_bucket = self.write_bucket
+        if write_bucket is None:
+            # Disabled by an earlier write of this flush
+            return
+        try:
+            write_bucket(short_url, hour, bucket.clicks, bucket.visitors)
+        except StorageTableMissingError as e:
+            self._disable(CLICK_FEATURE_HISTOGRAMS, e)
+        except Exception as e:
+            with self._lock:
+                self.flush_errors += 1
+            logger.error(CLICKS_FLUSH_ERROR.format(short_url=short_url, error=e))
+            self._restore_bucket(key, bucket)
+
+    def _write_clicks(self, short_url: str, clicks: int) -> int:
+        if self.disabled:
+            return 0
+        try:
+            self.write_clicks(short_url, clicks)
+            return clicks
+        except StorageTableMissingError as e:
+            self._disable(CLICK_FEATURE_TRACKING, e)
+        except Exception as e:
+            with self._lock:
+                self.flush_errors += 1
+            logger.error(CLICKS_FLUSH_ERROR.format(short_url=short_url, error=e))
+            self._restore(short_url, clicks)
+        return 0
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, {}
+                buckets, self._buckets = self._buckets, {}
+                self._pending = 0
+            if not counts and not buckets:
+                return 0
+            started = time.monotonic()
+            # Each bucket is a read and a conditional write, so they are
+            # written concurrently with the totals
+            with ThreadPoolExecutor(
+                max_workers=self.flush_workers, thread_name_prefix="click-flush"
+            ) as executor:
+                for key, bucket in buckets.items():
+                    executor.submit(self._write_bucket, key, bucket)
+                flushed = sum(
+                    executor.map(self._write_clicks, counts.keys(), counts.values())
+                )
+            self.flushed += flushed
+            self.last_flush_seconds = round(time.monotonic() - started, 3)
+            logger.info(CLICKS_FLUSHED_LOG.format(clicks=flushed, urls=len(counts)))
+            return flushed
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="click-aggregator", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        # Wakes the flush thread one last time so buffered clicks aren't lost
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered_urls = len(self._counts)
+            pending = self._pending
+        return {
+            "disabled": self.disabled,
+            "histograms": self.write_bucket is not None,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "pending": pending,
+            "buffered_urls": buffered_urls,
+            "dropped": self.dropped,
+            "dropped_bucket_clicks": self.dropped_bucket_clicks,
+            "flush_errors": self.flush_errors,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+
+click_aggregator = (
+    ClickAggregator(
+        add_clicks,
+        max_keys=CLICK_BUFFER_MAX_KEYS,
+        flush_threshold=CLICK_FLUSH_THRESHOLD,
+        flush_seconds=CLICK_FLUSH_INTERVAL_SECONDS,
+        write_bucket=merge_click_bucket if CLICK_HISTOGRAMS_ENABLED else None,
+        flush_workers=CLICK_FLUSH_WORKERS,
+    )
+    if CLICK_TRACKING_ENABLED
+    else None
+)
@@ -1,45 +1,95 @@
 from fastapi import HTTPException, status
-from pynamodb.exceptions import PutError, DoesNotExist, PynamoDBConnectionError
-from passlib.context import CryptContext
 from models.db_models import URLModel, UserModel
-from utils.logger_config import logger
+from service import cache_service
+from service import change_feed_service
+from service import prefilter_service
+from service import storage
+from service.storage import StorageError, StorageUnavailableError, WriteConflictError
+from service.password_service import hash_password, verify_password
+from utils.cache import TTLCache, MISSING
+from utils.hyperloglog import HyperLogLog
+from utils.logger_config import logger, log_sampled
+from utils.urls import url_dedup_key
 from utils.constants import *
+from typing import Callable, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import base64
+import itertools
+import json
 import traceback
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Short URL -> original URL mappings never change once written, so they can be
+# cached in-process. A cached None is a negative entry for a missing short URL.
+redirect_cache = TTLCache(REDIRECT_CACHE_SIZE, REDIRECT_CACHE_TTL_SECONDS)
 
+# Authenticated principals by user_id, so a request reads its user at most once
+# per TTL window. Entries are invalidated whenever the user item is changed,
+# in every worker when the change feed is enabled.
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# Lowest token version still accepted per user. Tokens embedding claims are
+# trusted without a user read only while this holds an entry for the user,
+# otherwise the version is checked against the stored user and remembered.
+# Revocations are tracked for as long as a token issued before them is valid.
+token_versions = TTLCache(TOKEN_VERSION_CACHE_SIZE, JWT_TOKEN_EXPIRE_MINUTES * 60)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def save_url(url: str, short_url: str, user_id: str) -> bool:
+def save_url(url: str, short_url: str, user_id: str, dedup: bool = False) -> str:
+    # Returns the short URL the URL is stored under. With dedup that is the
+    # existing one if the user shortened the same URL concurrently.
+    dedup_key = url_dedup_key(user_id, str(url)) if dedup else None
     try:
         # Directly use the provided data to create a new URLModel instance,
         # Object of type Url is not JSON serializable so cast url as string
         new_url = URLModel(short_url=short_url, url=str(url), user_id=user_id)
-        # Save the new URLModel instance with a condition to ensure uniqueness of the short URL
-        new_url.save(condition=URLModel.short_url.does_not_exist())
+        try:
+            insert_url(new_url, dedup_key)
+        except WriteConflictError as e:
+            # Users created before url_count existed fail the limit condition,
+            # so backfill their counter once and retry the insert
+            limit_failed = _condition_failed(e, USER_ITEM_INDEX)
+            if not limit_failed or not _backfill_if_missing(user_id):
+                raise
+            insert_url(new_url, dedup_key)
+        _cache_new_url(new_url)
 
         logger.info(SAVED_URL_LOG.format(url=url, short_url=short_url))
-        return True
-    except PutError as e:
-        # Checks if conditional save failed due to database already containing that short_url
-        if "ConditionalCheckFailedException" in str(e):
+        return short_url
+    except WriteConflictError as e:
+        existing_short_url = None
+        if dedup and _condition_failed(e, DEDUP_ITEM_INDEX):
+            try:
+                existing_short_url = storage.backend.get_dedup_short_url(dedup_key)
+            except StorageUnavailableError:
+                logger.error(DATABASE_UNREACHABLE_ERROR)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=DATABASE_UNREACHABLE_ERROR,
+                )
+        if existing_short_url:
+            logger.info(
+                DEDUP_HIT_LOG.format(short_url=existing_short_url, user_id=user_id)
+            )
+            return existing_short_url
+        # Checks if the write failed due to database already containing that short_url
+        elif _condition_failed(e, URL_ITEM_INDEX):
             logger.warning(SHORT_URL_EXISTS_WARNING.format(short_url=short_url))
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail=SHORT_URL_EXISTS_WARNING.format(short_url=short_url),
             )
-        # Raise any other PutError that isn't the result of a conflicting short_url
+        # Or because the user already owns as many URLs as their limit allows
+        elif _condition_failed(e, USER_ITEM_INDEX):
+            logger.warning(URL_LIMIT_REACHED_LOG.format(username=user_id))
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=URL_LIMIT_REACHED_LOG.format(username=user_id),
+            )
+        # Raise any other error that isn't the result of a failed condition
         else:
             logger.error(UNEXPECTED_ERROR.format(error=e))
             raise
-    except PynamoDBConnectionError:
+    except StorageUnavailableError:
         logger.error(DATABASE_UNREACHABLE_ERROR)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -47,26 +97,242 @@ def save_url(url: str, short_url: str, user_id: str) -> bool:
         )
 
 
-def get_original_url(short_url: str):
+def insert_url(new_url: URLModel, dedup_key: str = None):
+    # Insert the URL and increment the owner's url_count in a single atomic write,
+    # so the limit check and the insert can't race with concurrent shortens
+    storage.backend.insert_url(new_url, dedup_key=dedup_key)
+
+
+def get_dedup_short_url(url: str, user_id: str) -> Optional[str]:
+    # The user's existing short URL for url, if they shortened it with dedup
     try:
-        url_item = URLModel.get(hash_key=short_url)
-        logger.info(RETRIEVED_ORIGINAL_URL_LOG.format(short_url=short_url))
-        return url_item.url
-    except DoesNotExist:
-        logger.info(SHORT_URL_NOT_EXIST_LOG.format(short_url=short_url))
-        # Return None to indicate short_url not found
+        short_url = storage.backend.get_dedup_short_url(url_dedup_key(user_id, url))
+    except StorageError as e:
+        # Shorten as usual, the insert still can't create a duplicate
+        logger.warning(UNEXPECTED_ERROR.format(error=e))
+        return None
+    if short_url is not None:
+        logger.info(DEDUP_HIT_LOG.format(short_url=short_url, user_id=user_id))
+    return short_url
+
+
+def _cache_new_url(new_url: URLModel):
+    # Replaces any negative entry cached for this short URL
+    redirect_cache.set(new_url.short_url, new_url.url)
+    if cache_service.shared_cache:
+        cache_service.shared_cache.set_url(new_url.short_url, new_url.url)
+    if prefilter_service.redirect_prefilter:
+        prefilter_service.redirect_prefilter.add(new_url.short_url)
+    # Other workers may hold a negative entry for it
+    if change_feed_service.change_feed:
+        change_feed_service.change_feed.publish(CHANGE_EVENT_URL, new_url.short_url)
+
+
+def insert_urls(new_urls: List[URLModel], user_id: str, url_count: int):
+    # Insert a chunk of URLs and advance the owner's url_count in one atomic write.
+    # The expected url_count makes the limit check atomic with the insert.
+    storage.backend.insert_urls(new_urls, user_id, url_count)
+
+
+def save_urls_batch(
+    url_requests: List[Tuple[str, Optional[str]]],
+    user_id: str,
+    generate_short_url_id: Callable[[], str],
+) -> List[dict]:
+    """
+    Saves (url, custom short_url or None) pairs for one user with a single limit
+    check, writing in transactional chunks. Returns one result per request.
+    """
+    results = [
+        {"url": str(url), "short_url": short_url, "status": None, "detail": None}
+        for url, short_url in url_requests
+    ]
+
+    def mark(index: int, batch_status: str, detail: str = None):
+        results[index]["status"] = batch_status
+        results[index]["detail"] = detail
+
+    pending = []
+    generated = set()
+    custom_short_urls = set()
+    for index, (url, short_url) in enumerate(url_requests):
+        # A custom short URL repeated within the batch conflicts with its first use
+        if short_url in custom_short_urls:
+            mark(
+                index,
+                BATCH_STATUS_CONFLICT,
+                SHORT_URL_EXISTS_WARNING.format(short_url=short_url),
+            )
+            continue
+        if short_url:
+            custom_short_urls.add(short_url)
+        else:
+            results[index]["short_url"] = generate_short_url_id()
+            generated.add(index)
+        pending.append(index)
+
+    try:
+        user = storage.backend.get_user(user_id)
+        if user is None:
+            logger.error(USER_NOT_FOUND_LOG.format(username=user_id))
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=USER_NOT_FOUND_LOG.format(username=user_id),
+            )
+        url_limit, url_count = user.url_limit, user.url_count
+        if url_count is None:
+            url_count = backfill_url_count(user)
+
+        retries = 0
+        while pending:
+            # Items that don't fit under the URL limit are rejected
+            remaining = max(url_limit - url_count, 0)
+            for index in pending[remaining:]:
+                mark(
+                    index,
+                    BATCH_STATUS_REJECTED,
+                    URL_LIMIT_REACHED_LOG.format(username=user_id),
+                )
+            chunk = pending[: min(remaining, BATCH_WRITE_CHUNK_SIZE)]
+            pending = pending[len(chunk) : remaining]
+            if not chunk:
+                break
+
+            new_urls = [
+                URLModel(
+                    short_url=results[index]["short_url"],
+                    url=results[index]["url"],
+                    user_id=user_id,
+                )
+                for index in chunk
+            ]
+            try:
+                insert_urls(new_urls, user_id, url_count)
+            except WriteConflictError as e:
+                retries += 1
+                if retries > BATCH_MAX_RETRIES:
+                    logger.error(ERROR_MAX_RETRIES)
+                    for index in chunk + pending:
+                        mark(index, BATCH_STATUS_REJECTED, ERROR_MAX_RETRIES)
+                    break
+                # The whole chunk was cancelled: regenerate taken generated short
+                # URLs, report taken custom ones and retry the rest
+                conflicts = [
+                    index
+                    for position, index in enumerate(chunk)
+                    if _condition_failed(e, position)
+                ]
+                for index in conflicts:
+                    if index in generated:
+                        results[index]["short_url"] = generate_short_url_id()
+                    else:
+                        short_url = results[index]["short_url"]
+                        logger.warning(
+                            SHORT_URL_EXISTS_WARNING.format(short_url=short_url)
+                        )
+                        mark(
+                            index,
+                            BATCH_STATUS_CONFLICT,
+                            SHORT_URL_EXISTS_WARNING.format(short_url=short_url),
+                        )
+                if not conflicts:
+                    if not _condition_failed(e, len(chunk)):
+                        raise
+                    # Another request changed the user's URL count or limit
+                    user = storage.backend.get_user(user_id)
+                    url_limit, url_count = user.url_limit, user.url_count
+                pending = [i for i in chunk if results[i]["status"] is None] + pending
+                continue
+
+            for new_url, index in zip(new_urls, chunk):
+                _cache_new_url(new_url)
+                mark(index, BATCH_STATUS_CREATED)
+            url_count += len(chunk)
+    except StorageUnavailableError:
+        logger.error(DATABASE_UNREACHABLE_ERROR)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=DATABASE_UNREACHABLE_ERROR,
+        )
+    except StorageError as e:
+        logger.error(UNEXPECTED_ERROR.format(error=e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=UNEXPECTED_ERROR.format(error=e),
+        )
+
+    # Only created items have a short URL that leads to their URL, the others
+    # were never stored or belong to someone else
+    for result in results:
+        if result["status"] != BATCH_STATUS_CREATED:
+            result["short_url"] = None
+    created = sum(result["status"] == BATCH_STATUS_CREATED for result in results)
+    logger.info(
+        BATCH_SAVED_URLS_LOG.format(
+            created=created, total=len(results), user_id=user_id
+        )
+    )
+    return results
+
+
+def _condition_failed(error: WriteConflictError, item_index: int) -> bool:
+    # Items are numbered in the order they were passed to the write
+    return item_index in error.failed_items
+
+
+def get_cached_original_url(short_url: str):
+    # Only reads process memory, so it is safe to call on the event loop
+    cached_url = redirect_cache.get(short_url)
+    if cached_url is not MISSING:
+        logger.debug(REDIRECT_CACHE_HIT_LOG, short_url=short_url)
+    return cached_url
+
+
+def get_original_url(short_url: str):
+    cached_url = get_cached_original_url(short_url)
+    if cached_url is not MISSING:
+        return cached_url
+    return lookup_original_url(short_url)
+
+
+def lookup_original_url(short_url: str):
+    # Resolves a short URL that isn't in the redirect cache
+    # Short URLs missing from the prefilter definitely don't exist
+    prefilter = prefilter_service.redirect_prefilter
+    if prefilter and not prefilter.might_contain(short_url):
+        logger.debug(REDIRECT_PREFILTER_REJECTED_LOG, short_url=short_url)
         return None
+    shared_cache = cache_service.shared_cache
+    if shared_cache:
+        shared_url = shared_cache.get_url(short_url)
+        if shared_url is not None:
+            redirect_cache.set(short_url, shared_url)
+            return shared_url
+    try:
+        url_item = storage.backend.get_url(short_url)
     except Exception as e:
         logger.exception(UNEXPECTED_ERROR.format(error=e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ERROR_RETRIEVING_ALL_URLS_LOG.format(error=e),
         )
+    if url_item is None:
+        if log_sampled(LOG_EVENT_REDIRECT):
+            logger.info(SHORT_URL_NOT_EXIST_LOG, short_url=short_url)
+        redirect_cache.set(short_url, None, ttl=REDIRECT_CACHE_NEGATIVE_TTL_SECONDS)
+        # Return None to indicate short_url not found
+        return None
+    if log_sampled(LOG_EVENT_REDIRECT):
+        logger.info(RETRIEVED_ORIGINAL_URL_LOG, short_url=short_url)
+    redirect_cache.set(short_url, url_item.url)
+    if shared_cache:
+        shared_cache.set_url(short_url, url_item.url)
+    return url_item.url
 
 
 def get_all_urls():
     try:
-        urls = [item for item in URLModel.scan()]
+        urls = list(storage.backend.scan_urls())
         logger.info(RETRIEVED_ALL_URLS_LOG)
         return [
             {"short_url": item.short_url, "original_url": item.url} for item in urls
@@ -80,12 +346,15 @@ def get_all_urls():
 
 
 def create_user(username: str, password: str, admin: bool):
+    save_new_user(username, hash_password(password), admin)
+
+
+def save_new_user(username: str, hashed_password: str, admin: bool):
     try:
-        hashed_password = hash_password(password)
         new_user = UserModel(
             username=username, hashed_password=hashed_password, is_admin=admin
         )
-        new_user.save()
+        storage.backend.save_user(new_user)
         logger.info(USER_CREATED_LOG.format(username=username))
     except Exception as e:
         logger.error(USER_CREATION_FAILURE_LOG.format(username=username, error=e))
@@ -97,20 +366,13 @@ def create_user(username: str, password: str, admin: bool):
 
 def get_user_by_username(username: str):
     try:
-        # Query the GSI for the user with the matching username
-        matching_users = UserModel.username_index.query(username)
-
-        # Attempt to get the first result from the query
-        user = next(matching_users, None)
+        user = storage.backend.get_user_by_username(username)
         if user is None:
             logger.info(USER_NOT_FOUND_LOG.format(username=username))
             return None
 
         logger.info(USER_RETRIEVED_LOG.format(user_id=username))
         return user
-    except UserModel.DoesNotExist:
-        logger.info(USER_NOT_FOUND_LOG.format(username=username))
-        return None
     except Exception as e:
         logger.error(UNEXPECTED_ERROR.format(error=e))
         raise HTTPException(
@@ -120,14 +382,11 @@ def get_user_by_username(username: str):
 
 
 def get_user_by_id(user_id: str):
+    cached_user = user_cache.get(user_id)
+    if cached_user is not MISSING:
+        return cached_user
     try:
-        logger.info(f"Getting current user by user_id:{user_id}")
-        user = UserModel.get(user_id)
-        logger.info(USER_RETRIEVED_LOG.format(user_id=user_id))
-        return user
-    except DoesNotExist:
-        logger.info(USER_NOT_FOUND_LOG.format(username=user_id))
-        return None
+        user = storage.backend.get_user(user_id)
     except Exception as e:
         trace = traceback.format_exc()
         logger.error(f"Unexpected error occurred: {e}, Trace: {trace}")
@@ -136,40 +395,73 @@ def get_user_by_id(user_id: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=UNEXPECTED_ERROR.format(error=e),
         )
+    if user is None:
+        logger.info(USER_NOT_FOUND_LOG.format(username=user_id))
+        return None
+    logger.debug(USER_RETRIEVED_LOG, user_id=user_id)
+    user_cache.set(user_id, user)
+    return user
 
 
 def is_user_admin(user_id: str) -> bool:
-    try:
-        user = UserModel.get(user_id)
-        return user.is_admin
-    except UserModel.DoesNotExist:
+    # Shares the principal cache with get_current_user
+    user = get_user_by_id(user_id)
+    if user is None:
         logger.error(USER_NOT_FOUND_LOG.format(username=user_id))
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=USER_NOT_FOUND_LOG.format(username=user_id),
         )
-    except Exception as e:
-        logger.error(UNEXPECTED_ERROR.format(username=user_id, error=e))
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=UNEXPECTED_ERROR.format(username=user_id, error=e),
-        )
+    return user.is_admin
+
+
+def invalidate_user(user_id: str):
+    user_cache.delete(user_id)
+
+
+def revoke_tokens(user_id: str, token_version: int):
+    token_versions.set(user_id, token_version)
+    logger.info(TOKENS_REVOKED_LOG.format(user_id=user_id, version=token_version))
+
+
+def remember_token_version(user_id: str, token_version: int):
+    # Expires like a cached user even with the change feed: publishing is best
+    # effort, so a revocation by another worker may only be seen on a re-read
+    token_versions.set(user_id, token_version, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def min_token_version(user_id: str) -> Optional[int]:
+    # None when this worker doesn't know, e.g. after a restart or an eviction
+    version = token_versions.get(user_id)
+    return None if version is MISSING else version
 
 
 def update_user_password(user_id: str, new_password: str):
+    update_password_hash(user_id, hash_password(new_password))
+
+
+def update_password_hash(
+    user_id: str, hashed_password: str, revoke_existing_tokens: bool = True
+):
+    update_user_attributes(
+        user_id,
+        {"hashed_password": hashed_password},
+        revoke_existing_tokens=revoke_existing_tokens,
+    )
+    logger.info(PASSWORD_UPDATED_LOG.format(username=user_id))
+
+
+def update_user_attributes(
+    user_id: str, changes: dict, revoke_existing_tokens: bool = True
+):
+    # Updates only the given attributes, so counters such as url_count that
+    # change concurrently are never overwritten with a stale value. Changes
+    # that alter a token claim revoke the tokens issued before them.
     try:
-        user = UserModel.get(user_id)
-        hashed_password = hash_password(new_password)
-        user.hashed_password = hashed_password
-        user.save()
-        logger.info(PASSWORD_UPDATED_LOG.format(username=user_id))
-    except UserModel.DoesNotExist:
-        logger.error(USER_NOT_FOUND_LOG.format(username=user_id))
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=USER_NOT_FOUND_LOG.format(username=user_id),
+        user = storage.backend.update_user(
+            user_id, changes, bump_token_version=revoke_existing_tokens
         )
-    except PynamoDBConnectionError:
+    except StorageUnavailableError:
         logger.error(DATABASE_UNREACHABLE_ERROR)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -181,51 +473,177 @@ def update_user_password(user_id: str, new_password: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=UNEXPECTED_ERROR.format(error=e),
         )
+    if user is None:
+        logger.error(USER_NOT_FOUND_LOG.format(username=user_id))
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=USER_NOT_FOUND_LOG.format(username=user_id),
+        )
+    invalidate_user(user_id)
+    if revoke_existing_tokens:
+        revoke_tokens(user_id, user.token_version)
+    if change_feed_service.change_feed:
+        change_feed_service.change_feed.publish(
+            CHANGE_EVENT_USER,
+            user_id,
+            token_version=user.token_version if revoke_existing_tokens else None,
+        )
+
+
+def apply_change(event: dict):
+    # Applies a change another worker published to this worker's caches
+    key = event["key"]
+    if event["type"] == CHANGE_EVENT_URL:
+        redirect_cache.delete(key)
+        if prefilter_service.redirect_prefilter:
+            prefilter_service.redirect_prefilter.add(key)
+    elif event["type"] == CHANGE_EVENT_USER:
+        invalidate_user(key)
+        token_version = event.get("token_version")
+        if token_version is not None and token_version > (min_token_version(key) or 0):
+            revoke_tokens(key, token_version)
+
+
+def reset_caches():
+    # Used when changes may have been missed. Token versions are read from the
+    # stored users again, which hold every revocation.
+    redirect_cache.clear()
+    user_cache.clear()
+    token_versions.clear()
+    # Short URLs saved on other workers may be missing from the filter
+    if prefilter_service.redirect_prefilter:
+        prefilter_service.redirect_prefilter.invalidate()
+
+
+def update_url_limit(user_id: str, new_limit: int):
+    update_user_attributes(user_id, {"url_limit": new_limit})
+    logger.info(URL_LIMIT_UPDATED_LOG.format(user_id=user_id, url_limit=new_limit))
+
+
+def set_user_disabled(user_id: str, disabled: bool):
+    update_user_attributes(user_id, {"disabled": disabled})
+    logger.info(USER_STATUS_UPDATED_LOG.format(user_id=user_id, disabled=disabled))
 
 
 def get_urls_for_user(user_id: str):
     try:
         logger.info(RETRIEVING_USER_URLS_LOG.format(user_id=user_id))
         # Fetch the current URLs associated with the user
-        urls = list(URLModel.user_id_index.query(user_id))
+        urls = list(storage.backend.query_user_urls(user_id))
 
         return [
             {"short_url": item.short_url, "original_url": item.url} for item in urls
         ]
-    except DoesNotExist:
-        logger.info(USER_NOT_FOUND_LOG.format(username=user_id))
+    except StorageUnavailableError:
+        logger.error(DATABASE_UNREACHABLE_ERROR)
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=USER_NOT_FOUND_LOG.format(username=user_id),
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=DATABASE_UNREACHABLE_ERROR,
+        )
+    except Exception as e:
+        logger.error(UNEXPECTED_ERROR.format(user_id=user_id, error=e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=UNEXPECTED_ERROR.format(error=e),
+        )
+
+
+def encode_cursor(last_evaluated_key: Optional[dict]) -> Optional[str]:
+    # Opaque, URL-safe cursor wrapping the backend's key to resume from
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    if not cursor:
+        return None
+    try:
+        start_key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        start_key = None
+    # Anything but a key of the URL table would fail deep in the backend
+    if (
+        not isinstance(start_key, dict)
+        or "short_url" not in start_key
+        or not start_key.keys() <= CURSOR_KEY_ATTRIBUTES
+        or not all(isinstance(value, (str, dict)) for value in start_key.values())
+    ):
+        logger.warning(INVALID_CURSOR_ERROR)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_CURSOR_ERROR
         )
-    except PynamoDBConnectionError:
+    return start_key
+
+
+def get_urls_page(limit: int, cursor: str = None, user_id: str = None) -> dict:
+    start_key = decode_cursor(cursor)
+    try:
+        items, last_key = storage.backend.get_urls_page(limit, start_key, user_id)
+        urls = [
+            {"short_url": item.short_url, "original_url": item.url} for item in items
+        ]
+        logger.info(RETRIEVED_URLS_PAGE_LOG.format(count=len(urls)))
+        return {"urls": urls, "next_cursor": encode_cursor(last_key)}
+    except StorageUnavailableError:
         logger.error(DATABASE_UNREACHABLE_ERROR)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=DATABASE_UNREACHABLE_ERROR,
         )
     except Exception as e:
-        logger.error(UNEXPECTED_ERROR.format(user_id=user_id, error=e))
+        logger.exception(ERROR_RETRIEVING_ALL_URLS_LOG.format(error=e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=UNEXPECTED_ERROR.format(error=e),
         )
 
 
+def stream_urls(user_id: str = None) -> Iterator[str]:
+    # Yields the NDJSON lines of a page's worth of URLs at a time as they
+    # arrive, so memory use stays flat regardless of table size. Each chunk of
+    # a sync iterator costs StreamingResponse a threadpool hop.
+    if user_id is None:
+        items = storage.backend.scan_urls(page_size=LIST_URLS_STREAM_PAGE_SIZE)
+    else:
+        items = storage.backend.query_user_urls(
+            user_id, page_size=LIST_URLS_STREAM_PAGE_SIZE
+        )
+    try:
+        while True:
+            page = list(itertools.islice(items, LIST_URLS_STREAM_PAGE_SIZE))
+            if not page:
+                return
+            yield "".join(
+                json.dumps({"short_url": item.short_url, "original_url": item.url})
+                + "\n"
+                for item in page
+            )
+    except Exception as e:
+        # Headers are already sent, so the error can only be logged
+        logger.exception(ERROR_RETRIEVING_ALL_URLS_LOG.format(error=e))
+        raise
+
+
 def get_user_url_info(user_id: str):
     try:
-        user = UserModel.get(user_id)
-        # Fetch the current URLs associated with the user
-        user_urls = list(URLModel.user_id_index.query(user_id))
+        user = storage.backend.get_user(user_id)
+        if user is None:
+            error_msg = USER_NOT_FOUND_LOG.format(username=user_id)
+            logger.error(error_msg)
+            raise HTTPException(status_code=404, detail=error_msg)
+        # The current URL count is kept on the user item, backfill it if missing
+        url_count = user.url_count
+        if url_count is None:
+            url_count = backfill_url_count(user)
 
         logger.info(USER_URL_INFO_FETCHED_SUCCESS)
 
         # Return the URL limit and the current URL count
-        return {URL_LIMIT_KEY: user.url_limit, URL_COUNT_KEY: len(user_urls)}
-    except UserModel.DoesNotExist:
-        error_msg = USER_NOT_FOUND_LOG.format(username=user_id)
-        logger.error(error_msg)
-        raise HTTPException(status_code=404, detail=error_msg)
+        return {URL_LIMIT_KEY: user.url_limit, URL_COUNT_KEY: url_count}
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = UNEXPECTED_ERROR.format(user_id=user_id, error=e)
         logger.error(error_msg)
@@ -243,3 +661,160 @@ def url_limit_check(user_id: str) -> bool:
         )
     )
     return url_limit <= url_count
+
+
+def backfill_url_count(user: UserModel, recount: bool = False) -> int:
+    url_count = storage.backend.count_user_urls(user.user_id)
+    # Only set the counter if it is still missing, unless asked to recount,
+    # so a concurrent insert can't be overwritten by a stale count
+    stored_count = storage.backend.set_url_count(
+        user, url_count, only_if_missing=not recount
+    )
+    if stored_count == url_count:
+        logger.info(
+            URL_COUNT_BACKFILLED_LOG.format(user_id=user.user_id, url_count=url_count)
+        )
+    return stored_count
+
+
+def _backfill_if_missing(user_id: str) -> bool:
+    user = storage.backend.get_user(user_id)
+    if user is None or user.url_count is not None:
+        return False
+    backfill_url_count(user)
+    return True
+
+
+def backfill_url_counts(recount: bool = False) -> int:
+    # Migration for users created before url_count existed
+    updated = 0
+    for user in storage.backend.scan_users():
+        if recount or user.url_count is None:
+            backfill_url_count(user, recount=recount)
+            updated += 1
+    logger.info(URL_COUNTS_BACKFILLED_LOG.format(count=updated))
+    return updated
+
+
+def lease_id_block(counter_name: str, block_size: int) -> int:
+    # Atomically reserve block_size sequence numbers, returning the first one
+    try:
+        value = storage.backend.increment_counter(counter_name, block_size)
+        logger.info(
+            ID_BLOCK_LEASED_LOG.format(
+                counter=counter_name, start=value - block_size, end=value
+            )
+        )
+        return value - block_size
+    except StorageUnavailableError:
+        logger.error(DATABASE_UNREACHABLE_ERROR)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=DATABASE_UNREACHABLE_ERROR,
+        )
+
+
+def add_clicks(short_url: str, clicks: int):
+    # Atomic increment, so flushes from several workers accumulate
+    storage.backend.add_clicks(short_url, clicks)
+
+
+def get_click_count(short_url: str) -> int:
+    try:
+        return storage.backend.get_click_count(short_url)
+    except StorageUnavailableError:
+        logger.error(DATABASE_UNREACHABLE_ERROR)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=DATABASE_UNREACHABLE_ERROR,
+        )
+
+
+def merge_click_bucket(short_url: str, bucket: str, clicks: int, visitors: HyperLogLog):
+    storage.backend.merge_click_bucket(short_url, bucket, clicks, visitors)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # Naive datetimes are taken to be UTC, like the stored buckets
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def get_click_histogram(
+    short_url: str, start: datetime, end: datetime, granularity: str
+) -> dict:
+    # Hourly buckets arrive in order, so each point is merged from consecutive
+    # items and only the current point's sketch and the total are held in memory
+    start, end = _as_utc(start), _as_utc(end)
+    if end < start or end - start > timedelta(days=CLICK_HISTOGRAM_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=INVALID_HISTOGRAM_RANGE_ERROR.format(days=CLICK_HISTOGRAM_MAX_DAYS),
+        )
+    prefix_length = len(
+        datetime(2000, 1, 1).strftime(CLICK_GRANULARITY_FORMATS[granularity])
+    )
+    points = []
+    total_clicks = 0
+    total_visitors = HyperLogLog(HLL_PRECISION)
+    point_key, point_clicks, point_visitors = None, 0, None
+
+    def close_point():
+        if point_key is not None:
+            points.append(
+                {
+                    "start": datetime.strptime(
+                        point_key, CLICK_GRANULARITY_FORMATS[granularity]
+                    )
+                    .replace(tzinfo=timezone.utc)
+                    .isoformat(),
+                    "clicks": point_clicks,
+                    "unique_visitors": point_visitors.count(),
+                }
+            )
+
+    try:
+        for item in storage.backend.query_click_buckets(
+            short_url,
+            start.strftime(CLICK_BUCKET_FORMAT),
+            end.strftime(CLICK_BUCKET_FORMAT),
+            page_size=CLICK_HISTOGRAM_PAGE_SIZE,
+        ):
+            key = item.bucket[:prefix_length]
+            if key != point_key:
+                close_point()
+                point_key, point_clicks = key, 0
+                point_visitors = HyperLogLog(HLL_PRECISION)
+            point_clicks += item.clicks
+            total_clicks += item.clicks
+            if item.visitors:
+                sketch = HyperLogLog.from_bytes(item.visitors)
+                point_visitors.merge(sketch)
+                total_visitors.merge(sketch)
+        close_point()
+    except StorageUnavailableError:
+        logger.error(DATABASE_UNREACHABLE_ERROR)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=DATABASE_UNREACHABLE_ERROR,
+        )
+    return {
+        "short_url": short_url,
+        "granularity": granularity,
+        "clicks": total_clicks,
+        "unique_visitors": total_visitors.count(),
+        "points": points,
+    }
+
+
+def get_url_owner(short_url: str) -> Optional[str]:
+    try:
+        url_item = storage.backend.get_url(short_url)
+        return url_item.user_id if url_item else None
+    except StorageUnavailableError:
+        logger.error(DATABASE_UNREACHABLE_ERROR)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=DATABASE_UNREACHABLE_ERROR,
+        )
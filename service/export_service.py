@@ -0,0 +1,160 @@
+import csv
+import io
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, TextIO
+from service import storage
+from utils.logger_config import logger
+from utils.constants import *
+
+
+# Marks the end of a segment on the results queue
+_SEGMENT_DONE = object()
+
+
+class ExportProgress:
+    """
+    Tracks how many URLs an export has written and how fast
+    """
+
+    def __init__(self, total_segments: int):
+        self.total_segments = total_segments
+        self.items = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+        logger.info(EXPORT_COMPLETE_LOG.format(**self.stats()))
+
+    def stats(self) -> dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "items": self.items,
+            "segments": self.total_segments,
+            "seconds": round(elapsed, 3),
+            "items_per_second": round(self.items / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def _put(results: queue.Queue, value, stop: threading.Event) -> bool:
+    # Block while the consumer is behind, but give up once the export is stopped
+    while not stop.is_set():
+        try:
+            results.put(value, timeout=EXPORT_QUEUE_TIMEOUT_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _scan_segment(
+    segment: int, total_segments: int, results: queue.Queue, stop: threading.Event
+):
+    # Segments already queued when the export stopped don't start scanning
+    if stop.is_set():
+        return
+    try:
+        for item in storage.backend.scan_urls(
+            page_size=EXPORT_PAGE_SIZE,
+            segment=segment,
+            total_segments=total_segments,
+        ):
+            record = {
+                "short_url": item.short_url,
+                "original_url": item.url,
+                "user_id": item.user_id,
+            }
+            if not _put(results, record, stop):
+                return
+        _put(results, _SEGMENT_DONE, stop)
+    except Exception as e:
+        _put(results, e, stop)
+
+
+def parallel_scan_urls(
+    total_segments: int, progress: ExportProgress = None
+) -> Iterator[dict]:
+    """
+    Scans the URLs in parallel, one worker per segment,
+    and yields the merged records as they arrive
+    """
+    # A bounded queue keeps memory flat when the consumer is slower than the scan
+    results = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(
+        max_workers=min(total_segments, EXPORT_MAX_WORKERS),
+        thread_name_prefix="export-scan",
+    )
+    for segment in range(total_segments):
+        executor.submit(_scan_segment, segment, total_segments, results, stop)
+    logger.info(EXPORT_STARTED_LOG.format(segments=total_segments))
+
+    try:
+        finished = 0
+        while finished < total_segments:
+            record = results.get()
+            if record is _SEGMENT_DONE:
+                finished += 1
+            elif isinstance(record, Exception):
+                logger.error(EXPORT_ERROR_LOG.format(error=record))
+                raise record
+            else:
+                if progress:
+                    progress.items += 1
+                yield record
+    finally:
+        # Stops the remaining workers if the consumer went away or a segment failed
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def format_records(records: Iterator[dict], export_format: str) -> Iterator[str]:
+    # Records are buffered and emitted in chunks of up to EXPORT_CHUNK_RECORDS
+    # records or EXPORT_CHUNK_SIZE characters
+    buffer = io.StringIO()
+    if export_format == EXPORT_FORMAT_JSONL:
+
+        def write(record: dict):
+            buffer.write(json.dumps(record))
+            buffer.write("\n")
+
+    elif export_format == EXPORT_FORMAT_CSV:
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        raise ValueError(EXPORT_FORMAT_ERROR.format(export_format=export_format))
+
+    buffered = 0
+    for record in records:
+        write(record)
+        buffered += 1
+        if buffered >= EXPORT_CHUNK_RECORDS or buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            buffered = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_export(export_format: str, total_segments: int) -> Iterator[str]:
+    progress = ExportProgress(total_segments)
+    yield from format_records(
+        parallel_scan_urls(total_segments, progress), export_format
+    )
+    progress.finish()
+
+
+def export_urls(output: TextIO, export_format: str, total_segments: int) -> dict:
+    progress = ExportProgress(total_segments)
+    for chunk in format_records(
+        parallel_scan_urls(total_segments, progress), export_format
+    ):
+        output.write(chunk)
+    progress.finish()
+    return progress.stats()
@@ -0,0 +1,90 @@
+import threading
+import uuid
+from typing import Callable
+from service.db_service import lease_id_block
+from utils.logger_config import logger
+from utils.constants import *
+
+
+def encode_base62(number: int, min_length: int = 1) -> str:
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+    return "".join(reversed(digits)).rjust(min_length, BASE62_ALPHABET[0])
+
+
+class UuidIdGenerator:
+    """
+    Random short URL IDs, relying on conditional writes to detect collisions
+    """
+
+    def next_id(self) -> str:
+        # Generate a UUID and remove hyphens, take first 10 characters
+        return str(uuid.uuid4()).replace("-", "")[:10]
+
+
+class LeasedBase62IdGenerator:
+    """
+    Collision-free short URL IDs. Blocks of sequence numbers are leased from an
+    atomic counter and handed out from memory, so only one in every block_size
+    IDs costs a round trip. Sequence numbers are encoded as base62, optionally
+    scrambled so consecutive IDs don't look sequential.
+    """
+
+    def __init__(
+        self,
+        lease_block: Callable[[int], int],
+        block_size: int,
+        scramble: bool,
+        scrambled_length: int,
+    ):
+        self.lease_block = lease_block
+        self.block_size = block_size
+        self.scramble = scramble
+        self.scrambled_length = scrambled_length
+        self._scrambled_space = 62**scrambled_length
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self.lease_block(self.block_size)
+                self._end = self._next + self.block_size
+            sequence = self._next
+            self._next += 1
+        return self.encode(sequence)
+
+    def encode(self, sequence: int) -> str:
+        if not self.scramble:
+            return encode_base62(sequence)
+        # An affine map modulo 62^length is a bijection on fixed-length IDs because
+        # the multiplier is coprime with 62. Sequence numbers past that space are
+        # encoded plainly, which yields longer IDs that can't collide with them.
+        if sequence >= self._scrambled_space:
+            return encode_base62(sequence)
+        scrambled = (
+            sequence * SHORT_URL_SCRAMBLE_MULTIPLIER + SHORT_URL_SCRAMBLE_OFFSET
+        ) % self._scrambled_space
+        return encode_base62(scrambled, self.scrambled_length)
+
+
+def create_id_generator():
+    logger.info(ID_GENERATOR_SELECTED_LOG.format(generator=SHORT_URL_ID_GENERATOR))
+    if SHORT_URL_ID_GENERATOR == ID_GENERATOR_UUID:
+        return UuidIdGenerator()
+    if SHORT_URL_ID_GENERATOR == ID_GENERATOR_BASE62:
+        return LeasedBase62IdGenerator(
+            lambda block_size: lease_id_block(SHORT_URL_COUNTER_NAME, block_size),
+            block_size=SHORT_URL_ID_BLOCK_SIZE,
+            scramble=SHORT_URL_ID_SCRAMBLE,
+            scrambled_length=SHORT_URL_SCRAMBLED_LENGTH,
+        )
+    raise ValueError(
+        UNKNOWN_ID_GENERATOR_ERROR.format(generator=SHORT_URL_ID_GENERATOR)
+    )
+
+
+id_generator = create_id_generator()
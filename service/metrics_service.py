@@ -0,0 +1,174 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.multiprocess import MultiProcessCollector
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pynamodb.exceptions import DoesNotExist
+from service.profiling_service import timed_phase
+from utils.constants import *
+
+DB_OPERATION_SECONDS = Histogram(
+    "dynamodb_operation_seconds",
+    "Latency of DynamoDB operations by table and operation",
+    ["table", "operation"],
+    buckets=DB_LATENCY_BUCKETS,
+)
+DB_OPERATION_ERRORS = Counter(
+    "dynamodb_operation_errors_total",
+    "Failed DynamoDB operations by table, operation and error code",
+    ["table", "operation", "error"],
+)
+DB_THROTTLES = Counter(
+    "dynamodb_throttles_total",
+    "DynamoDB operations rejected for exceeding throughput",
+    ["table", "operation"],
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when an event loop callback was due and when it ran",
+    buckets=EVENT_LOOP_LAG_BUCKETS,
+)
+
+
+@contextmanager
+def observe_db(table: str, operation: str):
+    # Times the enclosed DynamoDB call. A missing item is a normal outcome
+    # of a read, so DoesNotExist isn't counted as an error.
+    started = time.perf_counter()
+    try:
+        with timed_phase(TIMING_PHASE_STORAGE):
+            yield
+    except DoesNotExist:
+        raise
+    except Exception as e:
+        error = getattr(e, "cause_response_code", None) or type(e).__name__
+        DB_OPERATION_ERRORS.labels(table, operation, error).inc()
+        if error in DYNAMODB_THROTTLE_ERRORS:
+            DB_THROTTLES.labels(table, operation).inc()
+        raise
+    finally:
+        DB_OPERATION_SECONDS.labels(table, operation).observe(
+            time.perf_counter() - started
+        )
+
+
+class CacheStatsCollector:
+    """
+    Exposes the counters every TTLCache already keeps. They are read when
+    /metrics is scraped, so cache lookups pay nothing extra for metrics.
+    """
+
+    def __init__(self, caches: Dict[str, Callable[[], object]]):
+        # Cache getters rather than caches, so caches patched in tests are used
+        self.caches = caches
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        evictions = CounterMetricFamily(
+            "cache_evictions", "Entries evicted to stay within size", labels=["cache"]
+        )
+        size = GaugeMetricFamily("cache_size", "Entries in cache", labels=["cache"])
+        hit_ratio = GaugeMetricFamily(
+            "cache_hit_ratio", "Hits over lookups since start", labels=["cache"]
+        )
+        for name, get_cache in self.caches.items():
+            stats = get_cache().stats()
+            lookups = stats["hits"] + stats["misses"]
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            evictions.add_metric([name], stats["evictions"])
+            size.add_metric([name], stats["size"])
+            hit_ratio.add_metric([name], stats["hits"] / lookups if lookups else 0)
+        yield from (hits, misses, evictions, size, hit_ratio)
+
+
+class CacheStatsPublisher:
+    """
+    Writes the TTLCache counters into multiprocess metrics. With
+    PROMETHEUS_MULTIPROC_DIR set, /metrics only merges the files every worker
+    writes and ignores collectors, so each worker publishes the counters
+    periodically instead. Counters are summed over every worker that ever ran,
+    sizes over the live ones.
+    """
+
+    def __init__(self, caches: Dict[str, Callable[[], object]]):
+        self.caches = caches
+        self.counters = {
+            "hits": Counter("cache_hits", "Cache hits", ["cache"], registry=None),
+            "misses": Counter("cache_misses", "Cache misses", ["cache"], registry=None),
+            "evictions": Counter(
+                "cache_evictions",
+                "Entries evicted to stay within size",
+                ["cache"],
+                registry=None,
+            ),
+        }
+        self.size = Gauge(
+            "cache_size",
+            "Entries in cache",
+            ["cache"],
+            registry=None,
+            multiprocess_mode="livesum",
+        )
+        self._published = {}
+
+    def publish(self):
+        # Counters only go up, so only the increase since the last publish is added
+        for name, get_cache in self.caches.items():
+            stats = get_cache().stats()
+            published = self._published.get(name, {})
+            for key, counter in self.counters.items():
+                increase = stats[key] - published.get(key, 0)
+                if increase > 0:
+                    counter.labels(name).inc(increase)
+            self.size.labels(name).set(stats["size"])
+            self._published[name] = stats
+
+
+cache_stats_publisher = None
+
+
+def multiprocess_mode() -> bool:
+    return bool(os.environ.get(PROMETHEUS_MULTIPROC_DIR_ENV))
+
+
+def metrics_registry() -> CollectorRegistry:
+    # In multiprocess mode the files written by every worker are merged on
+    # each scrape, in-process collectors aren't consulted
+    if not multiprocess_mode():
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
+
+
+def register_cache_metrics(caches: Dict[str, Callable[[], object]]):
+    global cache_stats_publisher
+    if multiprocess_mode():
+        cache_stats_publisher = CacheStatsPublisher(caches)
+    else:
+        REGISTRY.register(CacheStatsCollector(caches))
+
+
+async def publish_cache_metrics(interval: float):
+    try:
+        while True:
+            cache_stats_publisher.publish()
+            await asyncio.sleep(interval)
+    finally:
+        # Counts since the last publish aren't lost when the worker stops
+        cache_stats_publisher.publish()
+
+
+async def monitor_event_loop_lag(interval: float):
+    # A callback scheduled every interval runs late by however long the loop
+    # was blocked, e.g. by synchronous work in an async handler
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - started - interval, 0))
@@ -0,0 +1,170 @@
+import threading
+import time
+from typing import Optional
+from service import storage
+from service.change_feed_service import change_feed
+from utils.bloom import BloomFilter
+from utils.logger_config import logger
+from utils.constants import *
+
+
+class RedirectPrefilter:
+    """
+    In-memory Bloom filter of every existing short URL. A short URL that is not
+    in the filter definitely doesn't exist, so its redirect can 404 without a
+    storage read. Until the first build completes every short URL is allowed.
+    Each worker has its own filter, so short URLs saved on other workers reach it
+    through the change feed: it is only built while the feed is subscribed, and
+    every short URL is allowed whenever the subscription is down. When another
+    worker's publish failed, the resync it sends invalidates the filter, which
+    then allows every short URL until it is rebuilt.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        rebuild_seconds: float,
+        change_feed=None,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_seconds = rebuild_seconds
+        self.change_feed = change_feed
+        self.filter = None
+        self.rejected = 0
+        self.last_rebuild_seconds = None
+        self.last_rebuilt_at = None
+        self._building = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def _feed_subscribed(self) -> bool:
+        return self.change_feed is None or self.change_feed.subscribed.is_set()
+
+    def might_contain(self, short_url: str) -> bool:
+        bloom_filter = self.filter
+        if bloom_filter is None or short_url in bloom_filter:
+            return True
+        if not self._feed_subscribed():
+            return True
+        self.rejected += 1
+        return False
+
+    def add(self, short_url: str):
+        # Also add to a filter being rebuilt so it doesn't miss concurrent saves
+        with self._lock:
+            for bloom_filter in (self.filter, self._building):
+                if bloom_filter is not None:
+                    bloom_filter.add(short_url)
+
+    def _expected_items(self) -> int:
+        # The item count may be approximate, leave headroom for growth
+        try:
+            item_count = storage.backend.approximate_url_count()
+        except Exception as e:
+            logger.warning(REDIRECT_PREFILTER_ITEM_COUNT_ERROR.format(error=e))
+            item_count = 0
+        return max(self.capacity, int(item_count * REDIRECT_PREFILTER_HEADROOM))
+
+    def rebuild(self):
+        started = time.monotonic()
+        new_filter = BloomFilter(self._expected_items(), self.error_rate)
+        with self._lock:
+            generation = self._generation
+            self._building = new_filter
+        try:
+            for item in storage.backend.scan_urls(
+                page_size=REDIRECT_PREFILTER_PAGE_SIZE, short_urls_only=True
+            ):
+                with self._lock:
+                    new_filter.add(item.short_url)
+        except Exception:
+            with self._lock:
+                self._building = None
+            raise
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated during the scan, which may have missed saves
+                return
+            self.filter = new_filter
+            self._building = None
+        self.last_rebuild_seconds = round(time.monotonic() - started, 3)
+        self.last_rebuilt_at = time.time()
+        logger.info(
+            REDIRECT_PREFILTER_REBUILT_LOG.format(
+                count=new_filter.count, seconds=self.last_rebuild_seconds
+            )
+        )
+
+    def invalidate(self):
+        # Called when change feed events may have been lost. Every short URL is
+        # allowed until a rebuild started after this call completes.
+        with self._lock:
+            self._generation += 1
+            self.filter = None
+            self._building = None
+        self._wake.set()
+
+    def _wait_for_feed(self) -> bool:
+        # Saves made before the subscription would be in neither the scan nor
+        # the feed, so the scan only starts once the feed is subscribed
+        while not self._feed_subscribed():
+            if self._stop.wait(CHANGE_FEED_POLL_SECONDS):
+                return False
+        return not self._stop.is_set()
+
+    def _run(self):
+        while self._wait_for_feed():
+            self._wake.clear()
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(REDIRECT_PREFILTER_REBUILD_ERROR.format(error=e))
+            # Without a rebuild interval, only invalidation triggers a rebuild
+            self._wake.wait(self.rebuild_seconds or None)
+
+    def start(self):
+        # Builds in the background so startup isn't blocked by the scan
+        threading.Thread(
+            target=self._run, name="redirect-prefilter", daemon=True
+        ).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> dict:
+        bloom_filter = self.filter
+        return {
+            "ready": bloom_filter is not None and self._feed_subscribed(),
+            "items": bloom_filter.count if bloom_filter else 0,
+            "size_bytes": bloom_filter.size_bytes if bloom_filter else 0,
+            "false_positive_rate": (
+                bloom_filter.false_positive_rate() if bloom_filter else None
+            ),
+            "rejected": self.rejected,
+            "last_rebuild_seconds": self.last_rebuild_seconds,
+            "last_rebuilt_at": self.last_rebuilt_at,
+        }
+
+
+def create_redirect_prefilter() -> Optional[RedirectPrefilter]:
+    if not REDIRECT_PREFILTER_ENABLED:
+        return None
+    # Without the change feed, short URLs saved on other workers would 404 here
+    # until the next rebuild
+    if change_feed is None:
+        logger.warning(REDIRECT_PREFILTER_NO_CHANGE_FEED_WARNING)
+        return None
+    return RedirectPrefilter(
+        REDIRECT_PREFILTER_CAPACITY,
+        REDIRECT_PREFILTER_ERROR_RATE,
+        REDIRECT_PREFILTER_REBUILD_SECONDS,
+        change_feed=change_feed,
+    )
+
+
+redirect_prefilter = create_redirect_prefilter()
@@ -0,0 +1,113 @@
+import cProfile
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from utils.logger_config import logger
+from utils.constants import *
+
+
+class RequestTimings:
+    """
+    Exclusive time per phase of one request. A phase entered inside another,
+    such as a storage call made while authenticating, pauses the outer phase,
+    so phases never overlap and add up to at most the request's duration.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        if self._stack:
+            parent, parent_started = self._stack[-1]
+            self.durations[parent] += started - parent_started
+        self._stack.append([name, started])
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            _, phase_started = self._stack.pop()
+            self.durations[name] += ended - phase_started
+            if self._stack:
+                self._stack[-1][1] = ended
+
+    def server_timing(self, total_seconds: float) -> str:
+        # Time outside the named phases is the handler and response serialization
+        durations = dict(self.durations)
+        durations[TIMING_PHASE_RESPONSE] = max(
+            total_seconds - sum(self.durations.values()), 0
+        )
+        durations[TIMING_PHASE_TOTAL] = total_seconds
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in durations.items()
+        )
+
+
+# Set only while a profiled request is running, so unprofiled requests skip
+# timing after a single context variable lookup
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def timed_phase(name: str):
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.phase(name):
+        yield
+
+
+# cProfile hooks the whole event loop thread, so only one request is profiled at
+# a time. The dump includes other requests' coroutines that ran meanwhile, and
+# misses sync endpoints and storage calls run in the threadpool.
+_profile_lock = threading.Lock()
+
+
+def _profile_path(method: str, path: str) -> str:
+    safe_path = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    name = f"{int(time.time() * 1000)}-{method}-{safe_path}.prof"
+    return os.path.join(PROFILE_DIR, name)
+
+
+def _dump_profile(profiler: cProfile.Profile, path: str):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(path)
+    logger.info(PROFILE_WRITTEN_LOG.format(path=path))
+
+
+async def profile_request(request, call_next, mode: str):
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    profiler = None
+    if mode == PROFILE_MODE_CPROFILE and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        response = await call_next(request)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+        _request_timings.reset(token)
+    response.headers[SERVER_TIMING_HEADER] = timings.server_timing(
+        time.perf_counter() - started
+    )
+    if profiler is not None:
+        path = _profile_path(request.method, request.url.path)
+        await run_in_threadpool(_dump_profile, profiler, path)
+        response.headers[PROFILE_FILE_HEADER] = os.path.basename(path)
+        response.headers[PROFILE_SCOPE_HEADER] = PROFILE_SCOPE_EVENT_LOOP
+    return response
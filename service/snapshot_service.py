@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from typing import Optional
+from service import storage
+from utils.snapshot import Snapshot, write_snapshot
+from utils.logger_config import logger
+from utils.constants import *
+
+
+def build_snapshot(path: str) -> int:
+    # Scans every URL into a new snapshot that replaces the one at path
+    urls = (
+        (item.short_url, item.url)
+        for item in storage.backend.scan_urls(page_size=REDIRECT_SNAPSHOT_PAGE_SIZE)
+    )
+    count = write_snapshot(path, urls)
+    logger.info(REDIRECT_SNAPSHOT_BUILT_LOG.format(count=count, path=path))
+    return count
+
+
+class RedirectSnapshot:
+    """
+    Serves redirects from the snapshot file at path. The file is checked for
+    replacement at most every check_seconds; a new snapshot is opened first and
+    then swapped in with a single assignment, so lookups always see one
+    complete snapshot. The old mapping is released once no lookup uses it.
+    """
+
+    def __init__(self, path: str, check_seconds: float):
+        self.path = path
+        self.check_seconds = check_seconds
+        self.snapshot = None
+        self.loaded_at = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _identity(stat: os.stat_result) -> tuple:
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def reload(self):
+        # Opens the file at path if it differs from the one being served
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if self.snapshot is None:
+                raise
+            logger.warning(REDIRECT_SNAPSHOT_LOAD_ERROR.format(error=e))
+            return
+        snapshot = self.snapshot
+        if snapshot and self._identity(snapshot.stat) == self._identity(stat):
+            return
+        try:
+            new_snapshot = Snapshot(self.path)
+        except Exception as e:
+            if snapshot is None:
+                raise
+            # Keep serving the old snapshot rather than failing redirects
+            logger.warning(REDIRECT_SNAPSHOT_LOAD_ERROR.format(error=e))
+            return
+        self.snapshot = new_snapshot
+        self.loaded_at = time.time()
+        logger.info(
+            REDIRECT_SNAPSHOT_LOADED_LOG.format(count=len(new_snapshot), path=self.path)
+        )
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        # Only one thread checks, the others keep using the current snapshot
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.check_seconds
+            self.reload()
+        finally:
+            self._lock.release()
+
+    def get(self, short_url: str) -> Optional[str]:
+        self._maybe_reload()
+        return self.snapshot.get(short_url)
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "path": self.path,
+            "items": len(snapshot) if snapshot else 0,
+            "size_bytes": snapshot.stat.st_size if snapshot else 0,
+            "loaded_at": self.loaded_at,
+        }
+
+
+redirect_snapshot = (
+    RedirectSnapshot(REDIRECT_SNAPSHOT_PATH, REDIRECT_SNAPSHOT_CHECK_SECONDS)
+    if REDIRECT_SNAPSHOT_PATH
+    else None
+)
@@ -0,0 +1,34 @@
+from service.storage.base import (
+    StorageBackend,
+    StorageError,
+    StorageTableMissingError,
+    StorageUnavailableError,
+    WriteConflictError,
+)
+from utils.logger_config import logger
+from utils.constants import *
+
+
+def create_storage_backend(name: str = STORAGE_BACKEND) -> StorageBackend:
+    # Backends are imported lazily so only the configured one is loaded
+    if name == STORAGE_BACKEND_DYNAMODB:
+        from service.storage.dynamodb import DynamoDBStorageBackend
+
+        storage_backend = DynamoDBStorageBackend()
+    elif name == STORAGE_BACKEND_MEMORY:
+        from service.storage.memory import InMemoryStorageBackend
+
+        storage_backend = InMemoryStorageBackend()
+    elif name == STORAGE_BACKEND_SQLITE:
+        from service.storage.sqlite import SQLiteStorageBackend
+
+        storage_backend = SQLiteStorageBackend(SQLITE_PATH, SQLITE_BUSY_TIMEOUT_SECONDS)
+    else:
+        raise ValueError(
+            STORAGE_BACKEND_ERROR.format(backend=name, backends=STORAGE_BACKENDS)
+        )
+    logger.info(STORAGE_BACKEND_ENABLED_LOG.format(backend=name))
+    return storage_backend
+
+
+backend = create_storage_backend()
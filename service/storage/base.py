@@ -0,0 +1,148 @@
+from typing import Iterator, List, Optional, Tuple
+from models.db_models import URLModel, UserModel, ClickBucketModel
+from utils.hyperloglog import HyperLogLog
+
+
+class StorageError(Exception):
+    """
+    A storage operation failed for a reason other than a failed condition
+    """
+
+
+class StorageUnavailableError(StorageError):
+    """
+    The storage backend could not be reached
+    """
+
+
+class StorageTableMissingError(StorageUnavailableError):
+    """
+    A table the operation needs doesn't exist, it is created by create-tables
+    """
+
+
+class WriteConflictError(StorageError):
+    """
+    A conditional write was rejected. failed_items holds the positions of the
+    items whose condition failed, in the order they were passed to the write.
+    """
+
+    def __init__(self, failed_items):
+        self.failed_items = set(failed_items)
+        super().__init__(
+            f"Conditional write failed for items {sorted(self.failed_items)}"
+        )
+
+
+class StorageBackend:
+    """
+    The storage operations the service uses. Records are the PynamoDB model
+    classes, which every backend uses as plain data holders, so callers don't
+    depend on the backend they run on.
+    """
+
+    name = None
+
+    def create_tables(self) -> List[str]:
+        # Creates missing tables and returns their names
+        raise NotImplementedError
+
+    def warm_up(self):
+        # Opens connections ahead of the first requests, where that applies
+        pass
+
+    # URLs
+    def get_url(self, short_url: str) -> Optional[URLModel]:
+        raise NotImplementedError
+
+    def insert_url(self, new_url: URLModel, dedup_key: str = None):
+        # Writes the URL if its short URL is free (item 0) and increments the
+        # owner's url_count if it is below their url_limit (item 1), atomically.
+        # A dedup_key is claimed for the URL in the same write if it is still
+        # free (item 2).
+        raise NotImplementedError
+
+    def get_dedup_short_url(self, dedup_key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def insert_urls(self, new_urls: List[URLModel], user_id: str, url_count: int):
+        # Writes URLs whose short URLs are all free (items 0..n-1) and advances
+        # the owner's url_count by n if it still equals url_count (item n)
+        raise NotImplementedError
+
+    def scan_urls(
+        self,
+        page_size: int = None,
+        segment: int = None,
+        total_segments: int = None,
+        short_urls_only: bool = False,
+    ) -> Iterator[URLModel]:
+        # Every URL, or one of total_segments disjoint segments of them
+        raise NotImplementedError
+
+    def query_user_urls(
+        self, user_id: str, page_size: int = None
+    ) -> Iterator[URLModel]:
+        raise NotImplementedError
+
+    def get_urls_page(
+        self, limit: int, start_key: Optional[dict], user_id: str = None
+    ) -> Tuple[List[URLModel], Optional[dict]]:
+        # Returns up to limit URLs after start_key and the key to resume from,
+        # which is None once there are no more URLs
+        raise NotImplementedError
+
+    def count_user_urls(self, user_id: str) -> int:
+        raise NotImplementedError
+
+    def approximate_url_count(self) -> int:
+        raise NotImplementedError
+
+    # Users
+    def get_user(self, user_id: str) -> Optional[UserModel]:
+        raise NotImplementedError
+
+    def get_user_by_username(self, username: str) -> Optional[UserModel]:
+        raise NotImplementedError
+
+    def save_user(self, user: UserModel):
+        raise NotImplementedError
+
+    def update_user(
+        self, user_id: str, changes: dict, bump_token_version: bool
+    ) -> Optional[UserModel]:
+        # Sets the given attributes of an existing user, optionally incrementing
+        # token_version, and returns the updated user or None if there is none
+        raise NotImplementedError
+
+    def set_url_count(
+        self, user: UserModel, url_count: int, only_if_missing: bool
+    ) -> int:
+        # Returns the stored count, which differs from url_count if another
+        # writer set it first and only_if_missing was given
+        raise NotImplementedError
+
+    def scan_users(self) -> Iterator[UserModel]:
+        raise NotImplementedError
+
+    # Counters and clicks
+    def increment_counter(self, name: str, amount: int) -> int:
+        # Returns the counter's value after the increment
+        raise NotImplementedError
+
+    def add_clicks(self, short_url: str, clicks: int):
+        raise NotImplementedError
+
+    def get_click_count(self, short_url: str) -> int:
+        raise NotImplementedError
+
+    def merge_click_bucket(
+        self, short_url: str, bucket: str, clicks: int, visitors: HyperLogLog
+    ):
+        raise NotImplementedError
+
+    def query_click_buckets(
+        self, short_url: str, first_bucket: str, last_bucket: str, page_size: int
+    ) -> Iterator[ClickBucketModel]:
+        # Buckets between first_bucket and last_bucket inclusive, in order
+        raise NotImplementedError
@@ -0,0 +1,338 @@
+import inspect
+from contextlib import contextmanager
+from functools import wraps
+from typing import Iterator, List, Optional, Tuple
+from pynamodb.exceptions import (
+    DoesNotExist,
+    PutError,
+    PynamoDBConnectionError,
+    TransactWriteError,
+    UpdateError,
+)
+from pynamodb.transactions import TransactWrite
+from models.db_models import (
+    URLModel,
+    UserModel,
+    CounterModel,
+    ClickStatsModel,
+    ClickBucketModel,
+    URLDedupModel,
+    transaction_connection,
+    create_tables,
+    warm_up_connections,
+)
+from service.metrics_service import observe_db
+from service.storage.base import (
+    StorageBackend,
+    StorageError,
+    StorageTableMissingError,
+    StorageUnavailableError,
+    WriteConflictError,
+)
+from utils.hyperloglog import HyperLogLog
+from utils.url_compression import compress_url, decompress_url
+from utils.constants import *
+
+
+@contextmanager
+def _translated_errors():
+    # Maps PynamoDB's exceptions to the backend-neutral ones callers handle
+    try:
+        yield
+    except TransactWriteError as e:
+        # Cancellation reasons are ordered like the transaction items
+        failed_items = [
+            index
+            for index, reason in enumerate(e.cancellation_reasons)
+            if reason is not None and reason.code == CONDITIONAL_CHECK_FAILED
+        ]
+        if failed_items:
+            raise WriteConflictError(failed_items) from e
+        raise StorageError(str(e)) from e
+    except PynamoDBConnectionError as e:
+        if e.cause_response_code == RESOURCE_NOT_FOUND:
+            raise StorageTableMissingError(str(e)) from e
+        raise StorageUnavailableError(str(e)) from e
+
+
+def _translate_errors(method):
+    # Scans and queries are lazy, so their errors are raised while iterating
+    if inspect.isgeneratorfunction(method):
+
+        @wraps(method)
+        def generator_wrapper(*args, **kwargs):
+            with _translated_errors():
+                yield from method(*args, **kwargs)
+
+        return generator_wrapper
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with _translated_errors():
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+def _encoded(new_url: URLModel) -> URLModel:
+    # Long URLs are stored compressed when that makes the item smaller. A copy
+    # is written so the caller's record keeps its plain URL.
+    if not URL_COMPRESSION_ENABLED or len(new_url.url) < URL_COMPRESSION_MIN_LENGTH:
+        return new_url
+    compressed = compress_url(new_url.url)
+    if len(compressed) >= len(new_url.url.encode()):
+        return new_url
+    return URLModel(
+        short_url=new_url.short_url,
+        url_compressed=compressed,
+        user_id=new_url.user_id,
+    )
+
+
+def _decoded(item: URLModel) -> URLModel:
+    # Items written before compression, or too short for it, hold a plain url
+    if item.url is None and item.url_compressed is not None:
+        item.url = decompress_url(item.url_compressed)
+    return item
+
+
+class DynamoDBStorageBackend(StorageBackend):
+    """
+    Stores everything in the DynamoDB tables defined in models.db_models
+    """
+
+    name = STORAGE_BACKEND_DYNAMODB
+
+    def create_tables(self) -> List[str]:
+        return create_tables()
+
+    def warm_up(self):
+        warm_up_connections()
+
+    @_translate_errors
+    def get_url(self, short_url: str) -> Optional[URLModel]:
+        try:
+            with observe_db(URLModel.Meta.table_name, "GetItem"):
+                return _decoded(URLModel.get(hash_key=short_url))
+        except DoesNotExist:
+            return None
+
+    @_translate_errors
+    def insert_url(self, new_url: URLModel, dedup_key: str = None):
+        with observe_db(TRANSACTION_METRIC_TABLE, "InsertURL"):
+            with TransactWrite(connection=transaction_connection) as transaction:
+                transaction.save(
+                    _encoded(new_url), condition=URLModel.short_url.does_not_exist()
+                )
+                transaction.update(
+                    UserModel(user_id=new_url.user_id),
+                    actions=[UserModel.url_count.add(1)],
+                    condition=UserModel.url_count < UserModel.url_limit,
+                )
+                if dedup_key is not None:
+                    transaction.save(
+                        URLDedupModel(dedup_key=dedup_key, short_url=new_url.short_url),
+                        condition=URLDedupModel.dedup_key.does_not_exist(),
+                    )
+
+    @_translate_errors
+    def get_dedup_short_url(self, dedup_key: str) -> Optional[str]:
+        try:
+            with observe_db(URLDedupModel.Meta.table_name, "GetItem"):
+                return URLDedupModel.get(dedup_key).short_url
+        except DoesNotExist:
+            return None
+
+    @_translate_errors
+    def insert_urls(self, new_urls: List[URLModel], user_id: str, url_count: int):
+        with observe_db(TRANSACTION_METRIC_TABLE, "InsertURLs"):
+            with TransactWrite(connection=transaction_connection) as transaction:
+                for new_url in new_urls:
+                    transaction.save(
+                        _encoded(new_url),
+                        condition=URLModel.short_url.does_not_exist(),
+                    )
+                transaction.update(
+                    UserModel(user_id=user_id),
+                    actions=[UserModel.url_count.add(len(new_urls))],
+                    condition=UserModel.url_count == url_count,
+                )
+
+    @_translate_errors
+    def scan_urls(
+        self,
+        page_size: int = None,
+        segment: int = None,
+        total_segments: int = None,
+        short_urls_only: bool = False,
+    ) -> Iterator[URLModel]:
+        kwargs = {}
+        if short_urls_only:
+            kwargs["attributes_to_get"] = ["short_url"]
+        if total_segments:
+            kwargs.update(segment=segment, total_segments=total_segments)
+        if page_size:
+            kwargs["page_size"] = page_size
+        for item in URLModel.scan(**kwargs):
+            yield _decoded(item)
+
+    @_translate_errors
+    def query_user_urls(
+        self, user_id: str, page_size: int = None
+    ) -> Iterator[URLModel]:
+        kwargs = {"page_size": page_size} if page_size else {}
+        for item in URLModel.user_id_index.query(user_id, **kwargs):
+            yield _decoded(item)
+
+    @_translate_errors
+    def get_urls_page(
+        self, limit: int, start_key: Optional[dict], user_id: str = None
+    ) -> Tuple[List[URLModel], Optional[dict]]:
+        # Scan the whole table, or query a single user's URLs on the GSI
+        if user_id is None:
+            with observe_db(URLModel.Meta.table_name, "Scan"):
+                results = URLModel.scan(limit=limit, last_evaluated_key=start_key)
+                urls = [_decoded(item) for item in results]
+        else:
+            with observe_db(URLModel.Meta.table_name, "QueryUserIdIndex"):
+                results = URLModel.user_id_index.query(
+                    user_id, limit=limit, last_evaluated_key=start_key
+                )
+                urls = [_decoded(item) for item in results]
+        return urls, results.last_evaluated_key
+
+    @_translate_errors
+    def count_user_urls(self, user_id: str) -> int:
+        # Counts on the index without fetching the items
+        with observe_db(URLModel.Meta.table_name, "CountUserIdIndex"):
+            return URLModel.user_id_index.count(user_id)
+
+    def approximate_url_count(self) -> int:
+        # DynamoDB refreshes the item count about every six hours
+        return URLModel.describe_table().get("ItemCount", 0)
+
+    @_translate_errors
+    def get_user(self, user_id: str) -> Optional[UserModel]:
+        try:
+            with observe_db(UserModel.Meta.table_name, "GetItem"):
+                return UserModel.get(user_id)
+        except DoesNotExist:
+            return None
+
+    @_translate_errors
+    def get_user_by_username(self, username: str) -> Optional[UserModel]:
+        # Query the GSI for the user with the matching username
+        with observe_db(UserModel.Meta.table_name, "QueryUsernameIndex"):
+            return next(UserModel.username_index.query(username), None)
+
+    @_translate_errors
+    def save_user(self, user: UserModel):
+        with observe_db(UserModel.Meta.table_name, "PutItem"):
+            user.save()
+
+    @_translate_errors
+    def update_user(
+        self, user_id: str, changes: dict, bump_token_version: bool
+    ) -> Optional[UserModel]:
+        # Updates only the given attributes, so counters such as url_count that
+        # change concurrently are never overwritten with a stale value
+        actions = [
+            getattr(UserModel, name).set(value) for name, value in changes.items()
+        ]
+        if bump_token_version:
+            actions.append(UserModel.token_version.add(1))
+        user = UserModel(user_id=user_id)
+        try:
+            with observe_db(UserModel.Meta.table_name, "UpdateItem"):
+                user.update(actions=actions, condition=UserModel.user_id.exists())
+        except UpdateError as e:
+            if CONDITIONAL_CHECK_FAILED not in str(e):
+                raise
+            return None
+        return user
+
+    @_translate_errors
+    def set_url_count(
+        self, user: UserModel, url_count: int, only_if_missing: bool
+    ) -> int:
+        # The condition keeps a concurrent insert from being overwritten by a
+        # stale count
+        condition = UserModel.url_count.does_not_exist() if only_if_missing else None
+        try:
+            with observe_db(UserModel.Meta.table_name, "UpdateItem"):
+                user.update(
+                    actions=[UserModel.url_count.set(url_count)], condition=condition
+                )
+            return url_count
+        except UpdateError as e:
+            if CONDITIONAL_CHECK_FAILED not in str(e):
+                raise
+            # Another request set the counter first
+            return UserModel.get(user.user_id).url_count
+
+    @_translate_errors
+    def scan_users(self) -> Iterator[UserModel]:
+        yield from UserModel.scan()
+
+    @_translate_errors
+    def increment_counter(self, name: str, amount: int) -> int:
+        counter = CounterModel(name=name)
+        with observe_db(CounterModel.Meta.table_name, "UpdateItem"):
+            counter.update(actions=[CounterModel.value.add(amount)])
+        return counter.value
+
+    @_translate_errors
+    def add_clicks(self, short_url: str, clicks: int):
+        # Atomic ADD, so flushes from several workers accumulate
+        with observe_db(ClickStatsModel.Meta.table_name, "UpdateItem"):
+            ClickStatsModel(short_url=short_url).update(
+                actions=[ClickStatsModel.clicks.add(clicks)]
+            )
+
+    @_translate_errors
+    def get_click_count(self, short_url: str) -> int:
+        try:
+            with observe_db(ClickStatsModel.Meta.table_name, "GetItem"):
+                return ClickStatsModel.get(short_url).clicks
+        except DoesNotExist:
+            return 0
+
+    @_translate_errors
+    def merge_click_bucket(
+        self, short_url: str, bucket: str, clicks: int, visitors: HyperLogLog
+    ):
+        # Sketches can't be merged server side, so the bucket is read, merged and
+        # written back, retrying when another worker saved it in between
+        for attempt in range(CLICK_BUCKET_WRITE_RETRIES):
+            try:
+                item = ClickBucketModel.get(short_url, bucket)
+            except DoesNotExist:
+                item = ClickBucketModel(short_url, bucket)
+            merged = (
+                HyperLogLog.from_bytes(item.visitors)
+                if item.visitors
+                else HyperLogLog(visitors.precision)
+            )
+            merged.merge(visitors)
+            item.clicks += clicks
+            item.visitors = merged.to_bytes()
+            try:
+                with observe_db(ClickBucketModel.Meta.table_name, "PutItem"):
+                    item.save()
+                return
+            except PutError as e:
+                if CONDITIONAL_CHECK_FAILED not in str(e):
+                    raise
+        raise RuntimeError(
+            CLICK_BUCKET_CONFLICT_ERROR.format(bucket=bucket, short_url=short_url)
+        )
+
+    @_translate_errors
+    def query_click_buckets(
+        self, short_url: str, first_bucket: str, last_bucket: str, page_size: int
+    ) -> Iterator[ClickBucketModel]:
+        yield from ClickBucketModel.query(
+            short_url,
+            ClickBucketModel.bucket.between(first_bucket, last_bucket),
+            page_size=page_size,
+        )
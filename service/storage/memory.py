@@ -0,0 +1,210 @@
+import threading
+from typing import Iterator, List, Optional, Tuple
+from models.db_models import URLModel, UserModel, ClickBucketModel
+from service.storage.base import StorageBackend, WriteConflictError
+from utils.hyperloglog import HyperLogLog
+from utils.constants import *
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """
+    Process-local storage for tests, benchmarks and single-worker local runs.
+    Items are kept as attribute dicts and every read returns a fresh record,
+    so callers can't change stored data by mutating what they were given.
+    """
+
+    name = STORAGE_BACKEND_MEMORY
+
+    def __init__(self):
+        self._urls = {}
+        self._users = {}
+        self._counters = {}
+        self._clicks = {}
+        self._buckets = {}
+        self._dedup = {}
+        self._lock = threading.Lock()
+
+    def create_tables(self) -> List[str]:
+        return []
+
+    def get_url(self, short_url: str) -> Optional[URLModel]:
+        values = self._urls.get(short_url)
+        return URLModel(**values) if values else None
+
+    def _url_limit_failed(self, user_id: str, expected_count: int = None) -> bool:
+        # Mirrors the DynamoDB conditions: a missing counter fails either check
+        user = self._users.get(user_id)
+        url_count = user.get("url_count") if user else None
+        if url_count is None:
+            return True
+        if expected_count is not None:
+            return url_count != expected_count
+        return url_count >= user["url_limit"]
+
+    def insert_url(self, new_url: URLModel, dedup_key: str = None):
+        with self._lock:
+            failed_items = []
+            if new_url.short_url in self._urls:
+                failed_items.append(URL_ITEM_INDEX)
+            if self._url_limit_failed(new_url.user_id):
+                failed_items.append(USER_ITEM_INDEX)
+            if dedup_key is not None and dedup_key in self._dedup:
+                failed_items.append(DEDUP_ITEM_INDEX)
+            if failed_items:
+                raise WriteConflictError(failed_items)
+            self._urls[new_url.short_url] = dict(new_url.attribute_values)
+            self._users[new_url.user_id]["url_count"] += 1
+            if dedup_key is not None:
+                self._dedup[dedup_key] = new_url.short_url
+
+    def get_dedup_short_url(self, dedup_key: str) -> Optional[str]:
+        return self._dedup.get(dedup_key)
+
+    def insert_urls(self, new_urls: List[URLModel], user_id: str, url_count: int):
+        with self._lock:
+            failed_items = [
+                index
+                for index, new_url in enumerate(new_urls)
+                if new_url.short_url in self._urls
+            ]
+            if self._url_limit_failed(user_id, expected_count=url_count):
+                failed_items.append(len(new_urls))
+            if failed_items:
+                raise WriteConflictError(failed_items)
+            for new_url in new_urls:
+                self._urls[new_url.short_url] = dict(new_url.attribute_values)
+            self._users[user_id]["url_count"] += len(new_urls)
+
+    def scan_urls(
+        self,
+        page_size: int = None,
+        segment: int = None,
+        total_segments: int = None,
+        short_urls_only: bool = False,
+    ) -> Iterator[URLModel]:
+        with self._lock:
+            items = list(self._urls.values())
+        if total_segments:
+            items = items[segment::total_segments]
+        for values in items:
+            yield URLModel(**values)
+
+    def query_user_urls(
+        self, user_id: str, page_size: int = None
+    ) -> Iterator[URLModel]:
+        with self._lock:
+            items = [
+                values for values in self._urls.values() if values["user_id"] == user_id
+            ]
+        for values in items:
+            yield URLModel(**values)
+
+    def get_urls_page(
+        self, limit: int, start_key: Optional[dict], user_id: str = None
+    ) -> Tuple[List[URLModel], Optional[dict]]:
+        # Pages in short URL order, resuming after the last short URL returned
+        after = start_key["short_url"] if start_key else None
+        with self._lock:
+            items = sorted(
+                (
+                    values
+                    for values in self._urls.values()
+                    if (user_id is None or values["user_id"] == user_id)
+                    and (after is None or values["short_url"] > after)
+                ),
+                key=lambda values: values["short_url"],
+            )
+        page = [URLModel(**values) for values in items[:limit]]
+        last_key = {"short_url": page[-1].short_url} if len(items) > limit else None
+        return page, last_key
+
+    def count_user_urls(self, user_id: str) -> int:
+        with self._lock:
+            return sum(values["user_id"] == user_id for values in self._urls.values())
+
+    def approximate_url_count(self) -> int:
+        return len(self._urls)
+
+    def get_user(self, user_id: str) -> Optional[UserModel]:
+        values = self._users.get(user_id)
+        return UserModel(**values) if values else None
+
+    def get_user_by_username(self, username: str) -> Optional[UserModel]:
+        with self._lock:
+            for values in self._users.values():
+                if values["username"] == username:
+                    return UserModel(**values)
+        return None
+
+    def save_user(self, user: UserModel):
+        with self._lock:
+            self._users[user.user_id] = dict(user.attribute_values)
+
+    def update_user(
+        self, user_id: str, changes: dict, bump_token_version: bool
+    ) -> Optional[UserModel]:
+        with self._lock:
+            values = self._users.get(user_id)
+            if values is None:
+                return None
+            values.update(changes)
+            if bump_token_version:
+                values["token_version"] = values.get("token_version", 0) + 1
+            return UserModel(**values)
+
+    def set_url_count(
+        self, user: UserModel, url_count: int, only_if_missing: bool
+    ) -> int:
+        with self._lock:
+            values = self._users[user.user_id]
+            if not only_if_missing or values.get("url_count") is None:
+                values["url_count"] = url_count
+            return values["url_count"]
+
+    def scan_users(self) -> Iterator[UserModel]:
+        with self._lock:
+            items = list(self._users.values())
+        for values in items:
+            yield UserModel(**values)
+
+    def increment_counter(self, name: str, amount: int) -> int:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+            return self._counters[name]
+
+    def add_clicks(self, short_url: str, clicks: int):
+        with self._lock:
+            self._clicks[short_url] = self._clicks.get(short_url, 0) + clicks
+
+    def get_click_count(self, short_url: str) -> int:
+        return self._clicks.get(short_url, 0)
+
+    def merge_click_bucket(
+        self, short_url: str, bucket: str, clicks: int, visitors: HyperLogLog
+    ):
+        with self._lock:
+            stored_clicks, stored_visitors = self._buckets.get(
+                (short_url, bucket), (0, None)
+            )
+            merged = (
+                HyperLogLog.from_bytes(stored_visitors)
+                if stored_visitors
+                else HyperLogLog(visitors.precision)
+            )
+            merged.merge(visitors)
+            self._buckets[(short_url, bucket)] = (
+                stored_clicks + clicks,
+                merged.to_bytes(),
+            )
+
+    def query_click_buckets(
+        self, short_url: str, first_bucket: str, last_bucket: str, page_size: int
+    ) -> Iterator[ClickBucketModel]:
+        with self._lock:
+            items = sorted(
+                (bucket, clicks, visitors)
+                for (key, bucket), (clicks, visitors) in self._buckets.items()
+                if key == short_url and first_bucket <= bucket <= last_bucket
+            )
+        for bucket, clicks, visitors in items:
+            yield ClickBucketModel(short_url, bucket, clicks=clicks, visitors=visitors)
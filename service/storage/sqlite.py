@@ -0,0 +1,441 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+from models.db_models import URLModel, UserModel, ClickBucketModel
+from service.storage.base import (
+    StorageBackend,
+    StorageTableMissingError,
+    StorageUnavailableError,
+    WriteConflictError,
+)
+from utils.hyperloglog import HyperLogLog
+from utils.logger_config import logger
+from utils.constants import *
+
+SCHEMA = {
+    "urls": """
+        CREATE TABLE IF NOT EXISTS urls (
+            short_url TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            user_id TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS urls_user_id ON urls (user_id, short_url);
+    """,
+    "users": """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            hashed_password TEXT NOT NULL,
+            url_limit INTEGER NOT NULL,
+            url_count INTEGER,
+            is_admin INTEGER NOT NULL,
+            disabled INTEGER NOT NULL,
+            token_version INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS users_username ON users (username);
+    """,
+    "counters": """
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID;
+    """,
+    "click_stats": """
+        CREATE TABLE IF NOT EXISTS click_stats (
+            short_url TEXT PRIMARY KEY,
+            clicks INTEGER NOT NULL
+        ) WITHOUT ROWID;
+    """,
+    "url_dedup": """
+        CREATE TABLE IF NOT EXISTS url_dedup (
+            dedup_key TEXT PRIMARY KEY,
+            short_url TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """,
+    "click_buckets": """
+        CREATE TABLE IF NOT EXISTS click_buckets (
+            short_url TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            clicks INTEGER NOT NULL,
+            visitors BLOB,
+            PRIMARY KEY (short_url, bucket)
+        ) WITHOUT ROWID;
+    """,
+}
+USER_COLUMNS = (
+    "user_id",
+    "username",
+    "hashed_password",
+    "url_limit",
+    "url_count",
+    "is_admin",
+    "disabled",
+    "token_version",
+)
+
+
+def _user_from_row(row: sqlite3.Row) -> UserModel:
+    return UserModel(
+        user_id=row["user_id"],
+        username=row["username"],
+        hashed_password=row["hashed_password"],
+        url_limit=row["url_limit"],
+        url_count=row["url_count"],
+        is_admin=bool(row["is_admin"]),
+        disabled=bool(row["disabled"]),
+        token_version=row["token_version"],
+    )
+
+
+def _url_from_row(row: sqlite3.Row) -> URLModel:
+    return URLModel(short_url=row["short_url"], url=row["url"], user_id=row["user_id"])
+
+
+def _unavailable(error: sqlite3.OperationalError) -> StorageUnavailableError:
+    if str(error).startswith(SQLITE_NO_SUCH_TABLE):
+        return StorageTableMissingError(str(error))
+    return StorageUnavailableError(str(error))
+
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    Stores everything in a single SQLite file, for single-node deployments.
+    WAL mode lets readers proceed while a write is in progress, and conditional
+    writes run in immediate transactions so their checks can't race.
+    Each thread uses its own connection.
+    """
+
+    name = STORAGE_BACKEND_SQLITE
+
+    def __init__(self, path: str, busy_timeout: float):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit, transactions are opened explicitly where needed
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            # With WAL, NORMAL only risks the last commits on power loss
+            connection.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            raise _unavailable(e) from e
+        try:
+            yield connection
+        except sqlite3.OperationalError as e:
+            connection.execute("ROLLBACK")
+            raise _unavailable(e) from e
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        try:
+            return self._connection().execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            # Raised when the database is locked past the busy timeout
+            raise _unavailable(e) from e
+
+    def create_tables(self) -> List[str]:
+        existing = {
+            row["name"]
+            for row in self._execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        created = []
+        for table, schema in SCHEMA.items():
+            self._connection().executescript(schema)
+            if table not in existing:
+                logger.info(SQLITE_TABLE_CREATED_LOG.format(table_name=table))
+                created.append(table)
+        return created
+
+    def get_url(self, short_url: str) -> Optional[URLModel]:
+        row = self._execute(
+            "SELECT * FROM urls WHERE short_url = ?", (short_url,)
+        ).fetchone()
+        return _url_from_row(row) if row else None
+
+    def get_dedup_short_url(self, dedup_key: str) -> Optional[str]:
+        row = self._execute(
+            "SELECT short_url FROM url_dedup WHERE dedup_key = ?", (dedup_key,)
+        ).fetchone()
+        return row["short_url"] if row else None
+
+    def _url_limit_failed(
+        self, connection: sqlite3.Connection, user_id: str, expected_count: int = None
+    ) -> bool:
+        # Mirrors the DynamoDB conditions: a missing counter fails either check
+        row = connection.execute(
+            "SELECT url_count, url_limit FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None or row["url_count"] is None:
+            return True
+        if expected_count is not None:
+            return row["url_count"] != expected_count
+        return row["url_count"] >= row["url_limit"]
+
+    def _taken(self, connection: sqlite3.Connection, short_urls: List[str]) -> set:
+        placeholders = ",".join("?" * len(short_urls))
+        rows = connection.execute(
+            f"SELECT short_url FROM urls WHERE short_url IN ({placeholders})",
+            short_urls,
+        )
+        return {row["short_url"] for row in rows}
+
+    def insert_url(self, new_url: URLModel, dedup_key: str = None):
+        self._insert_urls([new_url], new_url.user_id, None, dedup_key)
+
+    def insert_urls(self, new_urls: List[URLModel], user_id: str, url_count: int):
+        self._insert_urls(new_urls, user_id, url_count, None)
+
+    def _insert_urls(
+        self,
+        new_urls: List[URLModel],
+        user_id: str,
+        url_count: Optional[int],
+        dedup_key: Optional[str],
+    ):
+        # url_count None checks the limit instead, as a single insert does
+        with self._transaction() as connection:
+            taken = self._taken(connection, [new_url.short_url for new_url in new_urls])
+            failed_items = [
+                index
+                for index, new_url in enumerate(new_urls)
+                if new_url.short_url in taken
+            ]
+            if self._url_limit_failed(connection, user_id, expected_count=url_count):
+                failed_items.append(len(new_urls))
+            if (
+                dedup_key is not None
+                and connection.execute(
+                    "SELECT 1 FROM url_dedup WHERE dedup_key = ?", (dedup_key,)
+                ).fetchone()
+            ):
+                failed_items.append(DEDUP_ITEM_INDEX)
+            if failed_items:
+                raise WriteConflictError(failed_items)
+            if dedup_key is not None:
+                connection.execute(
+                    "INSERT INTO url_dedup (dedup_key, short_url) VALUES (?, ?)",
+                    (dedup_key, new_urls[0].short_url),
+                )
+            connection.executemany(
+                "INSERT INTO urls (short_url, url, user_id) VALUES (?, ?, ?)",
+                [(new_url.short_url, new_url.url, user_id) for new_url in new_urls],
+            )
+            connection.execute(
+                "UPDATE users SET url_count = url_count + ? WHERE user_id = ?",
+                (len(new_urls), user_id),
+            )
+
+    def _paged_rows(self, sql: str, parameters: tuple, page_size: int) -> Iterator:
+        # Keyset pagination on short_url, so no cursor is held open between pages
+        after = ""
+        while True:
+            rows = self._execute(sql, parameters + (after, page_size)).fetchall()
+            yield from rows
+            if len(rows) < page_size:
+                return
+            after = rows[-1]["short_url"]
+
+    def scan_urls(
+        self,
+        page_size: int = None,
+        segment: int = None,
+        total_segments: int = None,
+        short_urls_only: bool = False,
+    ) -> Iterator[URLModel]:
+        columns = "short_url" if short_urls_only else "*"
+        # Segments split the short URLs by the code point of their last character
+        where, parameters = "", ()
+        if total_segments:
+            where, parameters = "unicode(substr(short_url, -1)) % ? = ? AND", (
+                total_segments,
+                segment,
+            )
+        rows = self._paged_rows(
+            f"SELECT {columns} FROM urls WHERE {where} short_url > ? "
+            "ORDER BY short_url LIMIT ?",
+            parameters,
+            page_size or SQLITE_PAGE_SIZE,
+        )
+        for row in rows:
+            if short_urls_only:
+                yield URLModel(short_url=row["short_url"])
+            else:
+                yield _url_from_row(row)
+
+    def query_user_urls(
+        self, user_id: str, page_size: int = None
+    ) -> Iterator[URLModel]:
+        rows = self._paged_rows(
+            "SELECT * FROM urls WHERE user_id = ? AND short_url > ? "
+            "ORDER BY short_url LIMIT ?",
+            (user_id,),
+            page_size or SQLITE_PAGE_SIZE,
+        )
+        for row in rows:
+            yield _url_from_row(row)
+
+    def get_urls_page(
+        self, limit: int, start_key: Optional[dict], user_id: str = None
+    ) -> Tuple[List[URLModel], Optional[dict]]:
+        # One extra row tells whether another page follows
+        after = start_key["short_url"] if start_key else ""
+        if user_id is None:
+            rows = self._execute(
+                "SELECT * FROM urls WHERE short_url > ? ORDER BY short_url LIMIT ?",
+                (after, limit + 1),
+            ).fetchall()
+        else:
+            rows = self._execute(
+                "SELECT * FROM urls WHERE user_id = ? AND short_url > ? "
+                "ORDER BY short_url LIMIT ?",
+                (user_id, after, limit + 1),
+            ).fetchall()
+        page = [_url_from_row(row) for row in rows[:limit]]
+        last_key = {"short_url": page[-1].short_url} if len(rows) > limit else None
+        return page, last_key
+
+    def count_user_urls(self, user_id: str) -> int:
+        return self._execute(
+            "SELECT COUNT(*) FROM urls WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def approximate_url_count(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def get_user(self, user_id: str) -> Optional[UserModel]:
+        row = self._execute(
+            "SELECT * FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return _user_from_row(row) if row else None
+
+    def get_user_by_username(self, username: str) -> Optional[UserModel]:
+        row = self._execute(
+            "SELECT * FROM users WHERE username = ? LIMIT 1", (username,)
+        ).fetchone()
+        return _user_from_row(row) if row else None
+
+    def save_user(self, user: UserModel):
+        self._execute(
+            f"INSERT OR REPLACE INTO users ({', '.join(USER_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(USER_COLUMNS))})",
+            tuple(getattr(user, column) for column in USER_COLUMNS),
+        )
+
+    def update_user(
+        self, user_id: str, changes: dict, bump_token_version: bool
+    ) -> Optional[UserModel]:
+        # Only known columns are interpolated into the statement
+        unknown = set(changes) - set(USER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown user attributes: {sorted(unknown)}")
+        assignments = [f"{name} = ?" for name in changes]
+        if bump_token_version:
+            assignments.append("token_version = token_version + 1")
+        with self._transaction() as connection:
+            updated = connection.execute(
+                f"UPDATE users SET {', '.join(assignments)} WHERE user_id = ?",
+                tuple(changes.values()) + (user_id,),
+            ).rowcount
+            if not updated:
+                return None
+            row = connection.execute(
+                "SELECT * FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return _user_from_row(row)
+
+    def set_url_count(
+        self, user: UserModel, url_count: int, only_if_missing: bool
+    ) -> int:
+        with self._transaction() as connection:
+            condition = " AND url_count IS NULL" if only_if_missing else ""
+            connection.execute(
+                f"UPDATE users SET url_count = ? WHERE user_id = ?{condition}",
+                (url_count, user.user_id),
+            )
+            return connection.execute(
+                "SELECT url_count FROM users WHERE user_id = ?", (user.user_id,)
+            ).fetchone()["url_count"]
+
+    def scan_users(self) -> Iterator[UserModel]:
+        for row in self._execute("SELECT * FROM users").fetchall():
+            yield _user_from_row(row)
+
+    def increment_counter(self, name: str, amount: int) -> int:
+        return self._execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value "
+            "RETURNING value",
+            (name, amount),
+        ).fetchone()["value"]
+
+    def add_clicks(self, short_url: str, clicks: int):
+        self._execute(
+            "INSERT INTO click_stats (short_url, clicks) VALUES (?, ?) "
+            "ON CONFLICT (short_url) DO UPDATE SET clicks = clicks + excluded.clicks",
+            (short_url, clicks),
+        )
+
+    def get_click_count(self, short_url: str) -> int:
+        row = self._execute(
+            "SELECT clicks FROM click_stats WHERE short_url = ?", (short_url,)
+        ).fetchone()
+        return row["clicks"] if row else 0
+
+    def merge_click_bucket(
+        self, short_url: str, bucket: str, clicks: int, visitors: HyperLogLog
+    ):
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT clicks, visitors FROM click_buckets "
+                "WHERE short_url = ? AND bucket = ?",
+                (short_url, bucket),
+            ).fetchone()
+            merged = (
+                HyperLogLog.from_bytes(row["visitors"])
+                if row and row["visitors"]
+                else HyperLogLog(visitors.precision)
+            )
+            merged.merge(visitors)
+            connection.execute(
+                "INSERT OR REPLACE INTO click_buckets "
+                "(short_url, bucket, clicks, visitors) VALUES (?, ?, ?, ?)",
+                (
+                    short_url,
+                    bucket,
+                    (row["clicks"] if row else 0) + clicks,
+                    merged.to_bytes(),
+                ),
+            )
+
+    def query_click_buckets(
+        self, short_url: str, first_bucket: str, last_bucket: str, page_size: int
+    ) -> Iterator[ClickBucketModel]:
+        rows = self._execute(
+            "SELECT * FROM click_buckets WHERE short_url = ? "
+            "AND bucket BETWEEN ? AND ? ORDER BY bucket",
+            (short_url, first_bucket, last_bucket),
+        )
+        for row in rows:
+            yield ClickBucketModel(
+                short_url, row["bucket"], clicks=row["clicks"], visitors=row["visitors"]
+            )
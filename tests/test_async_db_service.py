@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+from service import async_db_service, db_service
+
+
+class TestAsyncDBService(unittest.TestCase):
+    def setUp(self):
+        db_service.redirect_cache.clear()
+        self.addCleanup(db_service.redirect_cache.clear)
+
+    @patch("service.db_service.lookup_original_url")
+    def test_runs_off_event_loop_thread(self, mock_lookup_original_url):
+        calling_threads = []
+        mock_lookup_original_url.side_effect = lambda short_url: (
+            calling_threads.append(threading.get_ident()) or "https://example.com"
+        )
+
+        result = asyncio.run(async_db_service.get_original_url("short"))
+
+        self.assertEqual(result, "https://example.com")
+        mock_lookup_original_url.assert_called_once_with("short")
+        self.assertNotEqual(calling_threads[0], threading.get_ident())
+
+    @patch("service.async_db_service.run_in_threadpool")
+    def test_cache_hits_skip_the_thread_pool(self, mock_run_in_threadpool):
+        db_service.redirect_cache.set("short", "https://example.com")
+        db_service.redirect_cache.set("gone", None)
+
+        self.assertEqual(
+            asyncio.run(async_db_service.get_original_url("short")),
+            "https://example.com",
+        )
+        self.assertIsNone(asyncio.run(async_db_service.get_original_url("gone")))
+        mock_run_in_threadpool.assert_not_called()
+
+    @patch("service.db_service.save_url", side_effect=ValueError("boom"))
+    def test_propagates_exceptions(self, mock_save_url):
+        with self.assertRaises(ValueError):
+            asyncio.run(async_db_service.save_url("https://a.com", "a", "user"))
+
+
+if __name__ == "__main__":
+    unittest.main()
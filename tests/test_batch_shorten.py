@@ -0,0 +1,133 @@
+import itertools
+import unittest
+from unittest.mock import patch, Mock
+from service.storage import WriteConflictError
+from service.db_service import save_urls_batch, redirect_cache, UserModel
+
+
+def transaction_error(*codes):
+    # One code per item of the write, None for items whose condition held
+    return WriteConflictError(index for index, code in enumerate(codes) if code)
+
+
+class TestBatchShorten(unittest.TestCase):
+    def setUp(self):
+        redirect_cache.clear()
+        self.ids = itertools.count()
+        self.generate = lambda: f"gen{next(self.ids)}"
+
+    @patch("service.db_service.insert_urls")
+    @patch.object(UserModel, "get")
+    def test_rejects_items_over_limit(self, mock_get, mock_insert_urls):
+        mock_get.return_value = Mock(url_limit=3, url_count=1)
+
+        results = save_urls_batch(
+            [("https://a.com", None), ("https://b.com", None), ("https://c.com", None)],
+            "user",
+            self.generate,
+        )
+
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["created", "created", "rejected"],
+        )
+        # The rejected item's generated short URL was never stored
+        self.assertEqual(
+            [result["short_url"] for result in results], ["gen0", "gen1", None]
+        )
+        mock_insert_urls.assert_called_once()
+        self.assertEqual(mock_insert_urls.call_args.args[2], 1)
+
+    @patch("service.db_service.insert_urls")
+    @patch.object(UserModel, "get")
+    def test_custom_conflict_does_not_fail_batch(self, mock_get, mock_insert_urls):
+        mock_get.return_value = Mock(url_limit=10, url_count=0)
+        mock_insert_urls.side_effect = [
+            transaction_error(None, "ConditionalCheckFailed", None),
+            None,
+        ]
+
+        results = save_urls_batch(
+            [("https://a.com", None), ("https://b.com", "taken")],
+            "user",
+            self.generate,
+        )
+
+        self.assertEqual(results[0]["status"], "created")
+        self.assertEqual(results[1]["status"], "conflict")
+        self.assertIsNone(results[1]["short_url"])
+        retried_urls = mock_insert_urls.call_args.args[0]
+        self.assertEqual([url.short_url for url in retried_urls], ["gen0"])
+
+    @patch("service.db_service.insert_urls")
+    @patch.object(UserModel, "get")
+    def test_generated_conflict_is_regenerated(self, mock_get, mock_insert_urls):
+        mock_get.return_value = Mock(url_limit=10, url_count=0)
+        mock_insert_urls.side_effect = [
+            transaction_error("ConditionalCheckFailed", None),
+            None,
+        ]
+
+        results = save_urls_batch([("https://a.com", None)], "user", self.generate)
+
+        self.assertEqual(results[0]["status"], "created")
+        self.assertEqual(results[0]["short_url"], "gen1")
+
+    @patch("service.db_service.insert_urls")
+    @patch.object(UserModel, "get")
+    def test_duplicate_custom_short_url_in_batch(self, mock_get, mock_insert_urls):
+        mock_get.return_value = Mock(url_limit=10, url_count=0)
+
+        results = save_urls_batch(
+            [("https://a.com", "same"), ("https://b.com", "same")],
+            "user",
+            self.generate,
+        )
+
+        self.assertEqual(
+            [result["status"] for result in results], ["created", "conflict"]
+        )
+
+    @patch("service.db_service.BATCH_WRITE_CHUNK_SIZE", 2)
+    @patch("service.db_service.insert_urls")
+    @patch.object(UserModel, "get")
+    def test_writes_in_chunks(self, mock_get, mock_insert_urls):
+        mock_get.return_value = Mock(url_limit=10, url_count=0)
+
+        results = save_urls_batch(
+            [(f"https://{index}.com", None) for index in range(5)],
+            "user",
+            self.generate,
+        )
+
+        self.assertTrue(all(result["status"] == "created" for result in results))
+        self.assertEqual(mock_insert_urls.call_count, 3)
+        # Each chunk expects the url_count left by the previous one
+        expected_counts = [call.args[2] for call in mock_insert_urls.call_args_list]
+        self.assertEqual(expected_counts, [0, 2, 4])
+
+    @patch("service.db_service.insert_urls")
+    @patch.object(UserModel, "get")
+    def test_rereads_count_changed_concurrently(self, mock_get, mock_insert_urls):
+        mock_get.side_effect = [
+            Mock(url_limit=2, url_count=0),
+            Mock(url_limit=2, url_count=1),
+        ]
+        mock_insert_urls.side_effect = [
+            transaction_error(None, None, "ConditionalCheckFailed"),
+            None,
+        ]
+
+        results = save_urls_batch(
+            [("https://a.com", None), ("https://b.com", None)],
+            "user",
+            self.generate,
+        )
+
+        self.assertEqual(
+            [result["status"] for result in results], ["created", "rejected"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from benchmarks.compression import measure, sample_urls
+from benchmarks.load import parse_mix, percentile, summarize_latencies
+from benchmarks.report import compare
+
+
+def report(throughput, p95):
+    summary = {"throughput_rps": throughput, "p50_ms": 1, "p95_ms": p95, "p99_ms": 10}
+    return {"results": {"operations": {"redirect": summary}, "total": summary}}
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(
+            parse_mix("redirect=80, shorten=20"), {"redirect": 80.0, "shorten": 20.0}
+        )
+        with self.assertRaises(ValueError):
+            parse_mix("delete=1")
+        with self.assertRaises(ValueError):
+            parse_mix("redirect=0")
+
+    def test_percentile_is_nearest_rank(self):
+        values = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_summarize_latencies(self):
+        summary = summarize_latencies([0.002, 0.001, 0.003], errors=1, seconds=2)
+
+        self.assertEqual(summary["requests"], 3)
+        self.assertEqual(summary["throughput_rps"], 1.5)
+        self.assertEqual(summary["p50_ms"], 2.0)
+
+    def test_compare_flags_regressions(self):
+        _, regressed = compare(report(900, 5.2), report(1000, 5), max_regression_pct=10)
+        self.assertFalse(regressed)
+
+        _, regressed = compare(report(800, 5), report(1000, 5), max_regression_pct=10)
+        self.assertTrue(regressed)
+
+        _, regressed = compare(report(1000, 6), report(1000, 5), max_regression_pct=10)
+        self.assertTrue(regressed)
+
+    def test_compression_measure(self):
+        urls = sample_urls(50, seed=1)
+
+        results = measure(urls, min_length=0, repeat=1)
+
+        self.assertEqual(sample_urls(50, seed=1), urls)
+        self.assertEqual(results["urls"], 50)
+        self.assertLess(results["compressed_bytes"], results["raw_bytes"])
+        self.assertEqual(measure(urls, min_length=10**6), {"urls": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
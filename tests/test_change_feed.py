@@ -0,0 +1,159 @@
+import threading
+import unittest
+from unittest.mock import patch, Mock
+from service import db_service
+from service.change_feed_service import ChangeFeed, InMemoryChangeFeedBackend
+from service.storage.memory import InMemoryStorageBackend
+from utils.constants import CHANGE_EVENT_URL, CHANGE_EVENT_USER
+
+
+class TestChangeFeed(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryChangeFeedBackend()
+        self.publisher = ChangeFeed(self.backend, retry_seconds=0)
+        self.subscriber = ChangeFeed(self.backend, retry_seconds=0)
+        self.addCleanup(self.publisher.stop)
+        self.addCleanup(self.subscriber.stop)
+
+    def start(self, feed, expected_events):
+        events = []
+        received = threading.Event()
+
+        def handler(event):
+            events.append(event)
+            if len(events) == expected_events:
+                received.set()
+
+        feed.start(handler, Mock())
+        return events, received
+
+    def wait_for_subscribers(self, count):
+        # The subscriber threads register asynchronously
+        for _ in range(100):
+            if len(self.backend._subscribers) == count:
+                return
+            threading.Event().wait(0.01)
+        self.fail("subscribers did not start")
+
+    def test_other_workers_receive_changes(self):
+        events, received = self.start(self.subscriber, 2)
+        own_events, _ = self.start(self.publisher, 1)
+        self.wait_for_subscribers(2)
+
+        self.publisher.publish(CHANGE_EVENT_URL, "abc")
+        self.publisher.publish(CHANGE_EVENT_USER, "user", token_version=3)
+
+        self.assertTrue(received.wait(5))
+        self.assertEqual(
+            [(event["type"], event["key"]) for event in events],
+            [(CHANGE_EVENT_URL, "abc"), (CHANGE_EVENT_USER, "user")],
+        )
+        self.assertEqual(events[1]["token_version"], 3)
+        self.assertEqual(own_events, [])
+        self.assertEqual(self.publisher.stats()["published"], 2)
+
+    def test_subscribed_once_listening(self):
+        self.assertFalse(self.subscriber.stats()["subscribed"])
+
+        self.start(self.subscriber, 1)
+
+        self.assertTrue(self.subscriber.subscribed.wait(5))
+        self.assertEqual(len(self.backend._subscribers), 1)
+
+    def test_publish_failures_are_swallowed(self):
+        feed = ChangeFeed(Mock(publish=Mock(side_effect=ConnectionError)), 0)
+
+        feed.publish(CHANGE_EVENT_URL, "abc")
+
+        self.assertEqual(feed.stats()["published"], 0)
+
+    def test_failed_publish_makes_other_workers_reset(self):
+        reset = threading.Event()
+        self.subscriber.start(Mock(), reset.set)
+        self.publisher.start(Mock(), Mock())
+        self.wait_for_subscribers(2)
+        with patch.object(self.backend, "publish", side_effect=ConnectionError):
+            self.publisher.publish(CHANGE_EVENT_URL, "abc")
+            self.assertFalse(reset.is_set())
+
+        # The resync is retried until publishing works again
+        self.assertTrue(reset.wait(5))
+        self.assertGreaterEqual(self.publisher.stats()["publish_errors"], 1)
+
+    def test_subscription_failure_resets_caches(self):
+        backend = Mock(listen=Mock(side_effect=ConnectionError))
+        feed = ChangeFeed(backend, retry_seconds=60)
+        reset = threading.Event()
+
+        feed.start(Mock(), reset.set)
+        self.addCleanup(feed.stop)
+
+        self.assertTrue(reset.wait(5))
+        self.assertFalse(feed.subscribed.is_set())
+
+
+class TestApplyChanges(unittest.TestCase):
+    def setUp(self):
+        db_service.redirect_cache.clear()
+        db_service.user_cache.clear()
+        db_service.token_versions.clear()
+        self.addCleanup(db_service.token_versions.clear)
+
+    def test_url_change_evicts_negative_entry(self):
+        db_service.redirect_cache.set("abc", None)
+
+        db_service.apply_change({"type": CHANGE_EVENT_URL, "key": "abc"})
+
+        self.assertIs(db_service.redirect_cache.get("abc"), db_service.MISSING)
+
+    def test_user_change_evicts_user_and_raises_token_version(self):
+        db_service.user_cache.set("user", Mock())
+        db_service.token_versions.set("user", 5)
+
+        db_service.apply_change(
+            {"type": CHANGE_EVENT_USER, "key": "user", "token_version": 4}
+        )
+        self.assertIs(db_service.user_cache.get("user"), db_service.MISSING)
+        self.assertEqual(db_service.min_token_version("user"), 5)
+
+        db_service.apply_change(
+            {"type": CHANGE_EVENT_USER, "key": "user", "token_version": 6}
+        )
+        self.assertEqual(db_service.min_token_version("user"), 6)
+
+    def test_reset_keeps_cache_stats_and_invalidates_prefilter(self):
+        db_service.token_versions.set("user", 2)
+        db_service.redirect_cache.set("abc", "https://example.com")
+        db_service.redirect_cache.get("abc")
+        hits = db_service.redirect_cache.stats()["hits"]
+        prefilter = Mock()
+
+        with patch(
+            "service.db_service.prefilter_service.redirect_prefilter", prefilter
+        ):
+            db_service.reset_caches()
+
+        self.assertIs(db_service.redirect_cache.get("abc"), db_service.MISSING)
+        self.assertEqual(db_service.redirect_cache.stats()["hits"], hits)
+        self.assertIsNone(db_service.min_token_version("user"))
+        prefilter.invalidate.assert_called_once()
+
+    def test_writes_publish_changes(self):
+        backend = InMemoryStorageBackend()
+        change_feed = Mock()
+        with patch("service.db_service.storage.backend", backend), patch(
+            "service.db_service.change_feed_service.change_feed", change_feed
+        ):
+            db_service.save_new_user("alice", "hash", admin=False)
+            user = db_service.get_user_by_username("alice")
+            db_service.save_url("https://example.com", "abc", user.user_id)
+            db_service.update_url_limit(user.user_id, 50)
+
+        change_feed.publish.assert_any_call(CHANGE_EVENT_URL, "abc")
+        change_feed.publish.assert_any_call(
+            CHANGE_EVENT_USER, user.user_id, token_version=1
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
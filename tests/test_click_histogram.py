@@ -0,0 +1,181 @@
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import patch, Mock
+from pynamodb.exceptions import DoesNotExist, PutError
+from service.click_service import ClickAggregator
+from service.storage import StorageTableMissingError
+from models.db_models import ClickBucketModel
+from service.db_service import get_click_histogram, merge_click_bucket
+from utils.hyperloglog import HyperLogLog
+
+
+def sketch_of(*visitors, precision=10):
+    sketch = HyperLogLog(precision)
+    for visitor in visitors:
+        sketch.add(visitor)
+    return sketch
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_estimate_is_close(self):
+        sketch = sketch_of(*(f"visitor-{i}" for i in range(10000)))
+
+        self.assertAlmostEqual(sketch.count(), 10000, delta=1000)
+
+    def test_duplicates_are_not_counted(self):
+        sketch = sketch_of(*(["a", "b", "c"] * 100))
+
+        self.assertEqual(sketch.count(), 3)
+
+    def test_merge_is_union(self):
+        merged = sketch_of(*(f"visitor-{i}" for i in range(1000)))
+        merged.merge(sketch_of(*(f"visitor-{i}" for i in range(500, 1500))))
+
+        self.assertAlmostEqual(merged.count(), 1500, delta=150)
+
+    def test_reduced_matches_a_lower_precision_sketch(self):
+        visitors = [f"visitor-{i}" for i in range(2000)]
+
+        reduced = sketch_of(*visitors, precision=12).reduced(8)
+
+        self.assertEqual(reduced.registers, sketch_of(*visitors, precision=8).registers)
+
+    def test_merge_of_different_precisions_uses_the_lower(self):
+        merged = sketch_of(*(f"visitor-{i}" for i in range(1000)), precision=12)
+        merged.merge(sketch_of(*(f"visitor-{i}" for i in range(500, 1500))))
+
+        self.assertEqual(merged.precision, 10)
+        self.assertAlmostEqual(merged.count(), 1500, delta=150)
+
+    def test_serialization_round_trip(self):
+        sketch = sketch_of("a", "b")
+
+        restored = HyperLogLog.from_bytes(sketch.to_bytes())
+
+        self.assertEqual(restored.precision, 10)
+        self.assertEqual(restored.registers, sketch.registers)
+
+
+class TestClickBuckets(unittest.TestCase):
+    def test_aggregator_sketches_visitors_per_hour(self):
+        write_bucket = Mock()
+        aggregator = ClickAggregator(
+            Mock(),
+            max_keys=10,
+            flush_threshold=100,
+            flush_seconds=60,
+            write_bucket=write_bucket,
+        )
+        for visitor in ["1.1.1.1|ua", "2.2.2.2|ua", "1.1.1.1|ua"]:
+            aggregator.record("abc", visitor)
+
+        aggregator.flush()
+
+        short_url, _, clicks, visitors = write_bucket.call_args.args
+        self.assertEqual((short_url, clicks, visitors.count()), ("abc", 3, 2))
+
+    def test_buckets_are_written_concurrently(self):
+        written = []
+        both_started = threading.Barrier(2, timeout=5)
+
+        def write_bucket(short_url, hour, clicks, visitors):
+            both_started.wait()
+            written.append(short_url)
+
+        aggregator = ClickAggregator(
+            Mock(),
+            max_keys=10,
+            flush_threshold=100,
+            flush_seconds=60,
+            write_bucket=write_bucket,
+            flush_workers=2,
+        )
+        aggregator.record("a", "visitor")
+        aggregator.record("b", "visitor")
+
+        self.assertEqual(aggregator.flush(), 2)
+        self.assertEqual(sorted(written), ["a", "b"])
+
+    @patch("service.click_service.logger")
+    def test_missing_bucket_table_disables_histograms_once(self, mock_logger):
+        write_bucket = Mock(side_effect=StorageTableMissingError("ClickBuckets"))
+        write_clicks = Mock()
+        aggregator = ClickAggregator(
+            write_clicks,
+            max_keys=10,
+            flush_threshold=100,
+            flush_seconds=60,
+            write_bucket=write_bucket,
+        )
+        aggregator.record("a", "visitor")
+        aggregator.record("b", "visitor")
+
+        self.assertEqual(aggregator.flush(), 2)
+        aggregator.record("a", "visitor")
+        self.assertEqual(aggregator.flush(), 1)
+
+        self.assertEqual(write_bucket.call_count, 1)
+        self.assertEqual(write_clicks.call_count, 3)
+        mock_logger.warning.assert_called_once()
+        mock_logger.error.assert_not_called()
+        self.assertFalse(aggregator.stats()["histograms"])
+
+    @patch.object(ClickBucketModel, "save")
+    @patch.object(ClickBucketModel, "get", side_effect=DoesNotExist)
+    def test_merge_retries_when_bucket_changed(self, mock_get, mock_save):
+        mock_save.side_effect = [
+            PutError("Failed to put item: ConditionalCheckFailedException"),
+            None,
+        ]
+
+        merge_click_bucket("abc", "2026101812", 2, sketch_of("a"))
+
+        self.assertEqual(mock_save.call_count, 2)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch.object(ClickBucketModel, "query")
+    def test_daily_histogram_merges_hours(self, mock_query):
+        mock_query.return_value = [
+            Mock(bucket="2026101800", clicks=2, visitors=sketch_of("a").to_bytes()),
+            Mock(
+                bucket="2026101801", clicks=3, visitors=sketch_of("a", "b").to_bytes()
+            ),
+            Mock(bucket="2026101900", clicks=1, visitors=sketch_of("c").to_bytes()),
+        ]
+
+        histogram = get_click_histogram(
+            "abc", datetime(2026, 10, 18), datetime(2026, 10, 19, 23), "day"
+        )
+
+        self.assertEqual(histogram["clicks"], 6)
+        self.assertEqual(histogram["unique_visitors"], 3)
+        self.assertEqual(
+            [
+                (point["clicks"], point["unique_visitors"])
+                for point in histogram["points"]
+            ],
+            [(5, 2), (1, 1)],
+        )
+        self.assertEqual(histogram["points"][0]["start"], "2026-10-18T00:00:00+00:00")
+
+    @patch.object(ClickBucketModel, "query")
+    def test_histogram_merges_sketches_of_older_precision(self, mock_query):
+        mock_query.return_value = [
+            Mock(bucket="2026101800", clicks=1, visitors=sketch_of("a").to_bytes()),
+            Mock(
+                bucket="2026101801",
+                clicks=1,
+                visitors=sketch_of("b", precision=6).to_bytes(),
+            ),
+        ]
+
+        histogram = get_click_histogram(
+            "abc", datetime(2026, 10, 18), datetime(2026, 10, 18, 23), "day"
+        )
+
+        self.assertEqual(histogram["unique_visitors"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
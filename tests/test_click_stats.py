@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch, Mock
+from fastapi.testclient import TestClient
+from api.api_endpoints import app
+from models.db_models import UserInDB
+from service.auth_service import get_current_active_user
+from service.click_service import ClickAggregator
+from service.db_service import redirect_cache
+from service.storage import StorageTableMissingError
+
+
+def make_aggregator(write_clicks=None, max_keys=10, flush_threshold=100):
+    return ClickAggregator(
+        write_clicks or Mock(),
+        max_keys=max_keys,
+        flush_threshold=flush_threshold,
+        flush_seconds=60,
+    )
+
+
+class TestClickAggregator(unittest.TestCase):
+    def test_flush_writes_one_update_per_short_url(self):
+        write_clicks = Mock()
+        aggregator = make_aggregator(write_clicks)
+        for short_url in ["a", "b", "a", "a"]:
+            aggregator.record(short_url)
+
+        self.assertEqual(aggregator.flush(), 4)
+
+        write_clicks.assert_any_call("a", 3)
+        write_clicks.assert_any_call("b", 1)
+        self.assertEqual(write_clicks.call_count, 2)
+        self.assertEqual(aggregator.pending("a"), 0)
+
+    def test_full_buffer_drops_new_short_urls(self):
+        aggregator = make_aggregator(max_keys=1)
+
+        aggregator.record("a")
+        aggregator.record("b")
+        aggregator.record("a")
+
+        self.assertEqual(aggregator.pending("a"), 2)
+        self.assertEqual(aggregator.stats()["dropped"], 1)
+
+    def test_failed_write_is_retried_on_next_flush(self):
+        write_clicks = Mock(side_effect=[Exception("throttled"), None])
+        aggregator = make_aggregator(write_clicks)
+        aggregator.record("a")
+
+        self.assertEqual(aggregator.flush(), 0)
+        self.assertEqual(aggregator.pending("a"), 1)
+        self.assertEqual(aggregator.flush(), 1)
+
+        self.assertEqual(aggregator.stats()["flush_errors"], 1)
+
+    def test_threshold_wakes_flush_thread(self):
+        aggregator = make_aggregator(flush_threshold=2)
+
+        aggregator.record("a")
+        self.assertFalse(aggregator._wake.is_set())
+        aggregator.record("a")
+        self.assertTrue(aggregator._wake.is_set())
+
+    @patch("service.click_service.logger")
+    def test_missing_table_disables_tracking_once(self, mock_logger):
+        write_clicks = Mock(side_effect=StorageTableMissingError("ClickStats"))
+        aggregator = make_aggregator(write_clicks)
+        aggregator.record("a")
+        aggregator.record("b")
+
+        self.assertEqual(aggregator.flush(), 0)
+        aggregator.record("a")
+
+        self.assertEqual(aggregator.flush(), 0)
+        self.assertEqual(aggregator.pending("a"), 0)
+        self.assertTrue(aggregator.stats()["disabled"])
+        mock_logger.warning.assert_called_once()
+        mock_logger.error.assert_not_called()
+
+    def test_stop_flushes_buffered_clicks(self):
+        write_clicks = Mock()
+        aggregator = make_aggregator(write_clicks)
+        aggregator.start()
+        aggregator.record("a")
+
+        aggregator.stop()
+
+        write_clicks.assert_called_once_with("a", 1)
+
+
+class TestClickEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.aggregator = make_aggregator()
+        patcher = patch("service.click_service.click_aggregator", self.aggregator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        redirect_cache.clear()
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def login_as(self, user_id, is_admin=False):
+        app.dependency_overrides[get_current_active_user] = lambda: UserInDB(
+            user_id=user_id,
+            username=user_id,
+            is_admin=is_admin,
+            hashed_password="",
+            disabled=False,
+        )
+
+    @patch("api.api_endpoints.URLModel.get")
+    def test_redirect_records_click(self, mock_get):
+        mock_get.return_value = Mock(url="https://example.com")
+
+        self.client.get("/redirect/abc", allow_redirects=False)
+
+        self.assertEqual(self.aggregator.pending("abc"), 1)
+
+    @patch("service.async_db_service.db_service.get_click_count", return_value=5)
+    @patch("service.async_db_service.db_service.get_url_owner", return_value="owner")
+    def test_stats_include_buffered_clicks(self, mock_owner, mock_clicks):
+        self.login_as("owner")
+        self.aggregator.record("abc")
+
+        response = self.client.get("/stats/abc")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"short_url": "abc", "clicks": 6})
+
+    @patch("service.async_db_service.db_service.get_url_owner", return_value="owner")
+    def test_stats_of_other_users_are_forbidden(self, mock_owner):
+        self.login_as("someone_else")
+
+        response = self.client.get("/stats/abc")
+
+        self.assertEqual(response.status_code, 403)
+
+    @patch("service.async_db_service.db_service.get_url_owner", return_value=None)
+    def test_stats_of_missing_short_url(self, mock_owner):
+        self.login_as("owner")
+
+        response = self.client.get("/stats/missing")
+
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
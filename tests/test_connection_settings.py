@@ -0,0 +1,42 @@
+import unittest
+from unittest.mock import patch
+from models.db_models import (
+    TABLE_MODELS,
+    ConnectionMeta,
+    transaction_connection,
+    warm_up_connections,
+)
+
+
+class TestConnectionSettings(unittest.TestCase):
+    def test_models_share_connection_settings(self):
+        for model in TABLE_MODELS:
+            self.assertEqual(
+                model.Meta.max_pool_connections, ConnectionMeta.max_pool_connections
+            )
+            self.assertEqual(
+                model.Meta.read_timeout_seconds, ConnectionMeta.read_timeout_seconds
+            )
+            self.assertEqual(
+                model.Meta.max_retry_attempts, ConnectionMeta.max_retry_attempts
+            )
+
+    def test_transaction_connection_uses_same_settings(self):
+        self.assertEqual(
+            transaction_connection._max_pool_connections,
+            ConnectionMeta.max_pool_connections,
+        )
+
+    def test_warm_up_describes_each_table(self):
+        for model in TABLE_MODELS:
+            patch.object(model, "describe_table").start()
+        self.addCleanup(patch.stopall)
+
+        warm_up_connections(connections_per_table=3)
+
+        for model in TABLE_MODELS:
+            self.assertEqual(model.describe_table.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from unittest.mock import patch
+from models.db_models import create_tables, URLModel, UserModel, TABLE_MODELS
+
+
+class TestCreateTables(unittest.TestCase):
+    def patch_tables(self, missing):
+        for model in TABLE_MODELS:
+            patch.object(model, "exists", return_value=model not in missing).start()
+            patch.object(model, "create_table").start()
+        self.addCleanup(patch.stopall)
+
+    def test_creates_only_missing_tables(self):
+        self.patch_tables(missing={URLModel, UserModel})
+
+        self.assertEqual(create_tables(), ["URLs", "Users"])
+        URLModel.create_table.assert_called_once()
+
+    def test_creates_nothing_when_tables_exist(self):
+        self.patch_tables(missing=set())
+
+        self.assertEqual(create_tables(), [])
+        for model in TABLE_MODELS:
+            model.create_table.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import io
+import json
+import time
+import unittest
+from unittest.mock import patch, Mock
+from service.export_service import export_urls, format_records, parallel_scan_urls
+from utils.constants import EXPORT_QUEUE_TIMEOUT_SECONDS
+
+
+def fake_segment_scan(segment, total_segments, page_size):
+    # Each segment returns two URLs tagged with its segment number
+    return [
+        Mock(
+            short_url=f"s{segment}-{index}",
+            url=f"https://example.com/{segment}/{index}",
+            user_id="user",
+        )
+        for index in range(2)
+    ]
+
+
+class TestParallelExport(unittest.TestCase):
+    @patch(
+        "service.export_service.storage.backend.scan_urls",
+        side_effect=fake_segment_scan,
+    )
+    def test_merges_all_segments(self, mock_scan):
+        records = list(parallel_scan_urls(total_segments=4))
+
+        self.assertEqual(len(records), 8)
+        self.assertEqual(mock_scan.call_count, 4)
+        segments = {call.kwargs["segment"] for call in mock_scan.call_args_list}
+        self.assertEqual(segments, {0, 1, 2, 3})
+
+    @patch(
+        "service.export_service.storage.backend.scan_urls",
+        side_effect=fake_segment_scan,
+    )
+    def test_jsonl_export_reports_throughput(self, mock_scan):
+        output = io.StringIO()
+
+        stats = export_urls(output, "jsonl", total_segments=2)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[0])["user_id"], "user")
+        self.assertEqual(stats["items"], 4)
+        self.assertEqual(stats["segments"], 2)
+
+    @patch(
+        "service.export_service.storage.backend.scan_urls",
+        side_effect=fake_segment_scan,
+    )
+    def test_csv_export_has_header(self, mock_scan):
+        output = io.StringIO()
+
+        export_urls(output, "csv", total_segments=1)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], "short_url,original_url,user_id")
+        self.assertEqual(len(lines), 3)
+
+    @patch("service.export_service.EXPORT_CHUNK_RECORDS", 2)
+    def test_records_are_emitted_in_chunks(self):
+        records = [
+            {"short_url": f"s{index}", "original_url": "https://a.com", "user_id": "u"}
+            for index in range(5)
+        ]
+
+        jsonl_chunks = list(format_records(iter(records), "jsonl"))
+        csv_chunks = list(format_records(iter(records), "csv"))
+
+        self.assertEqual([chunk.count("\n") for chunk in jsonl_chunks], [2, 2, 1])
+        # The header goes out with the first chunk
+        self.assertEqual([chunk.count("\n") for chunk in csv_chunks], [3, 2, 1])
+
+    @patch("service.export_service.EXPORT_CHUNK_SIZE", 1)
+    def test_large_records_flush_the_chunk_early(self):
+        records = [{"short_url": "s", "original_url": "u", "user_id": "u"}] * 3
+
+        self.assertEqual(len(list(format_records(iter(records), "jsonl"))), 3)
+
+    @patch("service.export_service.storage.backend.scan_urls")
+    def test_segment_error_is_raised(self, mock_scan):
+        mock_scan.side_effect = ConnectionError("DB connection error")
+
+        with self.assertRaises(ConnectionError):
+            list(parallel_scan_urls(total_segments=2))
+
+    @patch("service.export_service.EXPORT_QUEUE_SIZE", 1)
+    @patch("service.export_service.EXPORT_MAX_WORKERS", 1)
+    @patch(
+        "service.export_service.storage.backend.scan_urls",
+        side_effect=fake_segment_scan,
+    )
+    def test_closing_the_export_cancels_queued_segments(self, mock_scan):
+        records = parallel_scan_urls(total_segments=8)
+        next(records)
+
+        records.close()
+        # Lets the running segment notice the stop
+        time.sleep(EXPORT_QUEUE_TIMEOUT_SECONDS * 2)
+
+        self.assertEqual(mock_scan.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
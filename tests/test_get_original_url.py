@@ -1,11 +1,14 @@
 import unittest
 from unittest.mock import patch
 from fastapi.exceptions import HTTPException
-from service.db_service import get_original_url, URLModel
+from service.db_service import get_original_url, redirect_cache, URLModel
 from pynamodb.exceptions import DoesNotExist
 
 
 class TestGetOriginalURL(unittest.TestCase):
+    def setUp(self):
+        redirect_cache.clear()
+
     @patch.object(URLModel, "get")
     def test_valid_retrieval(self, mock_get):
         # Mocking DB response for valid short URL
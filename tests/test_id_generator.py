@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import Mock
+from service.id_service import encode_base62, LeasedBase62IdGenerator
+
+
+class TestLeasedBase62IdGenerator(unittest.TestCase):
+    def test_encode_base62(self):
+        self.assertEqual(encode_base62(0), "0")
+        self.assertEqual(encode_base62(61), "Z")
+        self.assertEqual(encode_base62(62), "10")
+        self.assertEqual(encode_base62(1, min_length=3), "001")
+
+    def test_leases_one_block_at_a_time(self):
+        lease_block = Mock(side_effect=[0, 100])
+        generator = LeasedBase62IdGenerator(
+            lease_block, block_size=3, scramble=False, scrambled_length=7
+        )
+
+        ids = [generator.next_id() for _ in range(4)]
+
+        self.assertEqual(ids, ["0", "1", "2", "1C"])
+        self.assertEqual(lease_block.call_count, 2)
+        lease_block.assert_called_with(3)
+
+    def test_scrambled_ids_are_unique_and_fixed_length(self):
+        generator = LeasedBase62IdGenerator(
+            Mock(return_value=0), block_size=5000, scramble=True, scrambled_length=4
+        )
+
+        ids = [generator.next_id() for _ in range(5000)]
+
+        self.assertEqual(len(set(ids)), 5000)
+        self.assertTrue(all(len(short_id) == 4 for short_id in ids))
+        # Consecutive sequence numbers don't produce consecutive IDs
+        self.assertNotEqual(ids[1], encode_base62(1, 4))
+
+    def test_sequences_past_scrambled_space_are_longer(self):
+        generator = LeasedBase62IdGenerator(
+            Mock(return_value=62**2), block_size=1, scramble=True, scrambled_length=2
+        )
+
+        self.assertEqual(generator.next_id(), "100")
+
+
+if __name__ == "__main__":
+    unittest.main()
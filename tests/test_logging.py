@@ -0,0 +1,30 @@
+import unittest
+from unittest.mock import patch
+from utils.logger_config import log_sampled, parse_sample_rates
+
+
+class TestLogSampling(unittest.TestCase):
+    def test_parse_sample_rates(self):
+        self.assertEqual(
+            parse_sample_rates("redirect=0.01, auth=1"),
+            {"redirect": 0.01, "auth": 1.0},
+        )
+        self.assertEqual(parse_sample_rates(""), {})
+
+    @patch("utils.logger_config.sample_rates", {"redirect": 0.0})
+    def test_sampled_out_events(self):
+        self.assertFalse(any(log_sampled("redirect") for _ in range(100)))
+
+    @patch("utils.logger_config.sample_rates", {"redirect": 0.0})
+    def test_unlisted_events_are_always_logged(self):
+        self.assertTrue(all(log_sampled("login") for _ in range(100)))
+
+    @patch("utils.logger_config.sample_rates", {"redirect": 0.5})
+    @patch("utils.logger_config.random.random", side_effect=[0.2, 0.7])
+    def test_partial_sampling(self, mock_random):
+        self.assertTrue(log_sampled("redirect"))
+        self.assertFalse(log_sampled("redirect"))
+
+
+if __name__ == "__main__":
+    unittest.main()
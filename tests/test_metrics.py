@@ -0,0 +1,132 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, values
+from pynamodb.exceptions import DoesNotExist, GetError
+from api.api_endpoints import app
+from service.db_service import redirect_cache
+from service.metrics_service import (
+    CacheStatsPublisher,
+    observe_db,
+    monitor_event_loop_lag,
+)
+from utils.cache import TTLCache
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestDatabaseMetrics(unittest.TestCase):
+    def test_observes_latency(self):
+        before = sample("dynamodb_operation_seconds_count", table="T", operation="Op")
+
+        with observe_db("T", "Op"):
+            pass
+
+        after = sample("dynamodb_operation_seconds_count", table="T", operation="Op")
+        self.assertEqual(after - before, 1)
+
+    def test_counts_throttles(self):
+        error = GetError("Failed to get item")
+        labels = {"table": "T", "operation": "Throttled"}
+        before = sample("dynamodb_throttles_total", **labels)
+
+        with patch.object(
+            GetError, "cause_response_code", "ProvisionedThroughputExceededException"
+        ):
+            with self.assertRaises(GetError):
+                with observe_db("T", "Throttled"):
+                    raise error
+
+        self.assertEqual(sample("dynamodb_throttles_total", **labels) - before, 1)
+
+    def test_missing_item_is_not_an_error(self):
+        with self.assertRaises(DoesNotExist):
+            with observe_db("T", "Missing"):
+                raise DoesNotExist()
+
+        self.assertEqual(
+            sample(
+                "dynamodb_operation_errors_total",
+                table="T",
+                operation="Missing",
+                error="DoesNotExist",
+            ),
+            0,
+        )
+
+    def test_event_loop_lag_is_recorded(self):
+        before = sample("event_loop_lag_seconds_count")
+
+        async def run_monitor():
+            task = asyncio.create_task(monitor_event_loop_lag(0.01))
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(run_monitor())
+
+        self.assertGreater(sample("event_loop_lag_seconds_count") - before, 0)
+
+
+class TestCacheStatsPublisher(unittest.TestCase):
+    def test_publishes_increases_since_last_publish(self):
+        cache = TTLCache(max_size=10, ttl=60)
+        publisher = CacheStatsPublisher({"test": lambda: cache})
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+
+        publisher.publish()
+        cache.get("a")
+        cache.clear()
+        publisher.publish()
+
+        hits = publisher.counters["hits"].labels("test")._value.get()
+        misses = publisher.counters["misses"].labels("test")._value.get()
+        self.assertEqual((hits, misses), (2, 1))
+        self.assertEqual(publisher.size.labels("test")._value.get(), 0)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        redirect_cache.clear()
+
+    @patch("api.api_endpoints.URLModel.get")
+    def test_exposes_route_and_cache_metrics(self, mock_get):
+        mock_get.return_value = Mock(url="https://example.com")
+        hits = redirect_cache.stats()["hits"]
+        self.client.get("/redirect/abc", allow_redirects=False)
+        self.client.get("/redirect/abc", allow_redirects=False)
+
+        body = self.client.get("/metrics").text
+
+        self.assertIn('path_template="/redirect/{short_url}"', body)
+        self.assertIn(f'cache_hits_total{{cache="redirect"}} {hits + 1}.0', body)
+        self.assertIn('table="URLs"', body)
+
+    def test_multiprocess_mode_merges_worker_files(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = TTLCache(max_size=10, ttl=60)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+        with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory.name}):
+            # The value class is normally chosen from the variable at import
+            with patch.object(values, "ValueClass", values.MultiProcessValue()):
+                CacheStatsPublisher({"worker": lambda: cache}).publish()
+
+            body = self.client.get("/metrics").text
+
+        self.assertIn('cache_hits_total{cache="worker"} 1.0', body)
+        self.assertIn('cache_misses_total{cache="worker"} 1.0', body)
+        self.assertIn('cache_size{cache="worker"} 1.0', body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+from unittest.mock import patch, Mock
+from passlib.hash import bcrypt
+from service.auth_service import authenticate_user, authenticate_user_async
+from service.password_service import PasswordHasher, verify_and_update
+
+# A valid hash made with a lower cost than the configured BCRYPT_ROUNDS
+OUTDATED_HASH = bcrypt.using(rounds=4).hash("secret")
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def test_thread_pool_fallback(self):
+        hasher = PasswordHasher(max_workers=0, max_concurrency=2)
+
+        async def run():
+            hashed_password = await hasher.hash("secret")
+            return await hasher.verify("secret", hashed_password)
+
+        self.assertTrue(asyncio.run(run()))
+        stats = hasher.stats()
+        self.assertEqual(stats["completed"], 2)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["waiting"], 0)
+
+    def test_process_pool(self):
+        hasher = PasswordHasher(max_workers=1, max_concurrency=1)
+        try:
+            verified = asyncio.run(hasher.verify("secret", OUTDATED_HASH))
+        finally:
+            hasher.shutdown()
+        self.assertTrue(verified)
+
+    def test_concurrency_cap_queues_requests(self):
+        hasher = PasswordHasher(max_workers=0, max_concurrency=1)
+
+        async def run():
+            return await asyncio.gather(
+                *(hasher.verify("secret", OUTDATED_HASH) for _ in range(3))
+            )
+
+        self.assertEqual(asyncio.run(run()), [True, True, True])
+        # One request runs while the other two wait behind the cap
+        self.assertEqual(hasher.stats()["max_waiting"], 2)
+
+    def test_can_be_used_from_another_event_loop(self):
+        hasher = PasswordHasher(max_workers=0, max_concurrency=1)
+
+        async def run():
+            return await asyncio.gather(
+                *(hasher.verify("secret", OUTDATED_HASH) for _ in range(2))
+            )
+
+        # The contended semaphore of the first loop must not be reused
+        self.assertEqual(asyncio.run(run()), [True, True])
+        self.assertEqual(asyncio.run(run()), [True, True])
+
+    def test_outdated_cost_needs_update(self):
+        verified, new_hash = verify_and_update("secret", OUTDATED_HASH)
+
+        self.assertTrue(verified)
+        self.assertIsNotNone(new_hash)
+        self.assertEqual(verify_and_update("wrong", OUTDATED_HASH), (False, None))
+
+
+class TestRehashOnLogin(unittest.TestCase):
+    @patch("service.auth_service.update_password_hash")
+    @patch("service.auth_service.get_user_by_username")
+    def test_rehashes_outdated_hash(self, mock_get_user, mock_update_hash):
+        mock_get_user.return_value = Mock(
+            user_id="user", username="user", hashed_password=OUTDATED_HASH
+        )
+
+        self.assertIsNotNone(authenticate_user("user", "secret"))
+
+        mock_update_hash.assert_called_once()
+        self.assertEqual(mock_update_hash.call_args.args[0], "user")
+
+    @patch(
+        "service.auth_service.password_hasher",
+        PasswordHasher(max_workers=0, max_concurrency=1),
+    )
+    @patch("service.auth_service.update_password_hash")
+    @patch("service.auth_service.get_user_by_username")
+    def test_async_login_rejects_wrong_password(self, mock_get_user, mock_update_hash):
+        mock_get_user.return_value = Mock(
+            user_id="user", username="user", hashed_password=OUTDATED_HASH
+        )
+
+        user = asyncio.run(authenticate_user_async("user", "wrong"))
+
+        self.assertIsNone(user)
+        mock_update_hash.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
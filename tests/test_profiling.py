@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from service import profiling_service
+from service.auth_service import is_admin_token
+from service.metrics_service import observe_db
+from service.profiling_service import RequestTimings, timed_phase
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def profile(request: Request, call_next):
+        mode = request.headers.get("X-Profile")
+        return await profiling_service.profile_request(request, call_next, mode)
+
+    @app.get("/work")
+    def work():
+        with timed_phase("auth"):
+            with observe_db("T", "GetItem"):
+                pass
+        return {"ok": True}
+
+    return app
+
+
+class TestRequestTimings(unittest.TestCase):
+    @patch("service.profiling_service.time.perf_counter")
+    def test_nested_phases_are_exclusive(self, mock_clock):
+        mock_clock.side_effect = [0.0, 1.0, 3.0, 4.0]
+        timings = RequestTimings()
+
+        with timings.phase("auth"):
+            with timings.phase("storage"):
+                pass
+
+        self.assertEqual(dict(timings.durations), {"auth": 2.0, "storage": 2.0})
+
+    def test_server_timing_header(self):
+        timings = RequestTimings()
+        timings.durations["storage"] = 0.002
+
+        header = timings.server_timing(0.005)
+
+        self.assertEqual(header, "storage;dur=2.00, response;dur=3.00, total;dur=5.00")
+
+    def test_timed_phase_is_noop_outside_profiled_requests(self):
+        with timed_phase("storage"):
+            pass
+
+
+class TestProfileRequest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(make_app())
+
+    def test_adds_server_timing(self):
+        response = self.client.get("/work", headers={"X-Profile": "timing"})
+
+        phases = [
+            entry.split(";")[0]
+            for entry in response.headers["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(phases, ["auth", "storage", "response", "total"])
+        self.assertNotIn("X-Profile-File", response.headers)
+
+    def test_writes_cprofile_dump(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with patch("service.profiling_service.PROFILE_DIR", profile_dir):
+                response = self.client.get("/work", headers={"X-Profile": "cprofile"})
+
+            profile_file = response.headers["X-Profile-File"]
+            self.assertTrue(os.path.exists(os.path.join(profile_dir, profile_file)))
+            self.assertEqual(
+                response.headers["X-Profile-Scope"], "event-loop; time-window"
+            )
+
+
+class TestAdminToken(unittest.TestCase):
+    @patch("service.auth_service.user_from_token")
+    def test_requires_admin_bearer_token(self, mock_user_from_token):
+        mock_user_from_token.return_value = Mock(is_admin=True, disabled=False)
+        self.assertTrue(is_admin_token("Bearer token"))
+        self.assertFalse(is_admin_token(None))
+        self.assertFalse(is_admin_token("Basic token"))
+
+        mock_user_from_token.return_value = Mock(is_admin=False, disabled=False)
+        self.assertFalse(is_admin_token("Bearer token"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 import unittest
 from api.api_endpoints import app
 from pynamodb.exceptions import DoesNotExist
+from service.db_service import redirect_cache
 
 client = TestClient(app)
 
@@ -12,6 +13,7 @@ class TestRedirect(unittest.TestCase):
         self.client = TestClient(app)
         self.mock_get_patcher = patch("api.api_endpoints.URLModel.get")
         self.mock_get = self.mock_get_patcher.start()
+        redirect_cache.clear()
 
     def tearDown(self):
         self.mock_get_patcher.stop()
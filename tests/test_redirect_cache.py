@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+from pynamodb.exceptions import DoesNotExist
+from service.db_service import get_original_url, redirect_cache, URLModel
+from utils.cache import TTLCache, MISSING
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # Touch "a" so "b" becomes the least recently used entry
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    @patch("utils.cache.time.monotonic")
+    def test_expires_entries(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = TTLCache(max_size=10, ttl=5)
+        cache.set("a", 1)
+        cache.set("b", None, ttl=1)
+
+        mock_monotonic.return_value = 102.0
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIs(cache.get("b"), MISSING)
+
+        mock_monotonic.return_value = 106.0
+        self.assertIs(cache.get("a"), MISSING)
+
+    def test_disabled_when_size_is_zero(self):
+        cache = TTLCache(max_size=0, ttl=60)
+        cache.set("a", 1)
+        self.assertIs(cache.get("a"), MISSING)
+
+
+class TestRedirectCache(unittest.TestCase):
+    def setUp(self):
+        redirect_cache.clear()
+
+    def tearDown(self):
+        redirect_cache.clear()
+
+    @patch.object(URLModel, "get")
+    def test_hit_skips_database(self, mock_get):
+        mock_instance = URLModel()
+        mock_instance.url = "https://example.com"
+        mock_get.return_value = mock_instance
+
+        hits = redirect_cache.stats()["hits"]
+
+        self.assertEqual(get_original_url("cached"), "https://example.com")
+        self.assertEqual(get_original_url("cached"), "https://example.com")
+
+        mock_get.assert_called_once()
+        self.assertEqual(redirect_cache.stats()["hits"], hits + 1)
+
+    @patch.object(URLModel, "get")
+    def test_negative_entry_skips_database(self, mock_get):
+        mock_get.side_effect = DoesNotExist
+
+        self.assertIsNone(get_original_url("missing"))
+        self.assertIsNone(get_original_url("missing"))
+
+        mock_get.assert_called_once()
+
+    @patch.object(URLModel, "get")
+    def test_errors_are_not_cached(self, mock_get):
+        mock_get.side_effect = Exception("Unexpected error")
+
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                get_original_url("broken")
+
+        self.assertEqual(mock_get.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
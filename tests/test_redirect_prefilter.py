@@ -0,0 +1,144 @@
+import threading
+import unittest
+from unittest.mock import patch, Mock
+from service import prefilter_service
+from service.prefilter_service import RedirectPrefilter
+from service.db_service import get_original_url, save_url, redirect_cache, URLModel
+from utils.bloom import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+        keys = [f"code{index}" for index in range(1000)]
+        for key in keys:
+            bloom_filter.add(key)
+
+        self.assertTrue(all(key in bloom_filter for key in keys))
+        self.assertEqual(bloom_filter.count, 1000)
+
+    def test_false_positive_rate_near_target(self):
+        bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+        for index in range(1000):
+            bloom_filter.add(f"code{index}")
+
+        false_positives = sum(f"other{index}" in bloom_filter for index in range(10000))
+
+        self.assertLess(false_positives / 10000, 0.03)
+        self.assertLess(bloom_filter.false_positive_rate(), 0.03)
+
+
+class TestRedirectPrefilter(unittest.TestCase):
+    def setUp(self):
+        redirect_cache.clear()
+        self.prefilter = RedirectPrefilter(
+            capacity=100, error_rate=0.01, rebuild_seconds=0
+        )
+        self.prefilter_patcher = patch.object(
+            prefilter_service, "redirect_prefilter", self.prefilter
+        )
+        self.prefilter_patcher.start()
+
+    def tearDown(self):
+        self.prefilter_patcher.stop()
+        redirect_cache.clear()
+
+    @patch.object(URLModel, "describe_table", return_value={"ItemCount": 1})
+    @patch.object(URLModel, "scan", return_value=[Mock(short_url="exists")])
+    def build(self, mock_scan, mock_describe_table):
+        self.prefilter.rebuild()
+
+    @patch.object(URLModel, "get")
+    def test_unknown_short_url_skips_database(self, mock_get):
+        self.build()
+
+        self.assertIsNone(get_original_url("unknown"))
+
+        mock_get.assert_not_called()
+        self.assertEqual(self.prefilter.stats()["rejected"], 1)
+
+    @patch.object(URLModel, "get")
+    def test_known_short_url_reaches_database(self, mock_get):
+        mock_get.return_value = Mock(url="https://example.com")
+        self.build()
+
+        self.assertEqual(get_original_url("exists"), "https://example.com")
+
+    @patch.object(URLModel, "get")
+    def test_allows_everything_before_first_build(self, mock_get):
+        mock_get.return_value = Mock(url="https://example.com")
+
+        self.assertEqual(get_original_url("anything"), "https://example.com")
+        self.assertFalse(self.prefilter.stats()["ready"])
+
+    @patch("service.db_service.insert_url")
+    def test_saved_short_urls_are_added(self, mock_insert_url):
+        self.build()
+        save_url("https://example.com", "fresh", "user")
+
+        self.assertTrue(self.prefilter.might_contain("fresh"))
+
+    @patch.object(URLModel, "get")
+    def test_misses_reach_database_while_change_feed_is_down(self, mock_get):
+        mock_get.return_value = Mock(url="https://example.com")
+        self.prefilter.change_feed = Mock(subscribed=threading.Event())
+        self.build()
+
+        # Saved on another worker, but the feed can't deliver it
+        self.assertEqual(get_original_url("elsewhere"), "https://example.com")
+        self.assertFalse(self.prefilter.stats()["ready"])
+
+    def test_build_waits_for_change_feed(self):
+        subscribed = threading.Event()
+        self.prefilter.change_feed = Mock(subscribed=subscribed)
+        self.addCleanup(self.prefilter.stop)
+
+        with patch.object(self.prefilter, "rebuild") as mock_rebuild:
+            self.prefilter.start()
+            threading.Event().wait(0.05)
+            mock_rebuild.assert_not_called()
+
+            subscribed.set()
+            for _ in range(300):
+                if mock_rebuild.called:
+                    break
+                threading.Event().wait(0.01)
+            mock_rebuild.assert_called_once()
+
+    def test_invalidate_allows_everything_until_rebuilt(self):
+        self.build()
+
+        self.prefilter.invalidate()
+
+        self.assertTrue(self.prefilter.might_contain("unknown"))
+        self.assertFalse(self.prefilter.stats()["ready"])
+        self.build()
+        self.assertFalse(self.prefilter.might_contain("unknown"))
+
+    @patch.object(URLModel, "describe_table", return_value={"ItemCount": 1})
+    def test_rebuild_invalidated_during_scan_is_discarded(self, mock_describe_table):
+        def scan(*args, **kwargs):
+            yield Mock(short_url="exists")
+            self.prefilter.invalidate()
+
+        with patch.object(URLModel, "scan", side_effect=scan):
+            self.prefilter.rebuild()
+
+        self.assertIsNone(self.prefilter.filter)
+        self.assertTrue(self.prefilter._wake.is_set())
+
+    @patch.object(prefilter_service, "REDIRECT_PREFILTER_ENABLED", True)
+    @patch.object(prefilter_service, "change_feed", None)
+    def test_disabled_without_change_feed(self):
+        self.assertIsNone(prefilter_service.create_redirect_prefilter())
+
+    @patch.object(prefilter_service, "REDIRECT_PREFILTER_ENABLED", True)
+    @patch.object(prefilter_service, "change_feed", Mock())
+    def test_enabled_with_change_feed(self):
+        prefilter = prefilter_service.create_redirect_prefilter()
+
+        self.assertIs(prefilter.change_feed, prefilter_service.change_feed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from api.api_endpoints import app
+from models.db_models import URLModel, UserModel
+from service.snapshot_service import RedirectSnapshot, build_snapshot
+from service.storage.memory import InMemoryStorageBackend
+from utils import snapshot
+from utils.snapshot import Snapshot, SnapshotFormatError, write_snapshot
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "redirects.snap")
+
+
+class TestSnapshotFile(SnapshotTestCase):
+    def test_lookups(self):
+        urls = [
+            (f"code{index}", f"https://example.com/{index}") for index in range(500)
+        ]
+        urls.append(("ünï", "https://example.com/ünïcode"))
+
+        self.assertEqual(write_snapshot(self.path, urls), 501)
+        snapshot_file = Snapshot(self.path)
+
+        self.assertEqual(len(snapshot_file), 501)
+        for short_url, url in urls:
+            self.assertEqual(snapshot_file.get(short_url), url)
+        self.assertIsNone(snapshot_file.get("missing"))
+        self.assertIsNone(snapshot_file.get("code5000"))
+
+    def test_hash_collisions_compare_short_urls(self):
+        with patch.object(snapshot, "hash_short_url", return_value=7):
+            write_snapshot(self.path, [("b", "https://b"), ("a", "https://a")])
+            snapshot_file = Snapshot(self.path)
+
+            self.assertEqual(snapshot_file.get("a"), "https://a")
+            self.assertEqual(snapshot_file.get("b"), "https://b")
+            self.assertIsNone(snapshot_file.get("c"))
+
+    def test_empty_snapshot(self):
+        write_snapshot(self.path, [])
+
+        self.assertIsNone(Snapshot(self.path).get("abc"))
+
+    def test_failed_build_keeps_the_old_snapshot(self):
+        write_snapshot(self.path, [("old", "https://old")])
+
+        def failing_scan():
+            yield ("new", "https://new")
+            raise ConnectionError("scan failed")
+
+        with self.assertRaises(ConnectionError):
+            write_snapshot(self.path, failing_scan())
+
+        self.assertEqual(Snapshot(self.path).get("old"), "https://old")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["redirects.snap"])
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as other_file:
+            other_file.write(b"not a snapshot at all")
+
+        with self.assertRaises(SnapshotFormatError):
+            Snapshot(self.path)
+
+
+class TestRedirectSnapshot(SnapshotTestCase):
+    def test_swaps_to_a_rebuilt_snapshot(self):
+        write_snapshot(self.path, [("abc", "https://old")])
+        redirect_snapshot = RedirectSnapshot(self.path, check_seconds=0)
+
+        self.assertEqual(redirect_snapshot.get("abc"), "https://old")
+        old_snapshot = redirect_snapshot.snapshot
+        write_snapshot(self.path, [("abc", "https://new"), ("xyz", "https://xyz")])
+
+        self.assertEqual(redirect_snapshot.get("abc"), "https://new")
+        self.assertEqual(redirect_snapshot.stats()["items"], 2)
+        # Lookups already holding the old snapshot can still finish
+        self.assertEqual(old_snapshot.get("abc"), "https://old")
+
+    def test_keeps_serving_when_the_new_file_is_unreadable(self):
+        write_snapshot(self.path, [("abc", "https://old")])
+        redirect_snapshot = RedirectSnapshot(self.path, check_seconds=0)
+        redirect_snapshot.reload()
+        broken_path = self.path + ".broken"
+        with open(broken_path, "wb") as broken_file:
+            broken_file.write(b"truncated")
+        os.replace(broken_path, self.path)
+
+        self.assertEqual(redirect_snapshot.get("abc"), "https://old")
+
+    def test_checks_are_rate_limited(self):
+        write_snapshot(self.path, [("abc", "https://old")])
+        redirect_snapshot = RedirectSnapshot(self.path, check_seconds=3600)
+        redirect_snapshot.get("abc")
+        write_snapshot(self.path, [("abc", "https://new")])
+
+        self.assertEqual(redirect_snapshot.get("abc"), "https://old")
+
+    def test_missing_file_fails_the_first_load(self):
+        with self.assertRaises(FileNotFoundError):
+            RedirectSnapshot(self.path, check_seconds=0).reload()
+
+    def test_build_from_storage(self):
+        backend = InMemoryStorageBackend()
+        backend.save_user(
+            UserModel(user_id="user", username="name", hashed_password="x", url_count=0)
+        )
+        backend.insert_url(
+            URLModel(short_url="abc", url="https://example.com", user_id="user")
+        )
+
+        with patch("service.snapshot_service.storage.backend", backend):
+            self.assertEqual(build_snapshot(self.path), 1)
+
+        self.assertEqual(Snapshot(self.path).get("abc"), "https://example.com")
+
+
+class TestSnapshotRedirectEndpoint(SnapshotTestCase):
+    def setUp(self):
+        super().setUp()
+        write_snapshot(self.path, [("abc", "https://example.com")])
+        patcher = patch(
+            "api.api_endpoints.redirect_snapshot", RedirectSnapshot(self.path, 0)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    @patch("api.api_endpoints.async_db_service.get_original_url")
+    def test_redirects_without_storage(self, mock_get_original_url):
+        response = self.client.get("/redirect/abc", allow_redirects=False)
+        missing = self.client.get("/redirect/missing", allow_redirects=False)
+
+        self.assertEqual(response.status_code, 307)
+        self.assertEqual(response.headers["location"], "https://example.com")
+        self.assertEqual(missing.status_code, 404)
+        mock_get_original_url.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch, Mock
+from pynamodb.exceptions import DoesNotExist
+from service import cache_service
+from service.cache_service import (
+    SharedCache,
+    InMemoryCacheBackend,
+    RedisCacheBackend,
+    SharedCacheBusyError,
+)
+from service.db_service import get_original_url, save_url, redirect_cache, URLModel
+
+
+class TestSharedCache(unittest.TestCase):
+    def setUp(self):
+        redirect_cache.clear()
+        self.backend = InMemoryCacheBackend()
+        self.shared_cache_patcher = patch.object(
+            cache_service,
+            "shared_cache",
+            SharedCache(self.backend, ttl=60, retry_seconds=5),
+        )
+        self.shared_cache = self.shared_cache_patcher.start()
+
+    def tearDown(self):
+        self.shared_cache_patcher.stop()
+        redirect_cache.clear()
+
+    @patch.object(URLModel, "get")
+    def test_read_through_populates_shared_cache(self, mock_get):
+        mock_get.return_value = Mock(url="https://example.com")
+
+        self.assertEqual(get_original_url("hot"), "https://example.com")
+
+        self.assertEqual(self.backend.get("url:hot"), "https://example.com")
+
+    @patch.object(URLModel, "get")
+    def test_shared_hit_skips_database(self, mock_get):
+        self.backend.set("url:hot", "https://example.com")
+
+        self.assertEqual(get_original_url("hot"), "https://example.com")
+
+        mock_get.assert_not_called()
+
+    @patch("service.db_service.insert_url")
+    def test_write_through_on_save(self, mock_insert_url):
+        save_url("https://example.com", "new", "user")
+
+        self.assertEqual(self.backend.get("url:new"), "https://example.com")
+
+    @patch.object(URLModel, "get")
+    def test_falls_back_to_database_when_unavailable(self, mock_get):
+        mock_get.return_value = Mock(url="https://example.com")
+        failing_backend = Mock()
+        failing_backend.get.side_effect = ConnectionError("Redis down")
+        self.shared_cache.backend = failing_backend
+
+        self.assertEqual(get_original_url("hot"), "https://example.com")
+        mock_get.assert_called_once()
+        # The backend is skipped during the cool-down instead of being retried
+        failing_backend.set.assert_not_called()
+
+    @patch.object(URLModel, "get")
+    def test_busy_pool_is_a_miss_without_cool_down(self, mock_get):
+        mock_get.return_value = Mock(url="https://example.com")
+        busy_backend = Mock()
+        busy_backend.get.side_effect = SharedCacheBusyError("busy")
+        self.shared_cache.backend = busy_backend
+
+        self.assertEqual(get_original_url("hot"), "https://example.com")
+        mock_get.assert_called_once()
+        busy_backend.set.assert_called_once()
+
+    def test_redis_backend_raises_busy_when_every_connection_is_in_use(self):
+        backend = RedisCacheBackend(
+            "redis://localhost:6379/0", max_connections=1, socket_timeout=0.01
+        )
+        backend._slots.acquire()
+
+        with self.assertRaises(SharedCacheBusyError):
+            backend.get("url:hot")
+
+    @patch.object(URLModel, "get")
+    def test_missing_urls_are_not_shared(self, mock_get):
+        mock_get.side_effect = DoesNotExist
+
+        self.assertIsNone(get_original_url("missing"))
+        self.assertIsNone(self.backend.get("url:missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
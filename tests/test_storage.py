@@ -0,0 +1,258 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from pynamodb.exceptions import (
+    TransactWriteError,
+    CancellationReason,
+    UpdateError,
+    VerboseClientError,
+)
+from models.db_models import URLModel, UserModel
+from service import db_service
+from service.storage import (
+    StorageTableMissingError,
+    WriteConflictError,
+    create_storage_backend,
+)
+from service.storage.dynamodb import DynamoDBStorageBackend
+from service.storage.memory import InMemoryStorageBackend
+from service.storage.sqlite import SQLiteStorageBackend
+from utils.hyperloglog import HyperLogLog
+from utils.constants import URL_COUNT_KEY
+
+
+def make_user(user_id="user", url_limit=3, url_count=0):
+    return UserModel(
+        user_id=user_id,
+        username=f"{user_id}-name",
+        hashed_password="hash",
+        url_limit=url_limit,
+        url_count=url_count,
+    )
+
+
+def make_url(short_url, user_id="user"):
+    return URLModel(
+        short_url=short_url, url=f"https://example.com/{short_url}", user_id=user_id
+    )
+
+
+class StorageBackendContract:
+    # Behaviour every backend must share, run against each of them below
+    def create_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.backend = self.create_backend()
+        self.backend.create_tables()
+        self.backend.save_user(make_user())
+
+    def test_insert_and_get_url(self):
+        self.backend.insert_url(make_url("abc"))
+
+        self.assertEqual(self.backend.get_url("abc").url, "https://example.com/abc")
+        self.assertIsNone(self.backend.get_url("missing"))
+        self.assertEqual(self.backend.get_user("user").url_count, 1)
+
+    def test_taken_short_url_conflicts(self):
+        self.backend.insert_url(make_url("abc"))
+
+        with self.assertRaises(WriteConflictError) as context:
+            self.backend.insert_url(make_url("abc"))
+
+        self.assertEqual(context.exception.failed_items, {0})
+        self.assertEqual(self.backend.get_user("user").url_count, 1)
+
+    def test_limit_is_enforced(self):
+        self.backend.save_user(make_user(url_limit=1))
+        self.backend.insert_url(make_url("a"))
+
+        with self.assertRaises(WriteConflictError) as context:
+            self.backend.insert_url(make_url("b"))
+
+        self.assertEqual(context.exception.failed_items, {1})
+
+    @patch("service.storage.dynamodb.ClickStatsModel.update")
+    def test_missing_table_is_reported(self, mock_update):
+        cause = VerboseClientError(
+            {"Error": {"Code": "ResourceNotFoundException", "Message": ""}},
+            "UpdateItem",
+        )
+        mock_update.side_effect = UpdateError("Failed to update item", cause=cause)
+
+        with self.assertRaises(StorageTableMissingError):
+            DynamoDBStorageBackend().add_clicks("abc", 1)
+        self.assertIsNone(self.backend.get_url("b"))
+
+    def test_missing_counter_fails_the_limit_check(self):
+        self.backend.save_user(make_user(url_count=None))
+
+        with self.assertRaises(WriteConflictError) as context:
+            self.backend.insert_url(make_url("a"))
+
+        self.assertEqual(context.exception.failed_items, {1})
+
+    def test_batch_insert_checks_expected_count(self):
+        self.backend.insert_url(make_url("taken"))
+
+        with self.assertRaises(WriteConflictError) as context:
+            self.backend.insert_urls([make_url("new"), make_url("taken")], "user", 0)
+
+        self.assertEqual(context.exception.failed_items, {1, 2})
+        self.backend.insert_urls([make_url("x"), make_url("y")], "user", 1)
+        self.assertEqual(self.backend.get_user("user").url_count, 3)
+
+    def test_dedup_key_is_claimed_with_the_url(self):
+        self.backend.insert_url(make_url("a"), dedup_key="key")
+
+        with self.assertRaises(WriteConflictError) as context:
+            self.backend.insert_url(make_url("b"), dedup_key="key")
+
+        self.assertEqual(context.exception.failed_items, {2})
+        self.assertEqual(self.backend.get_dedup_short_url("key"), "a")
+        self.assertIsNone(self.backend.get_dedup_short_url("other"))
+        self.assertIsNone(self.backend.get_url("b"))
+
+    def test_pages_resume_from_last_key(self):
+        self.backend.save_user(make_user(url_limit=10))
+        self.backend.save_user(make_user("other", url_limit=10))
+        for short_url in ["a", "b", "c"]:
+            self.backend.insert_url(make_url(short_url))
+        self.backend.insert_url(make_url("d", user_id="other"))
+
+        first, last_key = self.backend.get_urls_page(2, None)
+        rest, end_key = self.backend.get_urls_page(2, last_key)
+        own, _ = self.backend.get_urls_page(10, None, user_id="other")
+
+        self.assertEqual([url.short_url for url in first + rest], ["a", "b", "c", "d"])
+        self.assertIsNone(end_key)
+        self.assertEqual([url.short_url for url in own], ["d"])
+        self.assertEqual(self.backend.count_user_urls("user"), 3)
+
+    def test_scan_segments_cover_every_url_once(self):
+        self.backend.save_user(make_user(url_limit=20))
+        short_urls = [f"s{index}" for index in range(10)]
+        for short_url in short_urls:
+            self.backend.insert_url(make_url(short_url))
+
+        scanned = [
+            url.short_url
+            for segment in range(3)
+            for url in self.backend.scan_urls(segment=segment, total_segments=3)
+        ]
+
+        self.assertEqual(sorted(scanned), sorted(short_urls))
+        self.assertEqual(len(list(self.backend.scan_urls(page_size=3))), 10)
+
+    def test_users(self):
+        self.assertEqual(self.backend.get_user_by_username("user-name").user_id, "user")
+        self.assertIsNone(self.backend.get_user_by_username("nobody"))
+
+        user = self.backend.update_user("user", {"url_limit": 7}, True)
+
+        self.assertEqual((user.url_limit, user.token_version), (7, 1))
+        self.assertEqual(self.backend.get_user("user").url_limit, 7)
+        self.assertIsNone(self.backend.update_user("ghost", {"url_limit": 7}, True))
+        self.assertEqual([user.user_id for user in self.backend.scan_users()], ["user"])
+
+    def test_set_url_count_only_if_missing(self):
+        user = self.backend.get_user("user")
+
+        self.assertEqual(self.backend.set_url_count(user, 5, only_if_missing=True), 0)
+        self.assertEqual(self.backend.set_url_count(user, 5, only_if_missing=False), 5)
+
+    def test_counters_and_clicks(self):
+        self.assertEqual(self.backend.increment_counter("ids", 100), 100)
+        self.assertEqual(self.backend.increment_counter("ids", 100), 200)
+        self.backend.add_clicks("abc", 2)
+        self.backend.add_clicks("abc", 3)
+        self.assertEqual(self.backend.get_click_count("abc"), 5)
+        self.assertEqual(self.backend.get_click_count("missing"), 0)
+
+    def test_click_buckets_merge(self):
+        first, second = HyperLogLog(10), HyperLogLog(10)
+        first.add("alice")
+        second.add("bob")
+        self.backend.merge_click_bucket("abc", "2024010100", 1, first)
+        self.backend.merge_click_bucket("abc", "2024010100", 1, second)
+        self.backend.merge_click_bucket("abc", "2024010200", 1, first)
+
+        buckets = list(
+            self.backend.query_click_buckets("abc", "2024010100", "2024010123", 10)
+        )
+
+        self.assertEqual(len(buckets), 1)
+        self.assertEqual(buckets[0].clicks, 2)
+        self.assertEqual(HyperLogLog.from_bytes(buckets[0].visitors).count(), 2)
+
+
+class TestInMemoryStorage(StorageBackendContract, unittest.TestCase):
+    def create_backend(self):
+        return InMemoryStorageBackend()
+
+
+class TestSQLiteStorage(StorageBackendContract, unittest.TestCase):
+    def create_backend(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return SQLiteStorageBackend(os.path.join(directory.name, "test.db"), 1)
+
+    def test_uses_wal(self):
+        mode = self.backend._connection().execute("PRAGMA journal_mode").fetchone()
+        self.assertEqual(mode[0], "wal")
+
+    def test_missing_table_is_reported(self):
+        self.backend._connection().execute("DROP TABLE click_stats")
+
+        with self.assertRaises(StorageTableMissingError):
+            self.backend.add_clicks("abc", 1)
+
+
+class TestDynamoDBStorage(unittest.TestCase):
+    @patch("service.storage.dynamodb.TransactWrite")
+    def test_cancelled_transaction_reports_failed_items(self, mock_transaction):
+        reasons = [
+            None,
+            CancellationReason(code="ConditionalCheckFailed", message=None),
+        ]
+        cause = VerboseClientError(
+            {"Error": {"Code": "TransactionCanceledException", "Message": ""}},
+            "TransactWriteItems",
+            cancellation_reasons=reasons,
+        )
+        mock_transaction.return_value.__exit__.side_effect = TransactWriteError(
+            "Transaction cancelled", cause=cause
+        )
+
+        with self.assertRaises(WriteConflictError) as context:
+            DynamoDBStorageBackend().insert_url(make_url("abc"))
+
+        self.assertEqual(context.exception.failed_items, {1})
+
+
+class TestServiceOnMemoryStorage(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("service.db_service.storage.backend", InMemoryStorageBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db_service.redirect_cache.clear()
+        db_service.user_cache.clear()
+
+    def test_shorten_and_redirect(self):
+        db_service.save_new_user("alice", "hash", admin=False)
+        user = db_service.get_user_by_username("alice")
+
+        db_service.save_url("https://example.com", "abc", user.user_id)
+        db_service.redirect_cache.clear()
+
+        self.assertEqual(db_service.get_original_url("abc"), "https://example.com")
+        self.assertEqual(db_service.get_user_url_info(user.user_id)[URL_COUNT_KEY], 1)
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_storage_backend("cassandra")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import threading
+import unittest
+from datetime import timedelta
+from unittest.mock import patch, Mock
+from fastapi import HTTPException
+from service import auth_service
+from service.auth_service import (
+    create_access_token,
+    decode_access_token,
+    get_current_user,
+    token_cache,
+    token_claims,
+)
+from service.db_service import (
+    min_token_version,
+    revoke_tokens,
+    token_versions,
+    update_password_hash,
+)
+
+
+def make_user(token_version=0):
+    return Mock(
+        user_id="user",
+        username="alice",
+        url_limit=5,
+        is_admin=True,
+        hashed_password="hash",
+        disabled=False,
+        token_version=token_version,
+    )
+
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        token_cache.clear()
+        token_versions.clear()
+
+    def tearDown(self):
+        token_cache.clear()
+        token_versions.clear()
+
+    def test_verified_tokens_are_cached(self):
+        token = create_access_token({"sub": "user"}, timedelta(minutes=5))
+
+        with patch.object(
+            auth_service.jwt, "decode", wraps=auth_service.jwt.decode
+        ) as mock_decode:
+            first = decode_access_token(token)
+            second = decode_access_token(token)
+
+        self.assertEqual(first, second)
+        mock_decode.assert_called_once()
+
+    def test_expired_tokens_are_rejected_and_not_cached(self):
+        token = create_access_token({"sub": "user"}, timedelta(minutes=-1))
+
+        self.assertIsNone(decode_access_token(token))
+        self.assertEqual(token_cache.stats()["size"], 0)
+
+    @patch("service.auth_service.JWT_EMBED_CLAIMS", True)
+    @patch("service.auth_service.get_user_by_id")
+    def test_embedded_claims_skip_user_read(self, mock_get_user):
+        token = create_access_token(
+            {"sub": "user", **token_claims(make_user())}, timedelta(minutes=5)
+        )
+        mock_get_user.return_value = make_user()
+        get_current_user(token)
+        mock_get_user.reset_mock()
+
+        user = get_current_user(token)
+
+        mock_get_user.assert_not_called()
+        self.assertEqual(user.username, "alice")
+        self.assertEqual(user.url_limit, 5)
+        self.assertTrue(user.is_admin)
+
+    @patch("service.auth_service.JWT_EMBED_CLAIMS", True)
+    def test_revoked_embedded_token_is_rejected(self):
+        token = create_access_token(
+            {"sub": "user", **token_claims(make_user())}, timedelta(minutes=5)
+        )
+        revoke_tokens("user", 1)
+
+        with self.assertRaises(HTTPException) as context:
+            get_current_user(token)
+        self.assertEqual(context.exception.status_code, 401)
+
+    @patch("service.auth_service.JWT_EMBED_CLAIMS", True)
+    @patch("service.auth_service.get_user_by_id")
+    def test_embedded_claims_are_checked_against_the_user_when_unknown(
+        self, mock_get_user
+    ):
+        # E.g. after a restart, or when revoked on another worker
+        token = create_access_token(
+            {"sub": "user", **token_claims(make_user())}, timedelta(minutes=5)
+        )
+        mock_get_user.return_value = make_user(token_version=1)
+
+        with self.assertRaises(HTTPException) as context:
+            get_current_user(token)
+        self.assertEqual(context.exception.status_code, 401)
+        self.assertEqual(min_token_version("user"), 1)
+
+    @patch("service.db_service.USER_CACHE_TTL_SECONDS", 0.05)
+    @patch("service.db_service.change_feed_service.change_feed", Mock())
+    @patch("service.auth_service.JWT_EMBED_CLAIMS", True)
+    @patch("service.auth_service.get_user_by_id")
+    def test_known_versions_expire_with_the_change_feed(self, mock_get_user):
+        # A revocation whose publish failed is still seen once this expires
+        token = create_access_token(
+            {"sub": "user", **token_claims(make_user())}, timedelta(minutes=5)
+        )
+        mock_get_user.return_value = make_user()
+        get_current_user(token)
+        mock_get_user.return_value = make_user(token_version=1)
+
+        threading.Event().wait(0.1)
+
+        with self.assertRaises(HTTPException) as context:
+            get_current_user(token)
+        self.assertEqual(context.exception.status_code, 401)
+
+    @patch("service.auth_service.JWT_EMBED_CLAIMS", True)
+    @patch("service.auth_service.get_user_by_id", return_value=None)
+    def test_embedded_claims_of_deleted_user_are_rejected(self, mock_get_user):
+        token = create_access_token(
+            {"sub": "user", **token_claims(make_user())}, timedelta(minutes=5)
+        )
+
+        with self.assertRaises(HTTPException) as context:
+            get_current_user(token)
+        self.assertEqual(context.exception.status_code, 401)
+
+    @patch("service.auth_service.get_user_by_id")
+    def test_stale_version_is_rejected_on_user_read(self, mock_get_user):
+        token = create_access_token(
+            {"sub": "user", **token_claims(make_user())}, timedelta(minutes=5)
+        )
+        mock_get_user.return_value = make_user(token_version=1)
+
+        with self.assertRaises(HTTPException) as context:
+            get_current_user(token)
+        self.assertEqual(context.exception.status_code, 401)
+
+    @patch("service.auth_service.get_user_by_id")
+    def test_tokens_without_a_version_are_rejected(self, mock_get_user):
+        mock_get_user.return_value = make_user()
+        token = create_access_token({"sub": "user"}, timedelta(minutes=5))
+
+        with self.assertRaises(HTTPException) as context:
+            get_current_user(token)
+        self.assertEqual(context.exception.status_code, 401)
+        mock_get_user.assert_not_called()
+
+        with patch("service.auth_service.JWT_REQUIRE_TOKEN_VERSION", False):
+            self.assertEqual(get_current_user(token).user_id, "user")
+
+    @patch("service.db_service.storage.backend.update_user")
+    def test_password_change_revokes_tokens(self, mock_update_user):
+        mock_update_user.return_value = make_user(token_version=3)
+
+        update_password_hash("user", "new_hash")
+
+        self.assertEqual(min_token_version("user"), 3)
+        self.assertTrue(mock_update_user.call_args.kwargs["bump_token_version"])
+
+    @patch("service.db_service.storage.backend.update_user")
+    def test_rehash_keeps_tokens(self, mock_update_user):
+        mock_update_user.return_value = make_user(token_version=3)
+
+        update_password_hash("user", "new_hash", revoke_existing_tokens=False)
+
+        self.assertIsNone(min_token_version("user"))
+        self.assertFalse(mock_update_user.call_args.kwargs["bump_token_version"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+from models.db_models import URLModel
+from service.storage.dynamodb import DynamoDBStorageBackend
+from utils.url_compression import compress_url, decompress_url
+
+LONG_URL = (
+    "https://www.example.com/products/item/12345?utm_source=newsletter"
+    "&utm_medium=email&utm_campaign=spring_sale&fbclid=IwAR0abcDEF123456789"
+)
+
+
+class TestURLCompression(unittest.TestCase):
+    def test_round_trip(self):
+        for url in [LONG_URL, "https://a.com/", "https://例え.jp/パス?q=1"]:
+            self.assertEqual(decompress_url(compress_url(url)), url)
+
+    def test_dictionary_shrinks_long_urls(self):
+        compressed = compress_url(LONG_URL)
+
+        self.assertEqual(compressed[0], 1)
+        self.assertLess(len(compressed), len(LONG_URL) * 0.7)
+
+    def test_unknown_version_is_rejected(self):
+        with self.assertRaises(ValueError):
+            decompress_url(b"\x09abc")
+
+
+@patch("service.storage.dynamodb.URL_COMPRESSION_MIN_LENGTH", 64)
+@patch("service.storage.dynamodb.URL_COMPRESSION_ENABLED", True)
+class TestDynamoDBURLCompression(unittest.TestCase):
+    @patch("service.storage.dynamodb.TransactWrite")
+    def test_long_urls_are_written_compressed(self, mock_transaction):
+        new_url = URLModel(short_url="abc", url=LONG_URL, user_id="user")
+
+        DynamoDBStorageBackend().insert_url(new_url)
+
+        transaction = mock_transaction.return_value.__enter__.return_value
+        stored = transaction.save.call_args.args[0]
+        self.assertIsNone(stored.url)
+        self.assertEqual(decompress_url(stored.url_compressed), LONG_URL)
+        # The caller's record is left as it was
+        self.assertEqual(new_url.url, LONG_URL)
+
+    @patch("service.storage.dynamodb.TransactWrite")
+    def test_short_urls_stay_plain(self, mock_transaction):
+        DynamoDBStorageBackend().insert_url(
+            URLModel(short_url="abc", url="https://a.com/", user_id="user")
+        )
+
+        transaction = mock_transaction.return_value.__enter__.return_value
+        self.assertEqual(transaction.save.call_args.args[0].url, "https://a.com/")
+
+    @patch.object(URLModel, "get")
+    def test_reads_decode_either_form(self, mock_get):
+        backend = DynamoDBStorageBackend()
+        mock_get.return_value = URLModel(
+            short_url="abc", url_compressed=compress_url(LONG_URL), user_id="user"
+        )
+        self.assertEqual(backend.get_url("abc").url, LONG_URL)
+
+        mock_get.return_value = URLModel(short_url="old", url=LONG_URL, user_id="u")
+        self.assertEqual(backend.get_url("old").url, LONG_URL)
+
+    @patch.object(URLModel, "scan")
+    def test_scans_decode(self, mock_scan):
+        mock_scan.return_value = [
+            URLModel(
+                short_url="abc", url_compressed=compress_url(LONG_URL), user_id="u"
+            )
+        ]
+
+        urls = [item.url for item in DynamoDBStorageBackend().scan_urls()]
+
+        self.assertEqual(urls, [LONG_URL])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import patch
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from api.api_endpoints import app
+from models.db_models import UserModel, UserInDB
+from service import db_service
+from service.api_service import create_generated_short_url
+from service.auth_service import get_current_user
+from service.storage import StorageUnavailableError, WriteConflictError
+from service.storage.memory import InMemoryStorageBackend
+from utils.constants import DEDUP_ITEM_INDEX, URL_COUNT_KEY
+from utils.urls import normalize_url, url_dedup_key
+
+
+class TestNormalizeURL(unittest.TestCase):
+    def test_equivalent_urls_share_a_key(self):
+        self.assertEqual(
+            normalize_url("HTTPS://Example.COM:443"), "https://example.com/"
+        )
+        self.assertEqual(
+            url_dedup_key("user", "http://EXAMPLE.com:80/a"),
+            url_dedup_key("user", "http://example.com/a"),
+        )
+
+    def test_meaningful_parts_are_kept(self):
+        self.assertEqual(
+            normalize_url("http://u:p@Example.com:8080/Path?b=2&a=1#top"),
+            "http://u:p@example.com:8080/Path?b=2&a=1#top",
+        )
+        self.assertNotEqual(
+            url_dedup_key("user", "https://example.com/"),
+            url_dedup_key("other", "https://example.com/"),
+        )
+
+
+class TestURLDedup(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryStorageBackend()
+        self.backend.save_user(
+            UserModel(
+                user_id="user",
+                username="name",
+                hashed_password="x",
+                url_limit=2,
+                url_count=0,
+            )
+        )
+        patcher = patch("service.db_service.storage.backend", self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("service.api_service.DEDUP_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeat_shortens_return_the_existing_short_url(self):
+        first = create_generated_short_url("https://example.com", "user")
+        second = create_generated_short_url("https://EXAMPLE.com:443/", "user")
+
+        self.assertEqual(first, second)
+        self.assertEqual(
+            db_service.get_dedup_short_url("https://example.com", "user"),
+            first["short_url"],
+        )
+        self.assertEqual(db_service.get_user_url_info("user")[URL_COUNT_KEY], 1)
+
+    def test_concurrent_shorten_returns_the_winner(self):
+        self.backend.insert_url(
+            db_service.URLModel(
+                short_url="winner", url="https://example.com", user_id="user"
+            ),
+            dedup_key=url_dedup_key("user", "https://example.com"),
+        )
+
+        short_url = db_service.save_url(
+            "https://example.com", "loser", "user", dedup=True
+        )
+
+        self.assertEqual(short_url, "winner")
+        self.assertIsNone(self.backend.get_url("loser"))
+
+    @patch("service.db_service.insert_url")
+    def test_other_conflicts_are_unchanged(self, mock_insert_url):
+        mock_insert_url.side_effect = WriteConflictError([DEDUP_ITEM_INDEX - 1])
+
+        with self.assertRaises(HTTPException) as context:
+            db_service.save_url("https://example.com", "abc", "user", dedup=True)
+
+        self.assertEqual(context.exception.status_code, 403)
+
+    @patch("service.db_service.insert_url")
+    def test_unreachable_dedup_lookup_is_unavailable(self, mock_insert_url):
+        mock_insert_url.side_effect = WriteConflictError([DEDUP_ITEM_INDEX])
+
+        with patch.object(
+            self.backend,
+            "get_dedup_short_url",
+            side_effect=StorageUnavailableError("down"),
+        ):
+            with self.assertRaises(HTTPException) as context:
+                db_service.save_url("https://example.com", "abc", "user", dedup=True)
+
+        self.assertEqual(context.exception.status_code, 503)
+
+
+class TestShortenEndpointDedup(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user] = lambda: UserInDB(
+            user_id="user",
+            username="name",
+            url_limit=1,
+            hashed_password="",
+            disabled=False,
+        )
+        self.addCleanup(app.dependency_overrides.clear)
+        patcher = patch("api.api_endpoints.DEDUP_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    @patch("api.api_endpoints.async_db_service.url_limit_check")
+    @patch(
+        "api.api_endpoints.async_db_service.get_dedup_short_url",
+        return_value="existing",
+    )
+    def test_existing_short_url_is_returned_at_the_limit(
+        self, mock_get_dedup_short_url, mock_url_limit_check
+    ):
+        response = self.client.post("/shorten_url", json={"url": "https://a.com"})
+
+        self.assertEqual(response.json(), {"short_url": "existing"})
+        mock_url_limit_check.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import patch, Mock
+from fastapi import HTTPException
+from service.storage import WriteConflictError
+from service.db_service import (
+    save_url,
+    get_user_url_info,
+    redirect_cache,
+    UserModel,
+    URLModel,
+)
+from utils.constants import URL_COUNT_KEY, URL_LIMIT_KEY
+
+
+def transaction_error(*codes):
+    # One code per item of the write, None for items whose condition held
+    return WriteConflictError(index for index, code in enumerate(codes) if code)
+
+
+class TestURLLimit(unittest.TestCase):
+    def setUp(self):
+        redirect_cache.clear()
+
+    @patch("service.db_service.insert_url")
+    def test_short_url_conflict(self, mock_insert_url):
+        mock_insert_url.side_effect = transaction_error("ConditionalCheckFailed", None)
+
+        with self.assertRaises(HTTPException) as context:
+            save_url("https://example.com", "taken", "user")
+
+        self.assertEqual(context.exception.status_code, 409)
+
+    @patch.object(UserModel, "get")
+    @patch("service.db_service.insert_url")
+    def test_limit_reached(self, mock_insert_url, mock_get):
+        mock_insert_url.side_effect = transaction_error(None, "ConditionalCheckFailed")
+        mock_get.return_value = Mock(url_count=3, url_limit=3)
+
+        with self.assertRaises(HTTPException) as context:
+            save_url("https://example.com", "short", "user")
+
+        self.assertEqual(context.exception.status_code, 403)
+        mock_insert_url.assert_called_once()
+
+    @patch("service.db_service.backfill_url_count")
+    @patch.object(UserModel, "get")
+    @patch("service.db_service.insert_url")
+    def test_backfills_legacy_user_and_retries(
+        self, mock_insert_url, mock_get, mock_backfill
+    ):
+        mock_insert_url.side_effect = [
+            transaction_error(None, "ConditionalCheckFailed"),
+            None,
+        ]
+        mock_get.return_value = Mock(url_count=None, url_limit=3)
+
+        self.assertTrue(save_url("https://example.com", "short", "user"))
+
+        mock_backfill.assert_called_once()
+        self.assertEqual(mock_insert_url.call_count, 2)
+
+    @patch.object(URLModel.user_id_index, "query")
+    @patch.object(UserModel, "get")
+    def test_url_info_reads_counter(self, mock_get, mock_query):
+        mock_get.return_value = Mock(url_count=2, url_limit=5)
+
+        result = get_user_url_info("user")
+
+        self.assertEqual(result, {URL_LIMIT_KEY: 5, URL_COUNT_KEY: 2})
+        mock_query.assert_not_called()
+
+    @patch.object(URLModel.user_id_index, "count", return_value=4)
+    @patch.object(UserModel, "get")
+    def test_url_info_backfills_missing_counter(self, mock_get, mock_count):
+        user = Mock(user_id="user", url_count=None, url_limit=5)
+        mock_get.return_value = user
+
+        result = get_user_url_info("user")
+
+        self.assertEqual(result[URL_COUNT_KEY], 4)
+        user.update.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
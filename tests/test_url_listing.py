@@ -1,9 +1,25 @@
 import unittest
 from unittest.mock import patch, Mock
-from service.db_service import get_all_urls
+from service.db_service import (
+    get_all_urls,
+    get_urls_page,
+    stream_urls,
+    encode_cursor,
+    decode_cursor,
+)
 from fastapi import HTTPException
 
 
+class FakeResultIterator:
+    # Mimics PynamoDB's ResultIterator, which exposes last_evaluated_key
+    def __init__(self, items, last_evaluated_key=None):
+        self._items = iter(items)
+        self.last_evaluated_key = last_evaluated_key
+
+    def __iter__(self):
+        return self._items
+
+
 class TestURLListing(unittest.TestCase):
     @patch("service.db_service.URLModel.scan")
     def test_listing_with_existing_urls(self, mock_scan):
@@ -35,6 +51,94 @@ class TestURLListing(unittest.TestCase):
         )
 
 
+class TestURLPagination(unittest.TestCase):
+    @patch("service.db_service.URLModel.scan")
+    def test_page_returns_next_cursor(self, mock_scan):
+        last_key = {"short_url": {"S": "short2"}}
+        mock_scan.return_value = FakeResultIterator(
+            [
+                Mock(short_url="short1", url="https://example1.com"),
+                Mock(short_url="short2", url="https://example2.com"),
+            ],
+            last_evaluated_key=last_key,
+        )
+
+        result = get_urls_page(limit=2)
+
+        self.assertEqual(len(result["urls"]), 2)
+        self.assertEqual(decode_cursor(result["next_cursor"]), last_key)
+        mock_scan.assert_called_once_with(limit=2, last_evaluated_key=None)
+
+    @patch("service.db_service.URLModel.scan")
+    def test_cursor_resumes_scan(self, mock_scan):
+        last_key = {"short_url": {"S": "short2"}}
+        mock_scan.return_value = FakeResultIterator([])
+
+        result = get_urls_page(limit=2, cursor=encode_cursor(last_key))
+
+        self.assertEqual(result, {"urls": [], "next_cursor": None})
+        mock_scan.assert_called_once_with(limit=2, last_evaluated_key=last_key)
+
+    @patch("service.db_service.URLModel.user_id_index.query")
+    def test_user_page_queries_index(self, mock_query):
+        mock_query.return_value = FakeResultIterator(
+            [Mock(short_url="short1", url="https://example1.com")]
+        )
+
+        result = get_urls_page(limit=5, user_id="user")
+
+        self.assertEqual(result["urls"][0]["short_url"], "short1")
+        mock_query.assert_called_once_with("user", limit=5, last_evaluated_key=None)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(HTTPException) as context:
+            decode_cursor("not-a-cursor")
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_cursor_must_be_a_table_key(self):
+        for start_key in (["short1"], "short1", {"user_id": "user"}, {"short_url": 1}):
+            with self.subTest(start_key=start_key):
+                with self.assertRaises(HTTPException) as context:
+                    decode_cursor(encode_cursor(start_key))
+                self.assertEqual(context.exception.status_code, 400)
+        with self.assertRaises(HTTPException):
+            decode_cursor(encode_cursor({"short_url": "short1", "admin": True}))
+
+    @patch("service.db_service.URLModel.scan")
+    def test_stream_yields_ndjson(self, mock_scan):
+        mock_scan.return_value = FakeResultIterator(
+            [
+                Mock(short_url="short1", url="https://example1.com"),
+                Mock(short_url="short2", url="https://example2.com"),
+            ]
+        )
+
+        lines = "".join(stream_urls()).splitlines()
+
+        self.assertEqual(
+            lines,
+            [
+                '{"short_url": "short1", "original_url": "https://example1.com"}',
+                '{"short_url": "short2", "original_url": "https://example2.com"}',
+            ],
+        )
+
+    @patch("service.db_service.LIST_URLS_STREAM_PAGE_SIZE", 2)
+    @patch("service.db_service.URLModel.scan")
+    def test_stream_yields_one_chunk_per_page(self, mock_scan):
+        mock_scan.return_value = FakeResultIterator(
+            [
+                Mock(short_url=f"short{i}", url=f"https://example{i}.com")
+                for i in range(3)
+            ]
+        )
+
+        chunks = list(stream_urls())
+
+        self.assertEqual([chunk.count("\n") for chunk in chunks], [2, 1])
+        self.assertTrue(all(chunk.endswith("\n") for chunk in chunks))
+
+
 # If this script is run directly, it will execute the tests.
 if __name__ == "__main__":
     unittest.main()
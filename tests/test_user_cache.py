@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import patch, Mock
+from service.db_service import (
+    get_user_by_id,
+    is_user_admin,
+    update_url_limit,
+    set_user_disabled,
+    update_password_hash,
+    user_cache,
+    UserModel,
+)
+
+
+class TestUserCache(unittest.TestCase):
+    def setUp(self):
+        user_cache.clear()
+
+    def tearDown(self):
+        user_cache.clear()
+
+    @patch.object(UserModel, "get")
+    def test_repeated_lookups_read_once(self, mock_get):
+        mock_get.return_value = Mock(user_id="user", is_admin=True)
+
+        get_user_by_id("user")
+        self.assertTrue(is_user_admin("user"))
+        get_user_by_id("user")
+
+        mock_get.assert_called_once_with("user")
+
+    @patch.object(UserModel, "update")
+    @patch.object(UserModel, "get")
+    def test_url_limit_update_invalidates(self, mock_get, mock_update):
+        mock_get.return_value = Mock(user_id="user")
+        get_user_by_id("user")
+
+        update_url_limit("user", 10)
+        get_user_by_id("user")
+
+        self.assertEqual(mock_get.call_count, 2)
+        mock_update.assert_called_once()
+
+    @patch.object(UserModel, "update")
+    @patch.object(UserModel, "get")
+    def test_disable_invalidates(self, mock_get, mock_update):
+        mock_get.return_value = Mock(user_id="user")
+        get_user_by_id("user")
+
+        set_user_disabled("user", True)
+        get_user_by_id("user")
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch.object(UserModel, "update")
+    @patch.object(UserModel, "get")
+    def test_password_update_invalidates(self, mock_get, mock_update):
+        mock_get.return_value = Mock(user_id="user")
+        get_user_by_id("user")
+
+        update_password_hash("user", "new_hash")
+        get_user_by_id("user")
+
+        # The update doesn't read the user, so one read to cache and one after
+        # invalidation
+        self.assertEqual(mock_get.call_count, 2)
+        mock_update.assert_called_once()
+
+    @patch.object(UserModel, "get", side_effect=UserModel.DoesNotExist)
+    def test_missing_users_are_not_cached(self, mock_get):
+        self.assertIsNone(get_user_by_id("ghost"))
+        self.assertIsNone(get_user_by_id("ghost"))
+
+        self.assertEqual(mock_get.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
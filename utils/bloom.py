@@ -0,0 +1,51 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter of strings. Membership tests can return false
+    positives at roughly error_rate once capacity items were added, never false
+    negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.num_bits = max(
+            int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8
+        )
+        self.num_hashes = max(
+            int(round(self.num_bits / self.capacity * math.log(2))), 1
+        )
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing derives all probe positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (first + i * second) % self.num_bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+    def false_positive_rate(self) -> float:
+        # Expected rate for the number of items added so far
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** (
+            self.num_hashes
+        )
@@ -5,7 +5,10 @@ import pathlib
 import stat
 from utils.constants import *
 from utils.logger_config import logger
-from service.api_service import generate_short_url_id
+from service import storage
+from service.db_service import backfill_url_counts
+from service.export_service import export_urls as export_all_urls
+from service.snapshot_service import build_snapshot as build_redirect_snapshot
 
 app = typer.Typer()
 
@@ -40,12 +43,10 @@ def shorten(url: str = typer.Option(...), short_url: str = typer.Option(None)):
     if not token:
         typer.echo(CLI_NOT_LOGGED_IN, err=True)
         raise typer.Exit()
-    # Create custom URL if one isn't provided
-    if not short_url:
-        short_url = generate_short_url_id()
-
-    # Prepare payload
-    json_data = {"url": url, "short_url": short_url}
+    # Prepare payload, the server generates a short URL if one isn't provided
+    json_data = {"url": url}
+    if short_url:
+        json_data["short_url"] = short_url
     headers = {"Authorization": f"Bearer {token}"}
     try:
         response = httpx.post(
@@ -105,6 +106,75 @@ def get_original_url(short_url: str = typer.Argument(...)):
         typer.echo(CLI_ERROR.format(error=e))
 
 
+@app.command()
+def stats(short_url: str = typer.Argument(...)):
+    token = load_token()
+    if not token:
+        typer.echo(CLI_NOT_LOGGED_IN, err=True)
+        raise typer.Exit()
+    headers = {"Authorization": f"Bearer {token}"}
+    try:
+        response = httpx.get(f"{SERVER_URL_PORT}/stats/{short_url}", headers=headers)
+        if response.status_code == 200:
+            typer.echo(CLI_STATS_RESULT.format(**response.json()))
+        else:
+            typer.echo(response.text, err=True)
+    except httpx.HTTPError as e:
+        typer.echo(CLI_ERROR.format(error=e), err=True)
+
+
+@app.command()
+def create_tables():
+    # Provisions the configured backend's tables, run once per environment
+    # before deploying
+    try:
+        created = storage.backend.create_tables()
+        if created:
+            typer.echo(CLI_TABLES_CREATED.format(tables=", ".join(created)))
+        else:
+            typer.echo(CLI_TABLES_EXIST)
+    except Exception as e:
+        typer.echo(CLI_ERROR.format(error=e), err=True)
+
+
+@app.command()
+def migrate_url_counts(
+    recount: bool = typer.Option(False, help="Recount users that have a count")
+):
+    # Migration for users created before the url_count attribute existed
+    try:
+        count = backfill_url_counts(recount=recount)
+        typer.echo(CLI_URL_COUNTS_BACKFILLED.format(count=count))
+    except Exception as e:
+        typer.echo(CLI_ERROR.format(error=e), err=True)
+
+
+@app.command()
+def export_urls(
+    output: pathlib.Path = typer.Option(...),
+    export_format: str = typer.Option(EXPORT_FORMAT_JSONL, "--format"),
+    segments: int = typer.Option(EXPORT_DEFAULT_SEGMENTS),
+):
+    # Reads the URLs table directly with a parallel scan, for backups and audits
+    try:
+        with open(output, "w", newline="") as output_file:
+            stats = export_all_urls(output_file, export_format, segments)
+        typer.echo(CLI_EXPORT_RESULT.format(**stats))
+    except Exception as e:
+        typer.echo(CLI_ERROR.format(error=e), err=True)
+
+
+@app.command()
+def build_snapshot(output: pathlib.Path = typer.Option(...)):
+    # Snapshot for read-only redirect nodes, which pick up a rebuilt file
+    # without restarting
+    try:
+        count = build_redirect_snapshot(str(output))
+        typer.echo(CLI_SNAPSHOT_RESULT.format(count=count, path=output))
+    except Exception as e:
+        typer.echo(CLI_ERROR.format(error=e), err=True)
+
+
 # Token handling
 def save_token(token: str):
     token_file_path = pathlib.Path.home() / ".url_shortener_token"
@@ -1,5 +1,18 @@
 from decouple import config
 
+# Logging
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+# Empty disables the file sink
+LOG_FILE = config("LOG_FILE", default="../debug.log")
+LOG_JSON = config("LOG_JSON", default=False, cast=bool)
+# Sinks write from a background thread so requests never wait on disk I/O
+LOG_ENQUEUE = config("LOG_ENQUEUE", default=True, cast=bool)
+# Fraction of high-volume events that are logged, as event=rate pairs
+LOG_SAMPLE_RATES = config("LOG_SAMPLE_RATES", default="redirect=0.01,auth=0.01")
+LOG_EVENT_REDIRECT = "redirect"
+LOG_EVENT_AUTH = "auth"
+LOG_FORMAT = "{time} {level} {message}"
+
 # API endpoints
 READ_USERS_ME_LOG = "Fetching user data for user: {username}"
 CREATED_CUSTOM_URL_LOG = "Created custom short URL: {short_url}"
@@ -13,6 +26,7 @@ REDIRECT_NOT_FOUND = "Redirect failed: No URL for '{short_url}' found"
 URL_LIMIT_REACHED_LOG = "URL Limit reached for user ID: {username}"
 UPDATE_URL_LIMIT_ERROR = "New limit cannot be lower than the current number of URLs"
 UPDATE_URL_LIMIT_SUCCESS = "URL limit updated successfully for user ID: {user_id}."
+UPDATE_USER_STATUS_SUCCESS = "Status updated successfully for user ID: {user_id}."
 
 # api_service.py
 SHORT_URL_EXISTS_WARNING = "Short URL '{short_url}' already exists."
@@ -22,14 +36,113 @@ ERROR_MAX_RETRIES = "Max retries reached. Unable to create short URL."
 DYNAMODB_TABLE_CREATION_SUCCESS_LOG = (
     "DynamoDB table '{table_name}' created successfully."
 )
-DYNAMODB_TABLE_CREATION_ERROR_LOG = "Error creating DynamoDB table: {error}"
+DYNAMODB_TABLE_CREATION_ERROR_LOG = "Error creating tables: {error}"
+# DynamoDB connection settings, per model and per worker process
+# Empty uses the AWS endpoint for the region, set for DynamoDB Local or moto
+DYNAMODB_HOST = config("DYNAMODB_HOST", default="")
+# Upper bound on concurrent requests to a table, size to the threadpool
+DYNAMODB_MAX_POOL_CONNECTIONS = config(
+    "DYNAMODB_MAX_POOL_CONNECTIONS", default=40, cast=int
+)
+DYNAMODB_CONNECT_TIMEOUT_SECONDS = config(
+    "DYNAMODB_CONNECT_TIMEOUT_SECONDS", default=2, cast=float
+)
+DYNAMODB_READ_TIMEOUT_SECONDS = config(
+    "DYNAMODB_READ_TIMEOUT_SECONDS", default=5, cast=float
+)
+DYNAMODB_MAX_RETRY_ATTEMPTS = config("DYNAMODB_MAX_RETRY_ATTEMPTS", default=3, cast=int)
+DYNAMODB_BASE_BACKOFF_MS = config("DYNAMODB_BASE_BACKOFF_MS", default=25, cast=int)
+# Open pooled connections to every table before the worker starts serving
+DYNAMODB_WARMUP = config("DYNAMODB_WARMUP", default=False, cast=bool)
+# Connections opened per table by the warm-up
+DYNAMODB_WARMUP_CONNECTIONS = config("DYNAMODB_WARMUP_CONNECTIONS", default=4, cast=int)
+DYNAMODB_WARMUP_LOG = "Warmed up {connections} DynamoDB connections in {seconds}s"
+DYNAMODB_WARMUP_ERROR = "Error warming up DynamoDB connections: {error}"
+# Prometheus metrics served at /metrics
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+EVENT_LOOP_LAG_INTERVAL_SECONDS = config(
+    "EVENT_LOOP_LAG_INTERVAL_SECONDS", default=0.5, cast=float
+)
+DB_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+# Set for multiprocess metrics, where every worker writes its metrics to files
+PROMETHEUS_MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+# How often each worker writes its cache stats in multiprocess mode
+CACHE_METRICS_PUBLISH_SECONDS = config(
+    "CACHE_METRICS_PUBLISH_SECONDS", default=5, cast=float
+)
+EVENT_LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Table label of operations spanning several tables
+TRANSACTION_METRIC_TABLE = "transaction"
+DYNAMODB_THROTTLE_ERRORS = (
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+)
+# On-demand request profiling, requested by admins with the profile header
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=False, cast=bool)
+PROFILE_DIR = config("PROFILE_DIR", default="profiles")
+PROFILE_HEADER = "X-Profile"
+# Header values: Server-Timing only, or also a cProfile dump of the request
+PROFILE_MODE_TIMING = "timing"
+PROFILE_MODE_CPROFILE = "cprofile"
+SERVER_TIMING_HEADER = "Server-Timing"
+PROFILE_FILE_HEADER = "X-Profile-File"
+# A cProfile dump covers the event loop thread for the request's duration: the
+# coroutines of every concurrent request, but no threadpool work
+PROFILE_SCOPE_HEADER = "X-Profile-Scope"
+PROFILE_SCOPE_EVENT_LOOP = "event-loop; time-window"
+TIMING_PHASE_AUTH = "auth"
+TIMING_PHASE_BCRYPT = "bcrypt"
+TIMING_PHASE_STORAGE = "storage"
+TIMING_PHASE_RESPONSE = "response"
+TIMING_PHASE_TOTAL = "total"
+PROFILE_WRITTEN_LOG = "Wrote request profile to {path}"
+# Create missing tables when a worker starts, instead of running create-tables
+CREATE_TABLES_ON_STARTUP = config("CREATE_TABLES_ON_STARTUP", default=False, cast=bool)
+# Where URLs, users, counters and clicks are stored
+STORAGE_BACKEND_DYNAMODB = "dynamodb"
+# Process-local, for tests, benchmarks and single-worker local runs
+STORAGE_BACKEND_MEMORY = "memory"
+# A single SQLite file, for single-node deployments
+STORAGE_BACKEND_SQLITE = "sqlite"
+STORAGE_BACKENDS = (
+    STORAGE_BACKEND_DYNAMODB,
+    STORAGE_BACKEND_MEMORY,
+    STORAGE_BACKEND_SQLITE,
+)
+STORAGE_BACKEND = config("STORAGE_BACKEND", default=STORAGE_BACKEND_DYNAMODB)
+STORAGE_BACKEND_ENABLED_LOG = "Storage backend: {backend}"
+STORAGE_BACKEND_ERROR = "Unknown storage backend '{backend}', use one of {backends}"
+SQLITE_PATH = config("SQLITE_PATH", default="shortener.db")
+# How long a write waits for another process's write lock before failing
+SQLITE_BUSY_TIMEOUT_SECONDS = config(
+    "SQLITE_BUSY_TIMEOUT_SECONDS", default=5, cast=float
+)
+SQLITE_SYNCHRONOUS = config("SQLITE_SYNCHRONOUS", default="NORMAL")
+# Rows fetched per query when scanning
+SQLITE_PAGE_SIZE = 500
+SQLITE_TABLE_CREATED_LOG = "SQLite table '{table_name}' created successfully."
+SQLITE_NO_SUCH_TABLE = "no such table"
 DATABASE_UNREACHABLE_ERROR = "Database is currently unreachable."
 SAVED_URL_LOG = "Saved URL: {url} with short URL: {short_url}"
 UNEXPECTED_ERROR = "Unexpected error occurred: {error}"
 RETRIEVED_ALL_URLS_LOG = "Retrieved all URLs from the database."
 ERROR_RETRIEVING_ALL_URLS_LOG = "Error retrieving all URLs: {error}"
 RETRIEVED_ORIGINAL_URL_LOG = "Retrieved original URL for short URL: {short_url}"
-SHORT_URL_NOT_EXIST_LOG = "Short URL does not exist"
+SHORT_URL_NOT_EXIST_LOG = "Short URL does not exist: {short_url}"
 USER_RETRIEVED_LOG = "Retrieved user: {user_id}"
 USER_NOT_FOUND_LOG = "User not found: {username}"
 USER_CREATED_LOG = "Successfully created user: {username}"
@@ -38,6 +151,146 @@ PASSWORD_UPDATED_LOG = "Successfully updated password"
 RETRIEVING_USER_URLS_LOG = "Retrieving URLs for user: {user_id}"
 USER_URL_INFO_FETCHED_SUCCESS = "User URL info fetched successfully."
 URL_LIMIT_CHECK = "Checking URL limit for user: {user_id}, URL Limit: {url_limit}, URL Count: {url_count}"
+RETRIEVED_URLS_PAGE_LOG = "Retrieved a page of {count} URLs."
+INVALID_CURSOR_ERROR = "Invalid pagination cursor"
+# Attributes a cursor's key may hold, the table key and the UserIdIndex key
+CURSOR_KEY_ATTRIBUTES = {"short_url", "user_id"}
+BATCH_SAVED_URLS_LOG = "Saved {created} of {total} batch URLs for user: {user_id}"
+URL_LIMIT_UPDATED_LOG = "Updated URL limit for user: {user_id}, URL Limit: {url_limit}"
+USER_STATUS_UPDATED_LOG = "Updated status for user: {user_id}, disabled: {disabled}"
+REDIRECT_CACHE_HIT_LOG = "Redirect cache hit for short URL: {short_url}"
+URL_COUNT_BACKFILLED_LOG = (
+    "Backfilled URL count for user: {user_id}, URL Count: {url_count}"
+)
+URL_COUNTS_BACKFILLED_LOG = "Backfilled URL counts for {count} users."
+CONDITIONAL_CHECK_FAILED = "ConditionalCheckFailed"
+RESOURCE_NOT_FOUND = "ResourceNotFoundException"
+# Position of each item in the URL insert transaction
+URL_ITEM_INDEX = 0
+USER_ITEM_INDEX = 1
+DEDUP_ITEM_INDEX = 2
+# Repeat shortens of a URL by the same user return its existing short URL
+DEDUP_ENABLED = config("DEDUP_ENABLED", default=False, cast=bool)
+DEDUP_HIT_LOG = "Returning existing short URL {short_url} for user: {user_id}"
+# Store long URLs compressed on DynamoDB, plain-text items stay readable
+URL_COMPRESSION_ENABLED = config("URL_COMPRESSION_ENABLED", default=False, cast=bool)
+# Shorter URLs gain too little to be worth compressing
+URL_COMPRESSION_MIN_LENGTH = config("URL_COMPRESSION_MIN_LENGTH", default=128, cast=int)
+
+# Redirect cache
+REDIRECT_CACHE_SIZE = config("REDIRECT_CACHE_SIZE", default=10000, cast=int)
+REDIRECT_CACHE_TTL_SECONDS = config(
+    "REDIRECT_CACHE_TTL_SECONDS", default=300, cast=float
+)
+REDIRECT_CACHE_NEGATIVE_TTL_SECONDS = config(
+    "REDIRECT_CACHE_NEGATIVE_TTL_SECONDS", default=30, cast=float
+)
+
+# Redirect prefilter (Bloom filter of existing short URLs). Requires the
+# change feed, which delivers short URLs saved on other workers.
+REDIRECT_PREFILTER_ENABLED = config(
+    "REDIRECT_PREFILTER_ENABLED", default=False, cast=bool
+)
+REDIRECT_PREFILTER_CAPACITY = config(
+    "REDIRECT_PREFILTER_CAPACITY", default=1000000, cast=int
+)
+REDIRECT_PREFILTER_ERROR_RATE = config(
+    "REDIRECT_PREFILTER_ERROR_RATE", default=0.01, cast=float
+)
+REDIRECT_PREFILTER_REBUILD_SECONDS = config(
+    "REDIRECT_PREFILTER_REBUILD_SECONDS", default=3600, cast=float
+)
+REDIRECT_PREFILTER_HEADROOM = 1.5
+REDIRECT_PREFILTER_PAGE_SIZE = 1000
+REDIRECT_PREFILTER_REBUILT_LOG = (
+    "Rebuilt redirect prefilter with {count} short URLs in {seconds}s."
+)
+REDIRECT_PREFILTER_REBUILD_ERROR = "Error rebuilding redirect prefilter: {error}"
+REDIRECT_PREFILTER_ITEM_COUNT_ERROR = (
+    "Could not read URL table item count for prefilter sizing: {error}"
+)
+REDIRECT_PREFILTER_REJECTED_LOG = "Redirect prefilter rejected short URL: {short_url}"
+REDIRECT_PREFILTER_NO_CHANGE_FEED_WARNING = (
+    "Redirect prefilter disabled: it requires CHANGE_FEED_URL to be set."
+)
+
+# Read-only redirect snapshot, serves /redirect without reading storage
+REDIRECT_SNAPSHOT_PATH = config("REDIRECT_SNAPSHOT_PATH", default="")
+# How often a worker checks whether the snapshot file was replaced
+REDIRECT_SNAPSHOT_CHECK_SECONDS = config(
+    "REDIRECT_SNAPSHOT_CHECK_SECONDS", default=5, cast=float
+)
+REDIRECT_SNAPSHOT_PAGE_SIZE = 1000
+REDIRECT_SNAPSHOT_BUILT_LOG = "Wrote redirect snapshot of {count} URLs to {path}."
+REDIRECT_SNAPSHOT_LOADED_LOG = "Loaded redirect snapshot of {count} URLs from {path}."
+REDIRECT_SNAPSHOT_LOAD_ERROR = (
+    "Could not load new redirect snapshot, serving the previous one: {error}"
+)
+
+# Authenticated principal cache
+USER_CACHE_SIZE = config("USER_CACHE_SIZE", default=10000, cast=int)
+USER_CACHE_TTL_SECONDS = config("USER_CACHE_TTL_SECONDS", default=30, cast=float)
+
+# Self-contained access tokens and verified-token cache
+# Embedded claims are only trusted once the worker knows the user's minimum
+# token version, from a revocation it applied or from a user read it remembered
+# for USER_CACHE_TTL_SECONDS. Other requests still read the user, so enabling
+# this reduces user reads but does not eliminate them.
+JWT_EMBED_CLAIMS = config("JWT_EMBED_CLAIMS", default=False, cast=bool)
+# Tokens without a version claim were issued before revocation existed and can't
+# be revoked. Set to False only to keep them valid while upgrading, they expire
+# at most JWT_TOKEN_EXPIRE_MINUTES after the upgrade.
+JWT_REQUIRE_TOKEN_VERSION = config("JWT_REQUIRE_TOKEN_VERSION", default=True, cast=bool)
+TOKEN_CACHE_SIZE = config("TOKEN_CACHE_SIZE", default=10000, cast=int)
+TOKEN_VERSION_CACHE_SIZE = config("TOKEN_VERSION_CACHE_SIZE", default=100000, cast=int)
+TOKEN_CLAIM_USERNAME = "name"
+TOKEN_CLAIM_ADMIN = "adm"
+TOKEN_CLAIM_URL_LIMIT = "lim"
+TOKEN_CLAIM_DISABLED = "dis"
+TOKEN_CLAIM_VERSION = "ver"
+TOKEN_REVOKED_LOG = "Rejected revoked token for user: {user_id}"
+TOKEN_VERSION_MISSING_LOG = "Rejected token without a version claim for user: {user_id}"
+TOKENS_REVOKED_LOG = "Revoked tokens of user {user_id} before version {version}"
+
+# Shared redirect cache (Redis protocol), disabled unless SHARED_CACHE_URL is set
+SHARED_CACHE_URL = config("SHARED_CACHE_URL", default="")
+SHARED_CACHE_IN_MEMORY_URL = "memory://"
+SHARED_CACHE_TTL_SECONDS = config("SHARED_CACHE_TTL_SECONDS", default=86400, cast=int)
+SHARED_CACHE_MAX_CONNECTIONS = config(
+    "SHARED_CACHE_MAX_CONNECTIONS", default=50, cast=int
+)
+SHARED_CACHE_TIMEOUT_SECONDS = config(
+    "SHARED_CACHE_TIMEOUT_SECONDS", default=0.1, cast=float
+)
+SHARED_CACHE_RETRY_SECONDS = config("SHARED_CACHE_RETRY_SECONDS", default=5, cast=float)
+SHARED_CACHE_URL_KEY = "url:{short_url}"
+SHARED_CACHE_ENABLED_LOG = "Shared cache enabled with backend: {backend}"
+SHARED_CACHE_UNAVAILABLE_LOG = (
+    "Shared cache unavailable, falling back to DynamoDB: {error}"
+)
+SHARED_CACHE_BUSY_ERROR = "All {max_connections} shared cache connections are busy"
+
+# Change feed (Redis pub/sub) of URL and user changes, evicts per-worker cache
+# entries written by other workers. Disabled unless CHANGE_FEED_URL is set.
+CHANGE_FEED_URL = config("CHANGE_FEED_URL", default="")
+CHANGE_FEED_IN_MEMORY_URL = "memory://"
+CHANGE_FEED_CHANNEL = config("CHANGE_FEED_CHANNEL", default="shortener:changes")
+CHANGE_FEED_TIMEOUT_SECONDS = config(
+    "CHANGE_FEED_TIMEOUT_SECONDS", default=0.5, cast=float
+)
+CHANGE_FEED_RETRY_SECONDS = config("CHANGE_FEED_RETRY_SECONDS", default=5, cast=float)
+# How long a subscriber waits for a message before checking for shutdown
+CHANGE_FEED_POLL_SECONDS = 1
+CHANGE_EVENT_URL = "url"
+CHANGE_EVENT_USER = "user"
+# Sent after a failed publish, receivers reset as if their subscription failed
+CHANGE_EVENT_RESYNC = "resync"
+CHANGE_FEED_ENABLED_LOG = "Change feed enabled with backend: {backend}"
+CHANGE_FEED_PUBLISH_ERROR = "Error publishing to the change feed: {error}"
+CHANGE_FEED_APPLY_ERROR = "Error applying change feed event: {error}"
+CHANGE_FEED_SUBSCRIBE_ERROR = (
+    "Change feed subscription failed, resetting caches: {error}"
+)
 
 # Authentication
 LOGIN_ATTEMPT_LOG = "Attempting login for user: {username}"
@@ -55,12 +308,122 @@ CREATE_ACCESS_TOKEN_LOG = "Created access token for user: {username}"
 PASSWORD_CHANGE_REQUEST_LOG = "Password change request for user: {user_id}"
 PASSWORD_CHANGE_SUCCESS_LOG = "Password changed successfully for user: {user_id}"
 
+# Password hashing
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+# Processes running bcrypt per API worker, 0 runs it on the thread pool instead
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=2, cast=int)
+PASSWORD_HASH_MAX_CONCURRENCY = config(
+    "PASSWORD_HASH_MAX_CONCURRENCY", default=4, cast=int
+)
+PASSWORD_REHASHED_LOG = "Rehashed password with updated cost for user: {username}"
+
 # Token data constants
 ACCESS_TOKEN_TYPE = "bearer"
 JWT_SECRET_KEY = config("JWT_SECRET_KEY")
 JWT_ALGORITHM = "HS256"
 JWT_TOKEN_EXPIRE_MINUTES = 30
 
+# URL listing pagination
+LIST_URLS_DEFAULT_LIMIT = 100
+LIST_URLS_MAX_LIMIT = 1000
+LIST_URLS_STREAM_PAGE_SIZE = config("LIST_URLS_STREAM_PAGE_SIZE", default=500, cast=int)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Admin export (parallel scan)
+EXPORT_FORMAT_JSONL = "jsonl"
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_MEDIA_TYPES = {
+    EXPORT_FORMAT_JSONL: NDJSON_MEDIA_TYPE,
+    EXPORT_FORMAT_CSV: "text/csv",
+}
+EXPORT_CSV_FIELDS = ["short_url", "original_url", "user_id"]
+EXPORT_DEFAULT_SEGMENTS = config("EXPORT_DEFAULT_SEGMENTS", default=4, cast=int)
+EXPORT_MAX_SEGMENTS = 64
+EXPORT_MAX_WORKERS = config("EXPORT_MAX_WORKERS", default=16, cast=int)
+EXPORT_PAGE_SIZE = config("EXPORT_PAGE_SIZE", default=1000, cast=int)
+EXPORT_QUEUE_SIZE = 10000
+EXPORT_QUEUE_TIMEOUT_SECONDS = 0.5
+# A chunk is emitted per this many records or characters, whichever comes first,
+# since every chunk of a streamed export costs a threadpool hop
+EXPORT_CHUNK_RECORDS = config("EXPORT_CHUNK_RECORDS", default=1000, cast=int)
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", default=64 * 1024, cast=int)
+EXPORT_STARTED_LOG = "Started URL export with {segments} scan segments."
+EXPORT_COMPLETE_LOG = "Exported {items} URLs from {segments} segments in {seconds}s ({items_per_second} items/s)."
+EXPORT_ERROR_LOG = "Error exporting URLs: {error}"
+EXPORT_FORMAT_ERROR = "Unsupported export format: {export_format}"
+
+# Batch shortening
+BATCH_SHORTEN_MAX_ITEMS = config("BATCH_SHORTEN_MAX_ITEMS", default=1000, cast=int)
+# URL items per transaction, one slot is kept for the user's url_count update
+BATCH_WRITE_CHUNK_SIZE = config("BATCH_WRITE_CHUNK_SIZE", default=99, cast=int)
+BATCH_MAX_RETRIES = 10
+BATCH_STATUS_CREATED = "created"
+BATCH_STATUS_CONFLICT = "conflict"
+BATCH_STATUS_REJECTED = "rejected"
+
+# Short URL ID generation
+ID_GENERATOR_UUID = "uuid"
+ID_GENERATOR_BASE62 = "base62"
+SHORT_URL_ID_GENERATOR = config("SHORT_URL_ID_GENERATOR", default=ID_GENERATOR_UUID)
+SHORT_URL_COUNTER_NAME = "short_url_id"
+SHORT_URL_ID_BLOCK_SIZE = config("SHORT_URL_ID_BLOCK_SIZE", default=1000, cast=int)
+SHORT_URL_ID_SCRAMBLE = config("SHORT_URL_ID_SCRAMBLE", default=True, cast=bool)
+SHORT_URL_SCRAMBLED_LENGTH = config("SHORT_URL_SCRAMBLED_LENGTH", default=7, cast=int)
+# Must be coprime with 62 for scrambling to stay collision-free
+SHORT_URL_SCRAMBLE_MULTIPLIER = config(
+    "SHORT_URL_SCRAMBLE_MULTIPLIER", default=2654435761, cast=int
+)
+SHORT_URL_SCRAMBLE_OFFSET = config("SHORT_URL_SCRAMBLE_OFFSET", default=0, cast=int)
+BASE62_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ID_GENERATOR_SELECTED_LOG = "Using short URL ID generator: {generator}"
+UNKNOWN_ID_GENERATOR_ERROR = "Unknown short URL ID generator: {generator}"
+ID_BLOCK_LEASED_LOG = "Leased IDs [{start}, {end}) from counter: {counter}"
+
+# Click analytics, aggregated in memory and flushed to the stats table. Run
+# create-tables after enabling it.
+CLICK_TRACKING_ENABLED = config("CLICK_TRACKING_ENABLED", default=False, cast=bool)
+# Distinct short URLs buffered between flushes, clicks on others are dropped
+CLICK_BUFFER_MAX_KEYS = config("CLICK_BUFFER_MAX_KEYS", default=10000, cast=int)
+# Buffered clicks that trigger a flush before the interval elapses
+CLICK_FLUSH_THRESHOLD = config("CLICK_FLUSH_THRESHOLD", default=1000, cast=int)
+CLICK_FLUSH_INTERVAL_SECONDS = config(
+    "CLICK_FLUSH_INTERVAL_SECONDS", default=10, cast=float
+)
+# Concurrent writes per flush
+CLICK_FLUSH_WORKERS = config("CLICK_FLUSH_WORKERS", default=8, cast=int)
+CLICKS_FLUSHED_LOG = "Flushed {clicks} clicks for {urls} short URLs"
+CLICKS_FLUSH_ERROR = "Error flushing clicks for short URL {short_url}: {error}"
+CLICKS_DROPPED_LOG = "Dropped {clicks} clicks, click buffer is full"
+CLICK_FEATURE_TRACKING = "click tracking"
+CLICK_FEATURE_HISTOGRAMS = "click histograms"
+CLICK_TABLE_MISSING_WARNING = (
+    "Click table missing, {feature} disabled until restarted after running "
+    "create-tables: {error}"
+)
+
+# Hourly click histograms with HyperLogLog unique visitor estimates, recorded
+# when click tracking is enabled as well
+CLICK_HISTOGRAMS_ENABLED = config("CLICK_HISTOGRAMS_ENABLED", default=False, cast=bool)
+# 2^precision one-byte registers per sketch, 10 gives ~3% error in 1 KB
+HLL_PRECISION = config("HLL_PRECISION", default=10, cast=int)
+CLICK_BUCKET_FORMAT = "%Y%m%d%H"
+CLICK_GRANULARITY_HOUR = "hour"
+CLICK_GRANULARITY_DAY = "day"
+# Bucket key prefix that identifies a histogram point of each granularity
+CLICK_GRANULARITY_FORMATS = {
+    CLICK_GRANULARITY_HOUR: CLICK_BUCKET_FORMAT,
+    CLICK_GRANULARITY_DAY: "%Y%m%d",
+}
+CLICK_BUCKET_WRITE_RETRIES = 5
+CLICK_HISTOGRAM_PAGE_SIZE = 100
+CLICK_HISTOGRAM_DEFAULT_HOURS = 24
+# Longest range a histogram query may span
+CLICK_HISTOGRAM_MAX_DAYS = config("CLICK_HISTOGRAM_MAX_DAYS", default=366, cast=int)
+CLICK_BUCKET_CONFLICT_ERROR = "Click bucket {bucket} of {short_url} kept changing"
+INVALID_HISTOGRAM_RANGE_ERROR = (
+    "Invalid histogram range: end must be after start and span at most {days} days"
+)
+
 # URL info limit keys for get_user_url_info output
 URL_LIMIT_KEY = "url_limit"
 URL_COUNT_KEY = "current_url_count"
@@ -86,3 +449,9 @@ ADMIN_STATUS_CHECK_LOG = "Checking admin status for the current user."
 CLI_TOKEN_SAVED = "Token saved successfully"
 CLI_NO_URLS = "No URLs found."
 CLI_NO_ORIGINAL_URL = "Original URL not found for the given short URL."
+CLI_EXPORT_RESULT = "Exported {items} URLs from {segments} segments in {seconds}s ({items_per_second} items/s)."
+CLI_URL_COUNTS_BACKFILLED = "Backfilled URL counts for {count} users."
+CLI_STATS_RESULT = "{short_url}: {clicks} clicks"
+CLI_TABLES_CREATED = "Created tables: {tables}"
+CLI_TABLES_EXIST = "All tables already exist."
+CLI_SNAPSHOT_RESULT = "Wrote {count} URLs to {path}."
@@ -0,0 +1,85 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """
+    Approximate distinct count of strings in 2^precision one-byte registers,
+    with a standard error of about 1.04 / sqrt(2^precision). Sketches of the
+    same precision merge losslessly by taking the register-wise maximum. A
+    sketch merged with one of lower precision is reduced to that precision, so
+    sketches stored before a precision change stay mergeable.
+    """
+
+    def __init__(self, precision: int, registers: bytes = None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be 4-16, got {precision}")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        if registers is None:
+            self.registers = bytearray(self.num_registers)
+        elif len(registers) != self.num_registers:
+            raise ValueError("HyperLogLog register count doesn't match precision")
+        else:
+            self.registers = bytearray(registers)
+
+    def add(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        remainder = hashed & ((1 << remaining_bits) - 1)
+        # Position of the leftmost 1-bit in the bits not used for the index
+        rank = remaining_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def reduced(self, precision: int) -> "HyperLogLog":
+        # The same sketch as if built at the lower precision: the index bits
+        # dropped become the leading bits of the rank
+        shift = self.precision - precision
+        if shift < 0:
+            raise ValueError("A HyperLogLog can't be raised to a higher precision")
+        reduced = HyperLogLog(precision)
+        for index, rank in enumerate(self.registers):
+            if not rank:
+                continue
+            dropped = index & ((1 << shift) - 1)
+            rank = shift - dropped.bit_length() + 1 if dropped else rank + shift
+            if rank > reduced.registers[index >> shift]:
+                reduced.registers[index >> shift] = rank
+        return reduced
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision > self.precision:
+            other = other.reduced(self.precision)
+        elif other.precision < self.precision:
+            reduced = self.reduced(other.precision)
+            self.precision = reduced.precision
+            self.num_registers = reduced.num_registers
+            self.registers = reduced.registers
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.num_registers
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-register for register in self.registers)
+        empty = self.registers.count(0)
+        # Linear counting is more accurate while many registers are still empty
+        if estimate <= 2.5 * m and empty:
+            estimate = m * math.log(m / empty)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(data[0], data[1:])
@@ -1,10 +1,50 @@
+import random
+import sys
 from loguru import logger
+from utils.constants import (
+    LOG_ENQUEUE,
+    LOG_FILE,
+    LOG_FORMAT,
+    LOG_JSON,
+    LOG_LEVEL,
+    LOG_SAMPLE_RATES,
+)
+
+
+def parse_sample_rates(rates: str) -> dict:
+    sample_rates = {}
+    for pair in filter(None, rates.split(",")):
+        event, rate = pair.split("=")
+        sample_rates[event.strip()] = float(rate)
+    return sample_rates
+
+
+sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+
+
+def log_sampled(event: str) -> bool:
+    # Checked before the log call, so unsampled events cost one random draw
+    rate = sample_rates.get(event, 1.0)
+    return rate >= 1.0 or random.random() < rate
+
 
-# Configure the logger
+# Configure the logger. Messages below LOG_LEVEL are discarded before they are
+# formatted, so hot paths pass format arguments as kwargs instead of formatting
+# eagerly; with LOG_JSON those kwargs become fields of each JSON record.
+logger.remove()
 logger.add(
-    "../debug.log",
-    format="{time} {level} {message}",
-    level="DEBUG",
-    rotation="10 MB",
-    retention="30 days",
+    sys.stderr,
+    level=LOG_LEVEL,
+    serialize=LOG_JSON,
+    enqueue=LOG_ENQUEUE,
 )
+if LOG_FILE:
+    logger.add(
+        LOG_FILE,
+        format=LOG_FORMAT,
+        level=LOG_LEVEL,
+        serialize=LOG_JSON,
+        enqueue=LOG_ENQUEUE,
+        rotation="10 MB",
+        retention="30 days",
+    )
@@ -0,0 +1,137 @@
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Iterable, Optional, Tuple
+
+# File layout, all integers little-endian:
+#   header: magic, version, entry count
+#   index:  one fixed-size entry per short URL, sorted by hash
+#   heap:   each short URL followed by its original URL, UTF-8 encoded
+# An entry holds the short URL's hash, the heap offset of its short URL and
+# the lengths of both strings, so a lookup is a binary search over the index
+# followed by one comparison against the heap.
+SNAPSHOT_MAGIC = b"URLSNAP\x00"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct("<8sIQ")
+ENTRY = struct.Struct("<QQII")
+HASH = struct.Struct("<Q")
+
+
+class SnapshotFormatError(Exception):
+    """
+    The file is not a redirect snapshot this version can read
+    """
+
+
+def hash_short_url(short_url: bytes) -> int:
+    return HASH.unpack(hashlib.blake2b(short_url, digest_size=HASH.size).digest())[0]
+
+
+def write_snapshot(path: str, urls: Iterable[Tuple[str, str]]) -> int:
+    """
+    Writes (short URL, original URL) pairs to a snapshot at path and returns
+    the number written. The file is written next to path and renamed over it,
+    so readers see either the old snapshot or the complete new one. The heap
+    is streamed to a scratch file while the pairs are read, so only the index
+    entries are held in memory for sorting.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with tempfile.TemporaryFile(dir=directory) as heap_file:
+        heap_size = 0
+        for short_url, url in urls:
+            short_url, url = short_url.encode(), url.encode()
+            entries.append(
+                (hash_short_url(short_url), heap_size, len(short_url), len(url))
+            )
+            heap_file.write(short_url)
+            heap_file.write(url)
+            heap_size += len(short_url) + len(url)
+        # Entries with equal hashes are told apart by comparing the short URL,
+        # so their order among themselves doesn't matter
+        entries.sort()
+        heap_start = HEADER.size + ENTRY.size * len(entries)
+
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as snapshot_file:
+                snapshot_file.write(
+                    HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(entries))
+                )
+                for url_hash, offset, key_length, url_length in entries:
+                    snapshot_file.write(
+                        ENTRY.pack(
+                            url_hash, heap_start + offset, key_length, url_length
+                        )
+                    )
+                heap_file.seek(0)
+                shutil.copyfileobj(heap_file, snapshot_file)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.chmod(temporary_path, 0o644)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+    return len(entries)
+
+
+class Snapshot:
+    """
+    A read-only view of a snapshot file. The file is mapped rather than read,
+    so every process that opens the same file shares its pages through the
+    page cache, and a lookup only copies out the URL it returns.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as snapshot_file:
+            self.stat = os.fstat(snapshot_file.fileno())
+            if self.stat.st_size < HEADER.size:
+                raise SnapshotFormatError(path)
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self._map)
+        if (
+            magic != SNAPSHOT_MAGIC
+            or version != SNAPSHOT_VERSION
+            or HEADER.size + ENTRY.size * self.count > self.stat.st_size
+        ):
+            self._map.close()
+            raise SnapshotFormatError(path)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, short_url: str) -> Optional[str]:
+        key = short_url.encode()
+        url_hash = hash_short_url(key)
+        snapshot_map = self._map
+        # Leftmost entry with this hash; equal hashes are compared by key below
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if HASH.unpack_from(snapshot_map, HEADER.size + ENTRY.size * middle)[0] < (
+                url_hash
+            ):
+                low = middle + 1
+            else:
+                high = middle
+        while low < self.count:
+            entry_hash, offset, key_length, url_length = ENTRY.unpack_from(
+                snapshot_map, HEADER.size + ENTRY.size * low
+            )
+            if entry_hash != url_hash:
+                return None
+            if (
+                key_length == len(key)
+                and snapshot_map.find(key, offset, offset + key_length) == offset
+            ):
+                url_start = offset + key_length
+                return snapshot_map[url_start : url_start + url_length].decode()
+            low += 1
+        return None
+
+    def close(self):
+        self._map.close()
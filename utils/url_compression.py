@@ -0,0 +1,45 @@
+import zlib
+
+# Fragments common in long destination URLs, so even a single URL compresses
+# well. Deflate finds matches closer to the end of the dictionary more cheaply,
+# so the most common fragments come last. Changing it requires a new version.
+URL_DICTIONARY_V1 = (
+    b"index.html.php.aspx/amp/article/products/product/item/category/search?q="
+    b"&lang=en&locale=en_US&currency=USD&sort=&page=&session_id=&sessionid="
+    b"&trk=&ref_=&tag=&ascsubtag=&affiliate_id=&aff_id=&clickid=&click_id="
+    b"&mc_cid=&mc_eid=&_hsenc=&_hsmi=&mkt_tok=&msclkid=&dclid=&yclid="
+    b"&igshid=&si=&feature=share&list=&t=&v=&id=&ref=&source=&s="
+    b"youtube.com/watch?v=docs.google.com/amazon.com/dp/linkedin.com/"
+    b"facebook.com/twitter.com/instagram.com/github.com/medium.com/"
+    b".co.uk/.org/.net/.io/.de/"
+    b"&fbclid=&gclid=&gad_source=&gbraid=&wbraid="
+    b"&utm_id=&utm_term=&utm_content=&utm_campaign=&utm_medium=email"
+    b"&utm_medium=social&utm_medium=cpc&utm_source=newsletter"
+    b"&utm_source=facebook&utm_source=google&utm_source="
+    b".com/https://www.http://www.https://"
+)
+
+# Version byte -> dictionary; the byte is stored first so older items stay
+# readable after a new dictionary is introduced
+URL_DICTIONARIES = {1: URL_DICTIONARY_V1}
+URL_COMPRESSION_VERSION = 1
+# Raw deflate, the zlib header and checksum would cost 6 bytes per URL
+WINDOW_BITS = -15
+
+
+def compress_url(url: str, version: int = URL_COMPRESSION_VERSION) -> bytes:
+    compressor = zlib.compressobj(
+        zlib.Z_BEST_COMPRESSION,
+        zlib.DEFLATED,
+        WINDOW_BITS,
+        zdict=URL_DICTIONARIES[version],
+    )
+    return bytes([version]) + compressor.compress(url.encode()) + compressor.flush()
+
+
+def decompress_url(data: bytes) -> str:
+    dictionary = URL_DICTIONARIES.get(data[0]) if data else None
+    if dictionary is None:
+        raise ValueError(f"Unknown URL compression version: {data[:1]!r}")
+    decompressor = zlib.decompressobj(WINDOW_BITS, zdict=dictionary)
+    return (decompressor.decompress(data[1:]) + decompressor.flush()).decode()
@@ -0,0 +1,32 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Returns the form of url used to detect repeat shortens. Only parts that
+    never change where the URL leads are normalized: the scheme and host are
+    lowercased, a default port is dropped and an empty path becomes "/".
+    The path, query and fragment are kept as they are.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.hostname and ":" in parts.hostname:
+        netloc = f"[{netloc}]"
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def url_dedup_key(user_id: str, url: str) -> str:
+    # Keys a user's URL by a fixed-size hash, however long the URL is
+    normalized = f"{user_id}\n{normalize_url(url)}"
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()